@@ -0,0 +1,222 @@
+# Copyright (c) 2025 Darshan P. All rights reserved.
+
+# This work is licensed under the terms of the MIT license.
+# For a copy, see <https://opensource.org/licenses/MIT>.
+
+# This file puts captures of several memory ranges (the DCBAA page, context pages, ring
+# segments, ...) back at their physical addresses. Every segment file is memory-mapped at
+# the base address given by a small manifest, so 64-bit DMA addresses - like the DCBAA
+# entries, Input Context pointers and TR Dequeue Pointers - are read straight out of the
+# files without concatenating them. Translated pages are kept in an LRU cache, and reads
+# of memory no segment holds fail with the ranges that are mapped.
+#
+#   {"segments": [{"file": "dcbaa.bin",    "base": "0x7ff000"},
+#                 {"file": "contexts.bin", "base": "0x1a2000"},
+#                 {"file": "ring.bin",     "base": "0x3b4000", "offset": 64, "length": 4096}]}
+
+import bisect
+import json
+import os
+from collections import OrderedDict
+from typing import Iterator
+
+from builders.constants import VisualizationException
+from builders.fields import trbSize, endpointContextFields
+from builders.registry import getStructure
+from helpers import byteView, bytes2dwords, mapBinaryFile
+
+# Size of the pages translations are cached for
+pageSize = 4096
+
+# Number of translated pages kept by default
+defaultCachedPages = 1024
+
+# Number of Device Slots a DCBAA can hold (entry 0 is the Scratchpad Buffer Array)
+maxDeviceSlots = 255
+
+def parseAddress(value) -> int:
+  '''This function reads an address given as a number or as a hex string (0x optional)'''
+  if isinstance(value, int):
+    return value
+  try:
+    return int(str(value).strip(), 16)
+  except ValueError:
+    raise VisualizationException(f"{value!r} is not a hex address")
+
+def loadManifest(manifestPath:str) -> list[dict]:
+  '''
+  This function reads the segments of a JSON or YAML (needs PyYAML) manifest: a list of segments, or an object holding
+  it as "segments". Every segment names its "file" (relative to the manifest) and "base" address, and may take
+  only "length" bytes starting at "offset" of the file.
+  '''
+  with open(manifestPath, 'r') as manifestFile:
+    if manifestPath.lower().endswith((".yaml", ".yml")):
+      try:
+        import yaml
+      except ImportError:
+        raise VisualizationException("YAML manifests need PyYAML. Install it using: pip install pyyaml")
+      manifest = yaml.safe_load(manifestFile) or {}
+    else:
+      manifest = json.load(manifestFile)
+  segments = manifest.get("segments", []) if isinstance(manifest, dict) else manifest
+  directory = os.path.dirname(os.path.abspath(manifestPath))
+  loaded:list[dict] = []
+  for index, segment in enumerate(segments):
+    if not isinstance(segment, dict) or "file" not in segment or "base" not in segment:
+      raise VisualizationException(f"Segment {index} of {manifestPath} needs a \"file\" and a \"base\" address")
+    loaded.append({
+      "file"   : os.path.join(directory, os.path.expanduser(segment["file"])),
+      "base"   : parseAddress(segment["base"]),
+      "offset" : int(segment.get("offset", 0)),
+      "length" : int(segment["length"]) if segment.get("length") is not None else None,
+    })
+  return loaded
+
+class AddressSpace:
+  '''
+  This class maps segments of memory at their physical base addresses and reads any range of them.
+  Reads inside a single segment are views of the mapped file (nothing is copied), reads spanning
+  adjacent segments are joined. Translations are cached per page, the least recently used first out.
+  '''
+
+  def __init__(self, cachedPages:int = defaultCachedPages):
+    self.segments:list[tuple[int,int,str,memoryview]] = []   # (base, end, name, data), sorted by base
+    self.bases:list[int] = []
+    self.pages:OrderedDict[int, list[tuple[int,int,memoryview]]] = OrderedDict()
+    self.cachedPages = max(cachedPages, 1)
+    self.hits = 0
+    self.misses = 0
+
+  @classmethod
+  def fromManifest(cls, manifestPath:str, cachedPages:int = defaultCachedPages) -> "AddressSpace":
+    '''This function maps every segment of a manifest'''
+    space = cls(cachedPages)
+    for segment in loadManifest(manifestPath):
+      data = byteView(mapBinaryFile(segment["file"]))
+      end = len(data) if segment["length"] is None else segment["offset"] + segment["length"]
+      if segment["offset"] > len(data) or end > len(data):
+        raise VisualizationException(f"{segment['file']} holds {len(data)} bytes, less than the offset and length of its segment")
+      space.addSegment(segment["base"], data[segment["offset"]:end], os.path.basename(segment["file"]))
+    return space
+
+  def addSegment(self, base:int, data, name:str = ""):
+    '''This function maps `data` (bytes, mmap, ...) at physical address `base`. Segments may not overlap'''
+    data = byteView(data)
+    end = base + len(data)
+    name = name or f"segment {len(self.segments)}"
+    for otherBase, otherEnd, otherName, _ in self.segments:
+      if base < otherEnd and otherBase < end:
+        raise VisualizationException(f"{name} ({hex(base)}-{hex(end-1)}) overlaps {otherName} ({hex(otherBase)}-{hex(otherEnd-1)})")
+    index = bisect.bisect(self.bases, base)
+    self.segments.insert(index, (base, end, name, data))
+    self.bases.insert(index, base)
+    self.pages.clear()
+
+  def ranges(self) -> list[tuple[int,int,str]]:
+    '''This function returns (first address, last address, name) of every segment, lowest first'''
+    return [(base, end - 1, name) for base, end, name, _ in self.segments if end > base]
+
+  def segmentAt(self, address:int) -> tuple[int,int,str,memoryview] | None:
+    '''This function returns the segment holding an address, if any'''
+    index = bisect.bisect(self.bases, address) - 1
+    if index >= 0 and address < self.segments[index][1]:
+      return self.segments[index]
+    return None
+
+  def page(self, pageNumber:int) -> list[tuple[int,int,memoryview]]:
+    '''This function returns the mapped pieces (start, end, view) of a page, translating it on first use'''
+    pieces = self.pages.get(pageNumber)
+    if pieces is not None:
+      self.hits += 1
+      self.pages.move_to_end(pageNumber)
+      return pieces
+    self.misses += 1
+    pageStart, pageEnd = pageNumber * pageSize, (pageNumber + 1) * pageSize
+    pieces = []
+    for base, end, _, data in self.segments[max(bisect.bisect(self.bases, pageStart) - 1, 0):]:
+      if base >= pageEnd:
+        break
+      start, stop = max(base, pageStart), min(end, pageEnd)
+      if start < stop:
+        pieces.append((start, stop, data[start - base : stop - base]))
+    self.pages[pageNumber] = pieces
+    if len(self.pages) > self.cachedPages:
+      self.pages.popitem(last=False)
+    return pieces
+
+  def unmapped(self, address:int, length:int, missing:int) -> VisualizationException:
+    '''This function describes a read of unmapped memory, naming the segments around the first missing address'''
+    index = bisect.bisect(self.bases, missing) - 1
+    below = f"after {self.segments[index][2]} (ends at {hex(self.segments[index][1]-1)})" if index >= 0 else "below every segment"
+    above = f", before {self.segments[index+1][2]} (starts at {hex(self.segments[index+1][0])})" if index + 1 < len(self.segments) else ""
+    mapped = ", ".join(f"{name} {hex(first)}-{hex(last)}" for first, last, name in self.ranges()) or "none"
+    return VisualizationException(f"Physical address {hex(missing)} of the {length} bytes read at {hex(address)} is not mapped: "
+                                  f"it is {below}{above}. Mapped ranges are {mapped}")
+
+  def read(self, address:int, length:int) -> memoryview | bytes:
+    '''
+    This function reads `length` bytes at a physical address. Reads inside a single segment are views
+    of the mapped data, reads spanning adjacent segments are copied into one bytes object.
+    '''
+    if address < 0 or length < 0:
+      raise VisualizationException(f"Can not read {length} bytes at {hex(address)}")
+    if length == 0:
+      return b""
+    if (address // pageSize) == ((address + length - 1) // pageSize):
+      # Reads inside one page are served by its cached translation
+      for start, end, view in self.page(address // pageSize):
+        if start <= address and address + length <= end:
+          return view[address - start : address - start + length]
+
+    pieces:list[memoryview] = []
+    cursor, last = address, address + length
+    while cursor < last:
+      segment = self.segmentAt(cursor)
+      if segment is None:
+        raise self.unmapped(address, length, cursor)
+      base, end, _, data = segment
+      stop = min(end, last)
+      pieces.append(data[cursor - base : stop - base])
+      cursor = stop
+    return pieces[0] if len(pieces) == 1 else b"".join(pieces)
+
+  def readPointer(self, address:int) -> int:
+    '''This function reads a 64-bit pointer, its dwords in the same order as `bytes2dwords` reads contexts'''
+    low, high = bytes2dwords(self.read(address, 8), 0, 2)
+    return (high << 32) | low
+
+  def readStructure(self, struct:str, address:int, length:int = 0) -> memoryview | bytes:
+    '''This function reads a data structure at a physical address: its registered size, or `length` bytes'''
+    return self.read(address, length or getStructure(struct)["size"])
+
+def deviceContextPointers(space:AddressSpace, dcbaap:int, maxSlots:int = maxDeviceSlots) -> Iterator[tuple[int,int]]:
+  '''
+  This function yields (Slot ID, Device Context address) of every slot with a non-zero DCBAA entry. The DCBAA
+  holds MaxSlotsEn + 1 entries, so at most `maxSlots` slots are read, and none past the end of the segment
+  holding the DCBAA: a DCBAA captured at its own size ends there, and the bytes of a segment right after it
+  are not slot pointers.
+  '''
+  segment = space.segmentAt(dcbaap)
+  if segment is None:
+    raise space.unmapped(dcbaap, 8, dcbaap)
+  capturedSlots = (segment[1] - dcbaap) // 8 - 1
+  for slotId in range(1, min(maxSlots, maxDeviceSlots, capturedSlots) + 1):
+    pointer = space.readPointer(dcbaap + slotId * 8) & ~0x3F
+    if pointer:
+      yield slotId, pointer
+
+def transferRings(space:AddressSpace, deviceContext) -> Iterator[tuple[int,int,memoryview | bytes | None]]:
+  '''
+  This function yields (DCI, TR Dequeue Pointer, TRB) for every endpoint of a device context that is not Disabled.
+  The TRB is the one the dequeue pointer points at, or None if no segment holds it.
+  '''
+  deviceContext = byteView(deviceContext)
+  for dci in range(1, 32):
+    endpoint = endpointContextFields(deviceContext[dci*32 : dci*32+32])
+    if endpoint["endpointState"] == 0:
+      continue
+    pointer = endpoint["trDequeuePointer"]
+    try:
+      yield dci, pointer, space.read(pointer, trbSize)
+    except VisualizationException:
+      yield dci, pointer, None
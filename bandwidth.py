@@ -0,0 +1,158 @@
+# Copyright (c) 2025 Darshan P. All rights reserved.
+
+# This work is licensed under the terms of the MIT license.
+# For a copy, see <https://opensource.org/licenses/MIT>.
+
+# This file estimates the periodic bandwidth the endpoints of one or many devices reserve.
+# Every periodic (Isoch/Interrupt) endpoint moves at most Max ESIT Payload bytes per
+# service interval. Endpoints are grouped into the bus segments they share, the root
+# ports and the Transaction Translators (TTs) of high-speed hubs, and the load of every
+# segment is compared with the share of its frames (or microframes) that the USB
+# specifications allow for periodic transfers. Protocol overhead is not counted, so the
+# figures are a lower bound of the real use.
+
+from typing import Iterable
+
+from builders.constants import VisualizationException, mapEPType, mapPortSpeed
+from builders.fields import slotContextFields, endpointContextFields, inputControlContextFields, endpointContextName
+
+# Endpoint types that reserve bandwidth: Isoch Out, Interrupt Out, Isoch In, Interrupt In
+periodicEndpointTypes = (1, 3, 5, 7)
+
+# Payload bytes a SuperSpeed (5 Gb/s, 8b/10b) and a SuperSpeedPlus Gen2 (10 Gb/s, 128b/132b) lane moves per microframe
+gen1LaneBytes = 5e9 * 8/10 / 8 / 8000
+gen2LaneBytes = 10e9 * 128/132 / 8 / 8000
+
+# Protocol Speed ID -> (length of a budget period in microseconds, bytes per period at the
+# signalling rate, share of the period allowed for periodic transfers)
+busBudgets:dict[int, tuple[int, float, float]] = {
+  1 : (1000, 1500,              0.9),   # Full-speed: 12 Mb/s, 90% of every frame
+  2 : (1000, 1500,              0.9),   # Low-speed devices share the full-speed frame
+  3 : (125,  7500,              0.8),   # High-speed: 480 Mb/s, 80% of every microframe
+  4 : (125,  gen1LaneBytes,     0.9),   # SuperSpeed Gen1 x1
+  5 : (125,  gen2LaneBytes,     0.9),   # SuperSpeedPlus Gen2 x1
+  6 : (125,  2 * gen1LaneBytes, 0.9),   # SuperSpeedPlus Gen1 x2
+  7 : (125,  2 * gen2LaneBytes, 0.9),   # SuperSpeedPlus Gen2 x2
+}
+
+# A low-speed bit lasts as long as 8 full-speed bits
+lowSpeedCost = 8
+
+# Size of a record and byte offset of its device context for the structures a budget can be computed of
+budgetStructures:dict[str, tuple[int,int]] = {
+  "devctx" : (1024, 0),
+  "ipctx"  : (1056, 32),
+}
+
+def esitPayload(endpoint:dict[str,int]) -> int:
+  '''
+  This function returns the bytes an endpoint moves per service interval: Max ESIT Payload, or when
+  software left it zero, Max Packet Size x (Max Burst Size + 1) x (Mult + 1)
+  '''
+  if endpoint["maxESITPayload"]:
+    return endpoint["maxESITPayload"]
+  return endpoint["maxPacketSize"] * (endpoint["maxBurstSize"] + 1) * (endpoint["mult"] + 1)
+
+def periodicEndpoints(device:bytes, addedOnly:int | None = None) -> list[dict]:
+  '''
+  This function lists the periodic endpoints of a device context that reserve bandwidth: those that are
+  not Disabled or, for the device context of an input context, those whose Add Context flag is set
+  (`addedOnly` holds the flags). Every entry holds the payload and service interval of the endpoint.
+  '''
+  endpoints:list[dict] = []
+  for dci in range(2, 32):
+    endpoint = endpointContextFields(list(device[dci*32 : dci*32+32]))
+    inUse = (addedOnly >> dci) & 1 if addedOnly is not None else endpoint["endpointState"] != 0
+    if not inUse or endpoint["epType"] not in periodicEndpointTypes:
+      continue
+    endpoints.append({
+      "dci"           : dci,
+      "name"          : endpointContextName(dci - 1).strip(),
+      "type"          : mapEPType(endpoint["epType"]),
+      "intervalUs"    : 125 * (1 << endpoint["interval"]),
+      "payload"       : esitPayload(endpoint),
+    })
+  return endpoints
+
+def segmentOf(slot:dict[str,int]) -> list[tuple]:
+  '''
+  This function returns the bus segments the periodic traffic of a device crosses. Everything crosses its
+  root port. Full-/low-speed devices behind a high-speed hub also cross the TT of that hub. Device contexts
+  do not carry the Multi-TT setting of their hub, so every hub is taken as having a single shared TT.
+  '''
+  segments:list[tuple] = [("Root Hub Port", slot["rootHubPortNumber"])]
+  if slot["speed"] in (1, 2) and slot["parentHubSlotId"]:
+    segments.append(("TT of Hub Slot", slot["parentHubSlotId"]))
+  return segments
+
+def bandwidthBudget(structName:str, captures:Iterable[tuple[str, bytes]]) -> dict:
+  '''
+  This function computes the periodic bandwidth use of every root port and TT the devices of `captures` are
+  attached to. Every capture holds one or more consecutive `structName` records (devctx or ipctx).
+  Loads are payload bytes per budget period: a frame for full-/low-speed segments, a microframe otherwise.
+  '''
+  structName = structName.strip().lower()
+  if structName not in budgetStructures:
+    raise VisualizationException(f"Bandwidth budgets of {structName} are not supported. Supported structures are {', '.join(budgetStructures)}")
+  recordSize, deviceOffset = budgetStructures[structName]
+
+  devices:list[dict] = []
+  for source, data in captures:
+    for record, offset in enumerate(range(0, len(data) - recordSize + 1, recordSize)):
+      device = bytes(data[offset + deviceOffset : offset + recordSize])
+      addedOnly = inputControlContextFields(list(data[offset:offset+32]))["addContextFlags"] if structName == "ipctx" else None
+      slot = slotContextFields(list(device[:32]))
+      devices.append({"source": source, "record": record, "slot": slot, "endpoints": periodicEndpoints(device, addedOnly)})
+
+  # A root port runs at the speed of the device attached to it (route string 0). Without its context,
+  # a port whose devices go through a TT is high-speed, otherwise the fastest of its devices is taken
+  attachedSpeeds:dict[int, int] = {}
+  inferredSpeeds:dict[int, int] = {}
+  for device in devices:
+    slot = device["slot"]
+    port = slot["rootHubPortNumber"]
+    if slot["routeString"] == 0:
+      attachedSpeeds[port] = slot["speed"]
+    else:
+      speed = 3 if slot["speed"] in (1, 2) and slot["parentHubSlotId"] else slot["speed"]
+      inferredSpeeds[port] = max(inferredSpeeds.get(port, 0), speed)
+  portSpeeds = {**inferredSpeeds, **attachedSpeeds}
+
+  segments:dict[tuple, dict] = {}
+  skipped:list[str] = []
+  for device in devices:
+    slot = device["slot"]
+    for segment in segmentOf(slot):
+      segmentSpeed = portSpeeds[segment[1]] if segment[0] == "Root Hub Port" else 1
+      if segmentSpeed not in busBudgets:
+        skipped.append(f"{device['source']} record {device['record']}: speed {mapPortSpeed(segmentSpeed)} of {segment[0]} {segment[1]} has no known budget")
+        continue
+      periodUs, periodBytes, periodicShare = busBudgets[segmentSpeed]
+      entry = segments.setdefault(segment, {"speed": mapPortSpeed(segmentSpeed), "periodUs": periodUs,
+                                            "limit": int(periodBytes * periodicShare), "load": 0.0, "endpoints": []})
+      for endpoint in device["endpoints"]:
+        # Average bytes per period: an endpoint serviced every 8 periods adds an eighth of its payload
+        load = endpoint["payload"] * periodUs / endpoint["intervalUs"]
+        if slot["speed"] == 2 and segmentSpeed in (1, 2):
+          load *= lowSpeedCost
+        entry["load"] += load
+        entry["endpoints"].append({**endpoint, "source": device["source"], "record": device["record"], "load": load})
+
+  for entry in segments.values():
+    entry["use"] = entry["load"] / entry["limit"]
+  return {"devices": len(devices), "segments": segments, "skipped": skipped}
+
+def budgetReport(result:dict) -> str:
+  '''This function formats the result of `bandwidthBudget` as a plain text report, busiest segments first'''
+  lines:list[str] = [f"Periodic bandwidth of {result['devices']} device(s), payload only (no protocol overhead)"]
+  for (kind, number), entry in sorted(result["segments"].items(), key=lambda item: -item[1]["use"]):
+    period = "frame" if entry["periodUs"] == 1000 else "microframe"
+    status = "OVER BUDGET" if entry["use"] > 1 else "ok"
+    lines.append(f"{kind} {number} ({entry['speed']}): {entry['load']:.0f} of {entry['limit']} bytes per {period} "
+                 f"({entry['use']:.1%}) {status}")
+    for endpoint in sorted(entry["endpoints"], key=lambda endpoint: -endpoint["load"]):
+      lines.append(f"  {endpoint['source']} record {endpoint['record']} DCI {endpoint['dci']:<2} {endpoint['type']:<13} "
+                   f"{endpoint['payload']:>6} bytes every {endpoint['intervalUs']:>7} us = {endpoint['load']:.0f} bytes per {period}")
+  for line in result["skipped"]:
+    lines.append(f"Skipped {line}")
+  return "\n".join(lines)
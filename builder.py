@@ -6,16 +6,65 @@
 # This file contains the core logic to process given data and 
 # build the final output.
 
-from graphviz import Digraph
-from builders.constants import VisualizationException, createInfoTable, supportedStructures
+from functools import lru_cache
+from typing import TYPE_CHECKING
+
+from builders.constants import VisualizationException, createInfoTable
+from builders.registry import getStructure, loadFunction
 from builders.content import *
 from builders.details import *
+from builders.fields import (slotContextLayout, endpointContextLayout, inputControlContextLayout, capabilityRegistersLayout, capabilityRegisterNames, operationalRegistersLayout,
+                             operationalRegisterNames, portRegisterSetColumns, portRegisterSetsOffset,
+                             portRegisterSetSize, capabilityRegisterFields)
+
+from builders.trbs import trbsDecoded
+from helpers import byteView
+from builders.capabilities import (extendedCapabilityLayouts, walkExtendedCapabilities, decodeExtendedCapability,
+                                   selectedCapabilityIds)
+
+# graphviz is only imported when a Digraph is actually created
+if TYPE_CHECKING:
+  from graphviz import Digraph
 
 
+# Maximum number of decoded context labels kept by each label cache
+labelCacheSize = 1024
+
+#########################################################################################
+# The following functions build labels of 32-byte contexts. They are memoized on the raw
+# bytes of the context (and its title), so identical contexts - like the many unused
+# endpoint contexts of a device context, or repeated configurations across the files of
+# a batch run - are decoded only once per process.
+#########################################################################################
+
+@lru_cache(maxsize=labelCacheSize)
+def slotContextLabel(segment:bytes, compact:bool = False) -> str:
+  '''This function builds the label of a slot context from its raw bytes'''
+  if compact and not any(segment):
+    return createInfoTable("Slot Context", zeroCompactTable(), "Not in use")
+  table = compactTable(slotContextLayout, segment) if compact else slotContext(segment)
+  return createInfoTable("Slot Context", table, slotContextDetails(segment))
+
+@lru_cache(maxsize=labelCacheSize)
+def endpointContextLabel(segment:bytes, endpointType:str, compact:bool = False) -> str:
+  '''This function builds the label of an endpoint context from its raw bytes and title'''
+  if compact and not any(segment):
+    return createInfoTable(f"Endpoint {endpointType}Context", zeroCompactTable(), "Not in use")
+  table = compactTable(endpointContextLayout, segment) if compact else endpointContext(segment)
+  return createInfoTable(f"Endpoint {endpointType}Context", table, endpointContextDetails(segment))
+
+@lru_cache(maxsize=labelCacheSize)
+def inputControlContextLabel(segment:bytes, compact:bool = False) -> str:
+  '''This function builds the label of an input control context from its raw bytes'''
+  if compact and not any(segment):
+    return createInfoTable(f"Input Control Context", zeroCompactTable(), "No context is added or dropped")
+  table = compactTable(inputControlContextLayout, segment) if compact else inputControlContextContext(segment)
+  return createInfoTable(f"Input Control Context", table, inputControlContextContextDetails(segment))
+
 #########################################################################################
 # The following functions contain builders for individual data structures
 #########################################################################################
-def buildSlotContext(byteData:list[int]) -> str:
+def buildSlotContext(byteData:list[int], compact:bool = False) -> str:
   '''
   This function builds visualization for slot context data structure
   '''
@@ -23,13 +72,9 @@ def buildSlotContext(byteData:list[int]) -> str:
   if len(byteData) < 16:
     raise VisualizationException(f"Expecting at-least 16 bytes of data. Got {len(byteData)} bytes")
   
-  # Get base data
-  slotDiagram = slotContext(byteData)
-  slotDescription = slotContextDetails(byteData)
-  
-  return createInfoTable("Slot Context",slotDiagram, slotDescription)
+  return slotContextLabel(bytes(byteView(byteData)[:32]), compact)
 
-def buildEndpointContext(byteData:list[int], endpointType:str = "") -> str:
+def buildEndpointContext(byteData:list[int], endpointType:str = "", compact:bool = False) -> str:
   '''
   This function takes in raw bytes, decodes it and creates a visualization of 
   endpoint context data structure. Endpoint number = -1 indicates that we don't know which
@@ -39,14 +84,10 @@ def buildEndpointContext(byteData:list[int], endpointType:str = "") -> str:
   if len(byteData) < 20: # 4 bytes per row *5 rows since remaining are 0
     raise VisualizationException(f"Expecting at-least 16 bytes of data. Got {len(byteData)} bytes")
 
-  # Get the content
-  endpointDiagram = endpointContext(byteData)
-  endpointDescription = endpointContextDetails(byteData)
-  
-  return createInfoTable(f"Endpoint {endpointType}Context",endpointDiagram, endpointDescription)
+  return endpointContextLabel(bytes(byteView(byteData)[:32]), endpointType, compact)
 
 
-def buildInputControlContext(byteData:list[int]) -> str:
+def buildInputControlContext(byteData:list[int], compact:bool = False) -> str:
   '''
   This function takes in raw bytes, decodes it and creates a visualization of 
   input control context data structure.
@@ -55,19 +96,101 @@ def buildInputControlContext(byteData:list[int]) -> str:
   if len(byteData) < 32:
     raise VisualizationException(f"Expecting 32 bytes of data. Got {len(byteData)} bytes")
 
-  # Get the content
-  inputCtrlCtxData = inputControlContextContext(byteData)
-  inputCtrlCtxDataDescription = inputControlContextContextDetails(byteData)
+  return inputControlContextLabel(bytes(byteView(byteData)[:32]), compact)
+
+
+def buildCapabilityRegisters(byteData:list[int]) -> str:
+  '''
+  This function takes in raw bytes from the Capability Base and creates a visualization
+  of the host controller capability registers.
+  '''
+  
+  if len(byteData) < 32:
+    raise VisualizationException(f"Expecting 32 bytes of capability registers. Got {len(byteData)} bytes")
+  
+  registers = registerBlock(capabilityRegistersLayout, capabilityRegisterNames, byteData[:32])
+  registersDescription = capabilityRegistersDetails(byteData)
+  
+  return createInfoTable("Capability Registers", registers, registersDescription)
+
+def buildOperationalRegisters(byteData:list[int]) -> str:
+  '''
+  This function takes in raw bytes from the Operational Base and creates a visualization
+  of the host controller operational registers (USBCMD up to CONFIG).
+  '''
+  
+  if len(byteData) < 60:
+    raise VisualizationException(f"Expecting 60 bytes of operational registers. Got {len(byteData)} bytes")
+  
+  registers = registerBlock(operationalRegistersLayout, operationalRegisterNames, byteData[:60])
+  registersDescription = operationalRegistersDetails(byteData)
+  
+  return createInfoTable("Operational Registers", registers, registersDescription)
+
+def buildPortRegisterSets(byteData:list[int], count:int = 0, note:str = "") -> str:
+  '''
+  This function takes in raw bytes starting at the first Port Register Set and creates one
+  compact table for all of them. If count is 0, every complete set in the data is decoded.
+  '''
+  
+  if len(byteData) < portRegisterSetSize:
+    raise VisualizationException(f"Expecting at-least {portRegisterSetSize} bytes per Port Register Set. Got {len(byteData)} bytes")
+  
+  count = count if count else len(byteData) // portRegisterSetSize
+  portSets = portRegisterSetsTable(portRegisterSetColumns(byteData, count))
   
-  return createInfoTable(f"Input Control Context",inputCtrlCtxData, inputCtrlCtxDataDescription)
+  return createInfoTable(f"Port Register Sets 1 - {count}", portSets, note if note else "PORTSC, PORTPMSC, PORTLI and PORTHLPMC per port")
+
+def buildTRBs(byteData:list[int]) -> str:
+  '''
+  This function takes in any number of consecutive 16-byte TRBs, decodes each of them with the
+  layout of its TRB Type and creates a single table with one row per TRB.
+  '''
+  trbs = trbsDecoded(byteData)
+  counts:dict[str,int] = {}
+  for trb in trbs:
+    counts[trb["trbTypeName"]] = counts.get(trb["trbTypeName"], 0) + 1
+  summary = ", ".join(f"{count} {name}" for name, count in counts.items())
+  return createInfoTable(f"TRBs 0 - {len(trbs) - 1}", trbTable(trbs), summary)
 
+def buildExtendedCapability(byteData:list[int], capability:dict) -> str:
+  '''
+  This function decodes a single Extended Capability (as found by the xECP walker) out of an
+  MMIO dump and creates its register table. Supported Protocol also gets its PSI table.
+  '''
+  decoded = decodeExtendedCapability(byteData, capability)
+  layout, registerNames, size = extendedCapabilityLayouts[capability["id"]]
+  offset = capability["offset"]
+  registers = registerBlock(layout, registerNames, byteData[offset:offset+size*4], offset)
+  fields = decoded["fields"]
+  
+  match capability["id"]:
+    case 1:
+      description = f"BIOS Owned = {fields.get('HCBIOSOwned', 0)}, OS Owned = {fields.get('HCOSOwned', 0)}"
+    case 2:
+      ports = decoded.get("ports")
+      description = f"{fields.get('NameString', '')} {decoded['revision']}"
+      description += f" on Root Hub Ports {ports[0]} - {ports[1]}" if ports and ports[1] >= ports[0] else " on no Root Hub Ports"
+      description += f", Protocol Slot Type {fields.get('ProtocolSlotType', 0)}"
+      if decoded["speeds"]:
+        registers += protocolSpeedTable(decoded["speeds"])
+      else:
+        description += ", default speeds (no PSI)"
+    case 10:
+      description = f"DbC {'Enabled' if fields.get('DCE') else 'Disabled'}, {'Running' if fields.get('DCR') else 'Not Running'}"
+      if fields.get("DebugPortNumber"):
+        description += f" on Root Hub Port {fields['DebugPortNumber']}"
+    case _:
+      description = capability["name"]
+  
+  return createInfoTable(f"{capability['name']} ({format(offset,'04X')}H)", registers, description)
 
 #########################################################################################
 # The following functions contain logic for building chained/grouped data structures 
 # containing more than 1 data structure
 #########################################################################################
 
-def buildDeviceContext(byteData:list[int], name:str="head", names:list[str]=[]) -> dict[str,str]:
+def buildDeviceContext(byteData:list[int], name:str="head", names:list[str]=[], compact:bool = False) -> dict[str,str]:
   '''
   This function takes in raw data, processes it and builds a complex visualization of the 
   device context data structure.
@@ -82,12 +205,14 @@ def buildDeviceContext(byteData:list[int], name:str="head", names:list[str]=[])
   # Create a list of dict to be returned
   deviceContextDS:dict[str,str] = {}
   
-  # First split into slot data segment and endpoints data segment
-  slotSegment:list[int] = byteData[:32] # 4 bytes per row * 8 rows
-  endpointSegments:list[int] = byteData[32:] # Remaining Bytes will be for endpoint context
+  # First split into slot data segment and endpoints data segment. Segments are views of
+  # the given bytes, so no context is copied before it is decoded
+  byteData = byteView(byteData)
+  slotSegment = byteData[:32] # 4 bytes per row * 8 rows
+  endpointSegments = byteData[32:] # Remaining Bytes will be for endpoint context
   
   # Build Slot Context
-  slotContext = buildSlotContext(slotSegment)
+  slotContext = buildSlotContext(slotSegment, compact)
   
   names.append(name)
   
@@ -104,11 +229,11 @@ def buildDeviceContext(byteData:list[int], name:str="head", names:list[str]=[])
     name = f"Endpoint Context {endpointType}"
     names.append(name)
     endpointSegment = endpointSegments[(endpointNumber*32) : (endpointNumber+1)*32]
-    deviceContextDS[names[-1]] = buildEndpointContext(endpointSegment,endpointType)
+    deviceContextDS[names[-1]] = buildEndpointContext(endpointSegment,endpointType,compact)
 
   return deviceContextDS
 
-def buildInputContext(byteData:list[int], name:str="head", names:list[str] = []) -> Digraph:
+def buildInputContext(byteData:list[int], name:str="head", names:list[str] = [], compact:bool = False) -> dict[str,str]:
   '''
   This function takes in raw bytes and builds input context data structure.
   Input Context Data Structure is nothing but a combination if Input Control Context
@@ -128,44 +253,112 @@ def buildInputContext(byteData:list[int], name:str="head", names:list[str] = [])
   
   ds:dict[str, str] = {} # This dictionary holds our Data Structures
 
-  # Separate data for input control context and device context
+  # Separate data for input control context and device context (views, like in buildDeviceContext)
+  byteData = byteView(byteData)
   inputControlCtxData = byteData[:32]
   deviceCtxData = byteData[32:]
   
   # First build Input Control Context Data Structure
-  inputCtrlCtx = buildInputControlContext(inputControlCtxData)
+  inputCtrlCtx = buildInputControlContext(inputControlCtxData, compact)
   
   # Put data into dictionary
   ds[name] = inputCtrlCtx
   names.append(name)
   
   # Build Device Context Data
-  deviceCtx = buildDeviceContext(deviceCtxData, "Slot Context", names)
+  deviceCtx = buildDeviceContext(deviceCtxData, "Slot Context", names, compact)
 
   # Merge both
   ds.update(deviceCtx)
 
   return ds
 
+def buildMMIORegisters(byteData:list[int], name:str="head", names:list[str]=[]) -> dict[str,str]:
+  '''
+  This function takes in a dump of the MMIO register space starting at the Capability Base
+  and builds the capability registers, operational registers and all MaxPorts Port Register Sets.
+  '''
+  
+  if len(byteData) < 32:
+    raise VisualizationException(f"MMIO Registers expect at-least 32 bytes as input. Got {len(byteData)} bytes instead")
+  
+  ds:dict[str,str] = {}
+  byteData = byteView(byteData)
+  
+  capabilities = capabilityRegisterFields(byteData)
+  operationalBase = capabilities["CAPLENGTH"]
+  if operationalBase < 32 or len(byteData) < operationalBase + 60:
+    raise VisualizationException(f"Operational Registers at {hex(operationalBase)} are not part of the {len(byteData)} bytes of data")
+  
+  ds[name] = buildCapabilityRegisters(byteData)
+  names.append(name)
+  
+  names.append("Operational Registers")
+  ds[names[-1]] = buildOperationalRegisters(byteData[operationalBase:])
+  
+  # Decode as many of the MaxPorts Port Register Sets as the dump holds
+  portsBase = operationalBase + portRegisterSetsOffset
+  availablePorts = max(len(byteData) - portsBase, 0) // portRegisterSetSize
+  count = min(capabilities["MaxPorts"], availablePorts)
+  if count:
+    note = f"MaxPorts = {capabilities['MaxPorts']}"
+    if count < capabilities["MaxPorts"]:
+      note += f". Only {count} Port Register Sets are part of the data"
+    names.append("Port Register Sets")
+    ds[names[-1]] = buildPortRegisterSets(byteData[portsBase:], count, note)
+  
+  return ds
+
+def buildExtendedCapabilities(byteData:list[int], name:str="head", names:list[str]=[], capabilities:str | None = None) -> dict[str,str]:
+  '''
+  This function takes in a dump of the MMIO register space starting at the Capability Base, walks
+  its Extended Capabilities list and builds the compact chain of all capabilities. Only the
+  capabilities whose IDs are selected by `capabilities` (like "2,10" or "all") are decoded
+  and get a node of their own.
+  '''
+  selected = selectedCapabilityIds(capabilities)
+  chain = list(walkExtendedCapabilities(byteData))
+  if not chain:
+    raise VisualizationException("The controller has no Extended Capabilities (HCCPARAMS1.xECP is 0)")
+  
+  ds:dict[str,str] = {}
+  names.append(name)
+  ds[name] = createInfoTable("Extended Capabilities", extendedCapabilitiesTable(chain),
+                             f"{sum(1 for capability in chain if capability['id'] is not None)} capabilities, starting at {format(chain[0]['offset'],'04X')}H")
+  
+  for capability in chain:
+    if capability["id"] in selected and capability["id"] in extendedCapabilityLayouts:
+      names.append(f"{capability['name']} {format(capability['offset'],'04X')}H")
+      ds[names[-1]] = buildExtendedCapability(byteData, capability)
+  
+  return ds
+
 #########################################################################################
 # The following functions contain logic to decode inputs and call appropriate builders
 #########################################################################################
 
-def createStandaloneDS(byteData:list[int], struct:str, names:list[str] = []) -> Digraph:
+def builderOptions(struct:str, options:dict) -> dict:
+  '''This function returns the given rendering options that the structure's builder takes'''
+  accepted = getStructure(struct)["options"]
+  return {option: value for option, value in options.items() if option in accepted and value}
+
+def buildStandaloneContent(byteData:list[int], struct:str, **options) -> str:
+  '''
+  This function builds the label of an individual data structure instead of
+  grouped data structures
+  '''
+  if getStructure(struct)["grouped"]:
+    raise VisualizationException(f"{struct} is a grouped data structure")
+  return loadFunction(struct, "builder")(byteData, **builderOptions(struct, options))
+
+def createStandaloneDS(byteData:list[int], struct:str, names:list[str] = []) -> "Digraph":
   '''
   This function helps visualize individual data structures instead of
   grouped data structures
   '''
-  content = ""
-  match (struct.strip().lower()):
-    case "slotctx":
-      content =  buildSlotContext(byteData)
-    case "endpctx":
-      content =  buildEndpointContext(byteData)
-    case "icctx":
-      content = buildInputControlContext(byteData)
-    case _:
-      raise VisualizationException(f"Invalid Data Structure codename {struct}")
+  from graphviz import Digraph
+
+  content = buildStandaloneContent(byteData, struct)
 
   # Create a Digraph and add this standalone data structure
   dot = Digraph()
@@ -175,28 +368,33 @@ def createStandaloneDS(byteData:list[int], struct:str, names:list[str] = []) ->
   dot.node(names[-1], content, shape='none')
   return dot
 
-def processAndBuildData(struct:str, byteData:list[int], names:list[str]=[]) -> Digraph:
+def buildNodes(struct:str, byteData:list[int], names:list[str]=[], **options) -> dict[str,str]:
   '''
-  This function is responsible for processing input and selecting data structure
-  to create the final visuals. The function can process individual data structures
-  like Slot Context, Endpoint Context, TRB etc. Or complex/combined data structures
-  like Device Context Data Structure, Input Context Data Structure etc.
+  This function builds the labels of every node of a data structure, in the order
+  in which they are chained. Individual data structures give a single "head" node.
+  The builder is looked up in the structure registry and given the `options` it takes.
   '''
+  if getStructure(struct)["grouped"]:
+    return loadFunction(struct, "builder")(byteData, names=names, **builderOptions(struct, options))
   
-  result:dict[str,str] = {}
-      
-  match struct:
-    case "devctx":
-      result = buildDeviceContext(byteData, names=names)
-    case "ipctx":
-      result = buildInputContext(byteData, names=names)
-    case _:
-        # Creates standalone data structures and directly return them
-        return createStandaloneDS(byteData, struct, names)
-      
+  content = buildStandaloneContent(byteData, struct, **options)
+  names.append("head")
+  return {names[-1]: content}
+
+def createDigraph(result:dict[str,str], compact:bool = False) -> "Digraph":
+  '''
+  This function creates a Digraph out of built nodes and chains them in order.
+  Graphs of compact tables get a single bit-index header above the first node.
+  '''
+  from graphviz import Digraph
+
   dot = Digraph()
   dot.clear()
   
+  if compact and result:
+    dot.node("Bit Index", bitIndexHeader(), shape='none')
+    dot.edge("Bit Index", next(iter(result)), style='invis')
+  
   # Build all nodes
   for name, content in result.items():
     # Create nodes
@@ -209,3 +407,22 @@ def processAndBuildData(struct:str, byteData:list[int], names:list[str]=[]) -> D
     dot.edge(names[i], names[i+1])
 
   return dot
+
+def compactHeader(struct:str, **options) -> str | None:
+  '''
+  This function returns the bit-index header the nodes of `struct` share when they are drawn as
+  compact tables, or None. Renderers that lay nodes out on their own put it above them.
+  '''
+  if options.get("compact", False) and "compact" in getStructure(struct)["options"]:
+    return bitIndexHeader()
+  return None
+
+def processAndBuildData(struct:str, byteData:list[int], names:list[str]=[], **options) -> "Digraph":
+  '''
+  This function is responsible for processing input and selecting data structure
+  to create the final visuals. The function can process individual data structures
+  like Slot Context, Endpoint Context, TRB etc. Or complex/combined data structures
+  like Device Context Data Structure, Input Context Data Structure etc.
+  Passing `compact=True` draws one cell per field instead of one cell per bit.
+  '''
+  return createDigraph(buildNodes(struct, byteData, names, **options), compactHeader(struct, **options) is not None)
@@ -0,0 +1,265 @@
+# Copyright (c) 2025 Darshan P. All rights reserved.
+
+# This work is licensed under the terms of the MIT license.
+# For a copy, see <https://opensource.org/licenses/MIT>.
+
+# This file walks the list of xHCI Extended Capabilities of an MMIO dump and decodes
+# the known capabilities. HCCPARAMS1.xECP points to the first capability and every
+# capability holds the offset of the next one. Walking only reads the capability
+# headers, the body of a capability is decoded when it is asked for.
+
+from typing import Iterator
+
+from builders.constants import VisualizationException
+from builders.fields import extractFields, capabilityRegisterFields
+from helpers import bytes2dwords
+
+# Names of the Extended Capability IDs defined by the specification
+extendedCapabilityNames:dict[int,str] = {
+  1  : "USB Legacy Support",
+  2  : "Supported Protocol",
+  3  : "Extended Power Management",
+  4  : "I/O Virtualization",
+  5  : "Message Interrupt",
+  6  : "Local Memory",
+  10 : "USB Debug Capability",
+  17 : "Extended Message Interrupt",
+}
+
+# Upper bound on the number of capabilities walked, in case the list does not terminate
+maxExtendedCapabilities = 256
+
+def extendedCapabilityName(capabilityId:int) -> str:
+  '''This function returns the name of an Extended Capability ID'''
+  if capabilityId in extendedCapabilityNames:
+    return extendedCapabilityNames[capabilityId]
+  return "Vendor Defined" if capabilityId >= 192 else "Reserved"
+
+#########################################################################################
+# Layouts of the known capabilities. Dword indexes are relative to the capability.
+#########################################################################################
+
+legacySupportLayout:list[tuple[str,int,int,int]] = [
+  ("HCBIOSOwned",           0, 16,  1),
+  ("HCOSOwned",             0, 24,  1),
+  ("USBSMIEnable",          1,  0,  1),
+  ("SMIOnHostSystemErrorEnable", 1, 4, 1),
+  ("SMIOnOSOwnershipEnable", 1, 13, 1),
+  ("SMIOnPCICommandEnable", 1, 14,  1),
+  ("SMIOnBAREnable",        1, 15,  1),
+  ("SMIOnEventInterrupt",   1, 16,  1),
+  ("SMIOnHostSystemError",  1, 20,  1),
+  ("SMIOnOSOwnershipChange",1, 29,  1),
+  ("SMIOnPCICommand",       1, 30,  1),
+  ("SMIOnBAR",              1, 31,  1),
+]
+legacySupportNames:dict[int,str] = {
+  0 : "USBLEGSUP",
+  1 : "USBLEGCTLSTS",
+}
+
+supportedProtocolLayout:list[tuple[str,int,int,int]] = [
+  ("RevisionMinor",         0, 16,  8),
+  ("RevisionMajor",         0, 24,  8),
+  ("NameString",            1,  0, 32),
+  ("CompatiblePortOffset",  2,  0,  8),
+  ("CompatiblePortCount",   2,  8,  8),
+  ("ProtocolDefined",       2, 16, 12),
+  ("PSIC",                  2, 28,  4),
+  ("ProtocolSlotType",      3,  0,  5),
+]
+supportedProtocolNames:dict[int,str] = {
+  0 : "Revision",
+  1 : "Name String",
+  2 : "Ports / PSIC",
+  3 : "Protocol Slot Type",
+}
+
+# Every Protocol Speed ID dword follows the same layout
+protocolSpeedLayout:list[tuple[str,int,int,int]] = [
+  ("PSIV",                  0,  0,  4),
+  ("PSIE",                  0,  4,  2),
+  ("PLT",                   0,  6,  2),
+  ("PFD",                   0,  8,  1),
+  ("LP",                    0, 14,  2),
+  ("PSIM",                  0, 16, 16),
+]
+protocolSpeedExponents = {0: "b/s", 1: "Kb/s", 2: "Mb/s", 3: "Gb/s"}
+protocolLinkTypes = {0: "Symmetric", 1: "Reserved", 2: "Asymmetric Rx", 3: "Asymmetric Tx"}
+protocolLinkProtocols = {0: "SS", 1: "SSP", 2: "Reserved", 3: "Reserved"}
+
+extendedPowerManagementLayout:list[tuple[str,int,int,int]] = [
+  ("PMC",                   0, 16, 16),
+  ("PowerState",            1,  0,  2),
+  ("PMCSR",                 1,  0, 16),
+  ("PMCSR_BSE",             1, 16,  8),
+  ("Data",                  1, 24,  8),
+]
+extendedPowerManagementNames:dict[int,str] = {
+  0 : "PMC",
+  1 : "PMCSR / Data",
+}
+
+debugCapabilityLayout:list[tuple[str,int,int,int]] = [
+  ("DCERSTMax",             0, 16,  5),
+  ("DBTarget",              1,  8,  8),
+  ("ERSTSize",              2,  0, 16),
+  ("Rsvd",                  4,  0,  4),
+  ("DCERSTBALo",            4,  4, 28),
+  ("DCERSTBAHi",            5,  0, 32),
+  ("DESI",                  6,  0,  3),
+  ("DCERDPLo",              6,  4, 28),
+  ("DCERDPHi",              7,  0, 32),
+  ("DCR",                   8,  0,  1),
+  ("LSE",                   8,  1,  1),
+  ("HOT",                   8,  2,  1),
+  ("HIT",                   8,  3,  1),
+  ("DRC",                   8,  4,  1),
+  ("DebugMaxBurstSize",     8, 16,  8),
+  ("DeviceAddress",         8, 24,  7),
+  ("DCE",                   8, 31,  1),
+  ("ER",                    9,  0,  1),
+  ("SBR",                   9,  1,  1),
+  ("DebugPortNumber",       9, 24,  8),
+  ("CCS",                  10,  0,  1),
+  ("PED",                  10,  1,  1),
+  ("PR",                   10,  4,  1),
+  ("PLS",                  10,  5,  4),
+  ("PortSpeed",            10, 10,  4),
+  ("CSC",                  10, 17,  1),
+  ("PRC",                  10, 21,  1),
+  ("PLC",                  10, 22,  1),
+  ("CEC",                  10, 23,  1),
+  ("Rsvd",                 12,  0,  4),
+  ("DCCPLo",               12,  4, 28),
+  ("DCCPHi",               13,  0, 32),
+  ("DbCProtocol",          14,  0,  8),
+  ("VendorID",             14, 16, 16),
+  ("ProductID",            15,  0, 16),
+  ("DeviceRevision",       15, 16, 16),
+]
+debugCapabilityNames:dict[int,str] = {
+  0  : "DCID",
+  1  : "DCDB",
+  2  : "DCERSTSZ",
+  4  : "DCERSTBA (Lo)",
+  5  : "DCERSTBA (Hi)",
+  6  : "DCERDP (Lo)",
+  7  : "DCERDP (Hi)",
+  8  : "DCCTRL",
+  9  : "DCST",
+  10 : "DCPORTSC",
+  12 : "DCCP (Lo)",
+  13 : "DCCP (Hi)",
+  14 : "DCDDI1",
+  15 : "DCDDI2",
+}
+
+# Capability ID -> (layout, register names, size in dwords) of the capabilities that are decoded
+extendedCapabilityLayouts:dict[int, tuple[list[tuple[str,int,int,int]], dict[int,str], int]] = {
+  1  : (legacySupportLayout, legacySupportNames, 2),
+  2  : (supportedProtocolLayout, supportedProtocolNames, 4),
+  3  : (extendedPowerManagementLayout, extendedPowerManagementNames, 2),
+  10 : (debugCapabilityLayout, debugCapabilityNames, 16),
+}
+
+#########################################################################################
+# Walking and decoding
+#########################################################################################
+
+def walkExtendedCapabilities(data:list[int], limit:int = maxExtendedCapabilities) -> Iterator[dict]:
+  '''
+  This function follows the Extended Capabilities list of an MMIO dump (starting at the Capability Base)
+  and yields the header of every capability: its byte offset, ID, name and the offset of the next one.
+  Only the header dwords are read. Walking stops at the end of the list, at a pointer outside of the
+  dump, at a capability seen before (a loop) or after `limit` capabilities. In the last three cases
+  a final entry holding an "error" message is yielded.
+  '''
+  if len(data) < 32:
+    raise VisualizationException(f"Extended Capabilities need the Capability Registers (32 bytes). Got {len(data)} bytes")
+  offset = capabilityRegisterFields(data)["xECP"] * 4
+  visited:set[int] = set()
+
+  while offset:
+    error = ""
+    if offset in visited:
+      error = f"Loop: capability at {format(offset,"04X")}H was already visited"
+    elif offset + 4 > len(data):
+      error = f"Capability at {format(offset,"04X")}H is outside of the {len(data)} bytes of data"
+    elif len(visited) >= limit:
+      error = f"More than {limit} capabilities. Walk stopped at {format(offset,"04X")}H"
+    if error:
+      yield {"offset": offset, "id": None, "name": None, "next": 0, "error": error}
+      return
+
+    visited.add(offset)
+    header = bytes2dwords(data, offset, 1)[0]
+    capabilityId = header & 0xFF
+    nextPointer = (header >> 8) & 0xFF
+    nextOffset = offset + nextPointer * 4 if nextPointer else 0
+    yield {"offset": offset, "id": capabilityId, "name": extendedCapabilityName(capabilityId), "next": nextOffset}
+    offset = nextOffset
+
+def protocolSpeedIDs(dwords:list[int]) -> list[dict[str,int|str]]:
+  '''This function decodes Protocol Speed ID dwords of a Supported Protocol capability'''
+  speeds:list[dict[str,int|str]] = []
+  for dword in dwords:
+    speed:dict[str,int|str] = extractFields(protocolSpeedLayout, [dword])
+    speed["speed"] = f"{speed['PSIM']} {protocolSpeedExponents[speed['PSIE']]}"
+    speed["linkType"] = protocolLinkTypes[speed["PLT"]]
+    speed["linkProtocol"] = protocolLinkProtocols[speed["LP"]]
+    speeds.append(speed)
+  return speeds
+
+def decodeExtendedCapability(data:list[int], capability:dict) -> dict:
+  '''
+  This function decodes the body of a capability found by `walkExtendedCapabilities`. Returns a copy of
+  the header with its "fields" (and for Supported Protocol, its "speeds" and port range) added.
+  Capabilities that are not decoded (reserved, vendor defined etc.) get empty fields.
+  '''
+  decoded = dict(capability)
+  decoded["fields"] = {}
+  if capability["id"] not in extendedCapabilityLayouts:
+    return decoded
+
+  layout, _, size = extendedCapabilityLayouts[capability["id"]]
+  offset = capability["offset"]
+  dwords = bytes2dwords(data, offset, size)
+  fields = extractFields(layout, dwords)
+
+  match capability["id"]:
+    case 2:
+      fields["NameString"] = fields.get("NameString", 0).to_bytes(4, 'little').decode('ascii', 'replace').strip("\x00 ")
+      # Revisions are BCD, 0x0310 is USB 3.1
+      minor = fields.get("RevisionMinor", 0)
+      decoded["revision"] = f"{fields.get('RevisionMajor', 0):X}.{minor >> 4:X}" + (f"{minor & 0xF:X}" if minor & 0xF else "")
+      if "CompatiblePortCount" in fields:
+        decoded["ports"] = [fields["CompatiblePortOffset"], fields["CompatiblePortOffset"] + fields["CompatiblePortCount"] - 1]
+      psiCount = fields.get("PSIC", 0)
+      decoded["speeds"] = protocolSpeedIDs(bytes2dwords(data, offset+16, psiCount))
+    case 10:
+      fields["DCERSTBA"] = (fields.get("DCERSTBAHi", 0) << 32) | (fields.get("DCERSTBALo", 0) << 4)
+      fields["DCERDP"] = (fields.get("DCERDPHi", 0) << 32) | (fields.get("DCERDPLo", 0) << 4)
+      fields["DCCP"] = (fields.get("DCCPHi", 0) << 32) | (fields.get("DCCPLo", 0) << 4)
+
+  decoded["fields"] = fields
+  return decoded
+
+def extendedCapabilitiesDecoded(data:list[int]) -> list[dict]:
+  '''This function walks and decodes every Extended Capability of an MMIO dump'''
+  return [decodeExtendedCapability(data, capability) if capability["id"] is not None else capability
+          for capability in walkExtendedCapabilities(data)]
+
+def selectedCapabilityIds(selection:str | None) -> set[int]:
+  '''
+  This function parses a comma separated list of Extended Capability IDs (decimal or 0x hex) to render
+  in detail. "all" selects every capability that can be decoded, None selects none.
+  '''
+  if not selection:
+    return set()
+  if selection.strip().lower() == "all":
+    return set(extendedCapabilityLayouts)
+  try:
+    return {int(item, 0) for item in selection.replace(" ", "").split(",") if item}
+  except ValueError:
+    raise VisualizationException(f"Invalid capability IDs {selection}. Expecting comma separated IDs like 2,10 or all")
@@ -10,17 +10,10 @@ class VisualizationException(Exception):
   pass
 
 
-# Define widths for codename and description for better looks in help message
+# Define widths for codename and description for better looks in help message.
+# The list of supported data structures lives in builders/registry.py
 codenameWidth = 12
 descriptionWidth = 24
-# This holds the list of supported data structures for the tool
-supportedStructures:dict[str, str] = {
-    "slotctx "    : "Slot Context",
-    "endpctx "    : "Endpoint Context",
-    "icctx"       : "Input Control Context",
-    "devctx "     : "Device Context",
-    "ipctx "      : "Input Context",
-}
 
 # This function returns a data structure and its description graph item by
 # using them on a template
@@ -56,51 +49,182 @@ def mapRouteString(routeBytes:list[int]) -> list[int]:
     (routeBytes[3] & 0xF)
     ]
 
+# The following maps hold the meaning of enumerated field values. They are kept at
+# module level so that decoders and validators share a single source of truth.
+ttThinkTimeMap:dict[int, str] = {
+  0 : "TT requires at most 8 FS bit times of inter-transaction gap on a full-/low-speed downstream bus.",
+  1 : "TT requires at most 16 FS bit times.",
+  2 : "TT requires at most 24 FS bit times.",
+  3 : "TT requires at most 32 FS bit times."
+}
+
+slotStateMap:dict[int, str] = {
+  0 : "Disabled/Enabled State",
+  1 : "Default State",
+  2 :"Addressed State",
+  3 :"Configured State"
+}
+
+endpointStateMap:dict[int, str] = {
+  0 : "Disabled",
+  1 : "Running",
+  2 : "Halted",
+  3 : "Stopped",
+  4 : "Error"
+}
+
+epTypeMap:dict[int, str] = {
+  1 : "Isoch Out",
+  2 : "Bulk Out",
+  3 : "Interrupt Out",
+  4 : "Control - Bidirectional",
+  5 : "Isoch In",
+  6 : "Bulk In",
+  7 : "Interrupt In",
+}
+
 def mapTTThinkTime(bit2ttThinkTime:int) -> str :
   '''This function maps a 2-bit think time value to respective description'''
-  ttThinkTimeMap = {
-    0 : "TT requires at most 8 FS bit times of inter-transaction gap on a full-/low-speed downstream bus.",
-    1 : "TT requires at most 16 FS bit times.",
-    2 : "TT requires at most 24 FS bit times.",
-    3 : "TT requires at most 32 FS bit times."
-  }
   return ttThinkTimeMap.get(bit2ttThinkTime, "Invalid Input Given")
 
 def mapSlotState(bit5SlotStateCode:int) -> str:
   ''' This function maps a 5-bit slot state to string equivalent'''
-  slotStates = {
-    0 : "Disabled/Enabled State",
-    1 : "Default State",
-    2 :"Addressed State",
-    3 :"Configured State"
-  }
-  
-  return slotStates.get(bit5SlotStateCode,"Reserved")
+  return slotStateMap.get(bit5SlotStateCode,"Reserved")
 
 def mapEndpointState(bit3EpState:int) -> str:
   '''This function maps a 3-bit endpoint state code to respective string'''
-  endpointStateMap = {
-    0 : "Disabled",
-    1 : "Running",
-    2 : "Halted",
-    3 : "Stopped",
-    4 : "Error"
-  }
-  
   return endpointStateMap.get(bit3EpState,"Reserved")
 
 def mapEPType(bit3EpTypeCode:int) -> str:
   '''This function maps a 3-bit endpoint code to respective type and direction string'''
-  epTypeMap = {
-    1 : "Isoch Out",
-    2 : "Bulk Out",
-    3 : "Interrupt Out",
-    4 : "Control - Bidirectional",
-    5 : "Isoch In",
-    6 : "Bulk In",
-    7 : "Interrupt In",
-  }
-  
   return epTypeMap.get(bit3EpTypeCode, "Invalid Type!")
 
+portLinkStateMap:dict[int, str] = {
+  0  : "U0",
+  1  : "U1",
+  2  : "U2",
+  3  : "U3 (Suspended)",
+  4  : "Disabled",
+  5  : "RxDetect",
+  6  : "Inactive",
+  7  : "Polling",
+  8  : "Recovery",
+  9  : "Hot Reset",
+  10 : "Compliance Mode",
+  11 : "Test Mode",
+  15 : "Resume",
+}
+
+# Default Protocol Speed IDs. Controllers may define others using the Supported Protocol Capability
+portSpeedMap:dict[int, str] = {
+  0 : "—",
+  1 : "Full-speed",
+  2 : "Low-speed",
+  3 : "High-speed",
+  4 : "SuperSpeed Gen1 x1",
+  5 : "SuperSpeedPlus Gen2 x1",
+  6 : "SuperSpeedPlus Gen1 x2",
+  7 : "SuperSpeedPlus Gen2 x2",
+}
+
+portIndicatorMap:dict[int, str] = {
+  0 : "Off",
+  1 : "Amber",
+  2 : "Green",
+  3 : "Undefined",
+}
+
+def mapPortLinkState(bit4PLS:int) -> str:
+  '''This function maps a 4-bit port link state to respective string'''
+  return portLinkStateMap.get(bit4PLS, "Reserved")
+
+def mapPortSpeed(bit4PortSpeed:int) -> str:
+  '''This function maps a 4-bit Protocol Speed ID to respective string'''
+  return portSpeedMap.get(bit4PortSpeed, f"PSIV {bit4PortSpeed}")
+
+trbTypeMap:dict[int, str] = {
+  1  : "Normal",
+  2  : "Setup Stage",
+  3  : "Data Stage",
+  4  : "Status Stage",
+  5  : "Isoch",
+  6  : "Link",
+  7  : "Event Data",
+  8  : "No Op",
+  9  : "Enable Slot Command",
+  10 : "Disable Slot Command",
+  11 : "Address Device Command",
+  12 : "Configure Endpoint Command",
+  13 : "Evaluate Context Command",
+  14 : "Reset Endpoint Command",
+  15 : "Stop Endpoint Command",
+  16 : "Set TR Dequeue Pointer Command",
+  17 : "Reset Device Command",
+  18 : "Force Event Command",
+  19 : "Negotiate Bandwidth Command",
+  20 : "Set Latency Tolerance Value Command",
+  21 : "Get Port Bandwidth Command",
+  22 : "Force Header Command",
+  23 : "No Op Command",
+  24 : "Get Extended Property Command",
+  25 : "Set Extended Property Command",
+  32 : "Transfer Event",
+  33 : "Command Completion Event",
+  34 : "Port Status Change Event",
+  35 : "Bandwidth Request Event",
+  36 : "Doorbell Event",
+  37 : "Host Controller Event",
+  38 : "Device Notification Event",
+  39 : "MFINDEX Wrap Event",
+}
+
+completionCodeMap:dict[int, str] = {
+  0  : "Invalid",
+  1  : "Success",
+  2  : "Data Buffer Error",
+  3  : "Babble Detected Error",
+  4  : "USB Transaction Error",
+  5  : "TRB Error",
+  6  : "Stall Error",
+  7  : "Resource Error",
+  8  : "Bandwidth Error",
+  9  : "No Slots Available Error",
+  10 : "Invalid Stream Type Error",
+  11 : "Slot Not Enabled Error",
+  12 : "Endpoint Not Enabled Error",
+  13 : "Short Packet",
+  14 : "Ring Underrun",
+  15 : "Ring Overrun",
+  16 : "VF Event Ring Full Error",
+  17 : "Parameter Error",
+  18 : "Bandwidth Overrun Error",
+  19 : "Context State Error",
+  20 : "No Ping Response Error",
+  21 : "Event Ring Full Error",
+  22 : "Incompatible Device Error",
+  23 : "Missed Service Error",
+  24 : "Command Ring Stopped",
+  25 : "Command Aborted",
+  26 : "Stopped",
+  27 : "Stopped - Length Invalid",
+  28 : "Stopped - Short Packet",
+  29 : "Max Exit Latency Too Large Error",
+  31 : "Isoch Buffer Overrun",
+  32 : "Event Lost Error",
+  33 : "Undefined Error",
+  34 : "Invalid Stream ID Error",
+  35 : "Secondary Bandwidth Error",
+  36 : "Split Transaction Error",
+}
+
+def mapTRBType(bit6TRBType:int) -> str:
+  '''This function maps a 6-bit TRB Type to respective string'''
+  return trbTypeMap.get(bit6TRBType, f"Reserved ({bit6TRBType})")
 
+def mapCompletionCode(bit8CompletionCode:int) -> str:
+  '''This function maps an 8-bit Completion Code to respective string'''
+  if 192 <= bit8CompletionCode <= 223:
+    return f"Vendor Defined Error ({bit8CompletionCode})"
+  if 224 <= bit8CompletionCode <= 255:
+    return f"Vendor Defined Info ({bit8CompletionCode})"
+  return completionCodeMap.get(bit8CompletionCode, f"Reserved ({bit8CompletionCode})")
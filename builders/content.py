@@ -7,20 +7,40 @@
 # xHCI Data Structure. It also contains data that is used to build info for that
 # Data-structure.
 
-from builders.constants import RsvdZ
-from helpers import bytes2binList
+import math
+from functools import lru_cache
+
+from builders.constants import createInfoTable, RsvdZ, mapPortLinkState, mapPortSpeed, mapCompletionCode
+from helpers import byteBits, byteView, bytes2dwords
+
+# Cells of the bits of every byte value, most significant bit first and least significant bit first.
+# Rows of bits are joined out of these, 8 bits at a time
+bitCells = ('<td colspan="4">0</td>', '<td colspan="4">1</td>')
+byteCells = tuple(''.join(bitCells[bit] for bit in bits) for bits in byteBits)
+byteCellsReversed = tuple(''.join(bitCells[bit] for bit in reversed(bits)) for bits in byteBits)
+
+# Header cells with the index of every bit, from 31 down to 0
+bitIndexCells = ''.join(f'<td colspan="4"><b>{format(i,"02")}</b></td>\n' for i in reversed(range(32)))
+
+def bitRow(data:bytes, dword:int, lsbFirst:bool = False) -> str:
+  '''
+  This function creates the cells of the 32 bits of a dword, read in place out of the bytes of a structure
+  in the same order as `bytes2dwords`. Bits are drawn from the most significant one unless `lsbFirst`
+  '''
+  offset = dword * 4
+  if lsbFirst:
+    return byteCellsReversed[data[offset+3]] + byteCellsReversed[data[offset+2]] + byteCellsReversed[data[offset+1]] + byteCellsReversed[data[offset]]
+  return byteCells[data[offset]] + byteCells[data[offset+1]] + byteCells[data[offset+2]] + byteCells[data[offset+3]]
 
 def slotContext(data:list[int]):
   '''This function dumps data from input to a table form, representing'''
   
-  # Convert Data to integer list
-  rawBinData = bytes2binList(data)
-  
-  # Now split them according to rows and reverse-order them
-  row1 = rawBinData[0]
-  row2 = rawBinData[1]
-  row3 = rawBinData[2]
-  row4 = rawBinData[3]
+  # Build the cells of the bits of every row
+  data = byteView(data)
+  row1 = bitRow(data, 0)
+  row2 = bitRow(data, 1)
+  row3 = bitRow(data, 2)
+  row4 = bitRow(data, 3)
   # Create a reserved segment
   reservedSegment32 = RsvdZ(32)
   
@@ -29,7 +49,7 @@ def slotContext(data:list[int]):
 <table border="1" cellborder="1" cellspacing="0" cellpadding="4">
     <!-- Row 0: Bits -->
     <tr>
-        {''.join(f'<td colspan="4"><b>{format(i,"02")}</b></td>\n' for i in reversed(range(32)))}
+        {bitIndexCells}
     </tr>
     <!-- Row 1: Context Entries to Route String -->
     <tr>
@@ -42,7 +62,7 @@ def slotContext(data:list[int]):
         <td><b>03-00H</b></td>
     </tr>
     <tr>
-        {''.join(f'<td colspan="4">{bit}</td>' for bit in row1)}
+        {row1}
         <td>—</td>
     </tr>
     <!-- Row 2: Number of Ports & Root Hub Port -->
@@ -53,7 +73,7 @@ def slotContext(data:list[int]):
         <td><b>07-04H</b></td>
     </tr>
     <tr>
-        {''.join(f'<td colspan="4">{bit}</td>' for bit in row2)}
+        {row2}
         <td>—</td>
     </tr>
     <!-- Row 3: Interrupter Target to TT Hub Slot ID -->
@@ -66,7 +86,7 @@ def slotContext(data:list[int]):
         <td ><b>0B-08H</b></td>
     </tr>
     <tr>
-        {''.join(f'<td colspan="4">{bit}</td>' for bit in row3)}
+        {row3}
         <td>—</td>
     </tr>
     <!-- Row 4: Slot State and USB Device Address -->
@@ -77,7 +97,7 @@ def slotContext(data:list[int]):
         <td><b>0F-0CH</b></td>
     </tr>
     <tr>
-        {''.join(f'<td colspan="4">{bit}</td>' for bit in row4)}
+        {row4}
         <td>—</td>
     </tr>
     <!-- Reserved rows -->
@@ -103,14 +123,13 @@ def slotContext(data:list[int]):
 def endpointContext(data:list[int]):
     '''This function creates an endpoint context data structure '''
     
-    rawBinData = bytes2binList(data)
-  
-    # Now split them according to rows and reverse-order them
-    row1 = rawBinData[0][::-1]
-    row2 = rawBinData[1][::-1]
-    row3 = rawBinData[2][::-1]
-    row4 = rawBinData[3][::-1]
-    row5 = rawBinData[4][::-1]
+    # Build the cells of the bits of every row, least significant bit first
+    data = byteView(data)
+    row1 = bitRow(data, 0, lsbFirst=True)
+    row2 = bitRow(data, 1, lsbFirst=True)
+    row3 = bitRow(data, 2, lsbFirst=True)
+    row4 = bitRow(data, 3, lsbFirst=True)
+    row5 = bitRow(data, 4, lsbFirst=True)
     # Create a reserved segment
     reservedSegment32 = RsvdZ(32)
   
@@ -118,7 +137,7 @@ def endpointContext(data:list[int]):
 <table border="1" cellborder="1" cellspacing="0" cellpadding="4">
     <!-- Row 0: Bits -->
     <tr>
-        {''.join(f'<td colspan="4"><b>{format(i,"02")}</b></td>\n' for i in reversed(range(32)))}
+        {bitIndexCells}
     </tr>
     
     <!-- Row 1-->
@@ -133,7 +152,7 @@ def endpointContext(data:list[int]):
         <td><b>03-00H</b></td>
     </tr>
     <tr>
-        {''.join(f'<td colspan="4">{bit}</td>' for bit in row1)}
+        {row1}
         <td>—</td>
     </tr>
     
@@ -149,7 +168,7 @@ def endpointContext(data:list[int]):
         <td><b>07-04H</b></td>
     </tr>
     <tr>
-        {''.join(f'<td colspan="4">{bit}</td>' for bit in row2)}
+        {row2}
         <td>—</td>
     </tr>
     
@@ -161,7 +180,7 @@ def endpointContext(data:list[int]):
         <td ><b>0B-08H</b></td>
     </tr>
     <tr>
-        {''.join(f'<td colspan="4">{bit}</td>' for bit in row3)}
+        {row3}
         <td>—</td>
     </tr>
     
@@ -171,7 +190,7 @@ def endpointContext(data:list[int]):
         <td><b>0F-0CH</b></td>
     </tr>
     <tr>
-        {''.join(f'<td colspan="4">{bit}</td>' for bit in row4)}
+        {row4}
         <td>—</td>
     </tr>
     
@@ -182,7 +201,7 @@ def endpointContext(data:list[int]):
         <td><b>13-10H</b></td>
     </tr>
     <tr>
-        {''.join(f'<td colspan="4">{bit}</td>' for bit in row5)}
+        {row5}
         <td>—</td>
     </tr>
     
@@ -209,12 +228,11 @@ def endpointContext(data:list[int]):
 def inputControlContextContext(data:list[int]):
     '''This function creates an input control context data structure '''
     
-    rawBinData = bytes2binList(data)
-  
-    # Now split them according to rows and reverse-order them
-    row1 = rawBinData[0][::-1]
-    row2 = rawBinData[1][::-1]
-    row8 = rawBinData[7][::-1]
+    # Build the cells of the bits of every row, least significant bit first
+    data = byteView(data)
+    row1 = bitRow(data, 0, lsbFirst=True)
+    row2 = bitRow(data, 1, lsbFirst=True)
+    row8 = bitRow(data, 7, lsbFirst=True)
     
     # Create a reserved segment
     reservedSegment32 = RsvdZ(32)
@@ -223,7 +241,7 @@ def inputControlContextContext(data:list[int]):
 <table border="1" cellborder="1" cellspacing="0" cellpadding="4">
     <!-- Row 0: Bits -->
     <tr>
-        {''.join(f'<td colspan="4"><b>{format(i,"02")}</b></td>\n' for i in reversed(range(32)))}
+        {bitIndexCells}
     </tr>
     
     <!-- Row 1-->
@@ -262,7 +280,7 @@ def inputControlContextContext(data:list[int]):
         <td><b>03-00H</b></td>
     </tr>
     <tr>
-        {''.join(f'<td colspan="4">{bit}</td>' for bit in row1)}
+        {row1}
         <td>—</td>
     </tr>
     
@@ -303,7 +321,7 @@ def inputControlContextContext(data:list[int]):
         <td><b>07-04H</b></td>
     </tr>
     <tr>
-        {''.join(f'<td colspan="4">{bit}</td>' for bit in row2)}
+        {row2}
         <td>—</td>
     </tr>
     
@@ -346,8 +364,372 @@ def inputControlContextContext(data:list[int]):
         <td><b>1F-1CH</b></td>
     </tr>
     <tr>
-        {''.join(f'<td colspan="4">{bit}</td>' for bit in row8)}
+        {row8}
         <td>—</td>
     </tr>
 </table>
-"""
\ No newline at end of file
+"""
+
+def registerBlock(layout:list[tuple[str,int,int,int]], registerNames:dict[int,str], data:list[int], baseOffset:int = 0):
+    '''
+    This function creates a table of registers for a block of the MMIO register space.
+    Each register gets one row holding its offset, raw value and named fields.
+    '''
+    dwords = bytes2dwords(data)
+    rows = ""
+    for dword, registerName in registerNames.items():
+        if dword >= len(dwords):
+            break
+        fields = ' '.join(f"{name}={hex((dwords[dword] >> lowBit) & ((1 << width) - 1))}"
+                          for name, index, lowBit, width in layout if index == dword and not name.startswith("Rsvd"))
+        rows += f"""
+    <tr>
+        <td><b>{format(baseOffset + dword*4,"02X")}H</b></td>
+        <td><b>{registerName}</b></td>
+        <td>{format(dwords[dword],"08X")}</td>
+        <td align="left">{fields}</td>
+    </tr>"""
+
+    return f"""
+<table border="1" cellborder="1" cellspacing="0" cellpadding="4">
+    <tr>
+        <td><b>Offset</b></td>
+        <td><b>Register</b></td>
+        <td><b>Value</b></td>
+        <td><b>Fields</b></td>
+    </tr>{rows}
+</table>
+"""
+
+def portRegisterSetsTable(columns:dict[str,list[int]]):
+    '''
+    This function creates one compact table for many Port Register Sets.
+    Every port is a single row, so hundreds of ports stay a single Graphviz node.
+    '''
+    changeBits = ("CSC", "PEC", "WRC", "OCC", "PRC", "PLC", "CEC")
+    wakeBits = ("WCE", "WDE", "WOE")
+    rows = ""
+    for port in range(len(columns["Port"])):
+        changes = ' '.join(bit for bit in changeBits if columns[bit][port]) or "—"
+        wakes = ' '.join(bit for bit in wakeBits if columns[bit][port]) or "—"
+        rows += f"""
+    <tr>
+        <td><b>{columns["Port"][port]}</b></td>
+        <td>{format(columns["PORTSC"][port],"08X")}</td>
+        <td>{columns["CCS"][port]}</td>
+        <td>{columns["PED"][port]}</td>
+        <td>{columns["OCA"][port]}</td>
+        <td>{columns["PR"][port]}</td>
+        <td>{mapPortLinkState(columns["PLS"][port])}</td>
+        <td>{columns["PP"][port]}</td>
+        <td>{mapPortSpeed(columns["PortSpeed"][port])}</td>
+        <td>{changes}</td>
+        <td>{wakes}</td>
+        <td>{format(columns["PORTPMSC"][port],"08X")}</td>
+        <td>{columns["LinkErrorCount"][port]}</td>
+        <td>{format(columns["PORTHLPMC"][port],"08X")}</td>
+    </tr>"""
+
+    return f"""
+<table border="1" cellborder="1" cellspacing="0" cellpadding="4">
+    <tr>
+        <td><b>Port</b></td>
+        <td><b>PORTSC</b></td>
+        <td><b>CCS</b></td>
+        <td><b>PED</b></td>
+        <td><b>OCA</b></td>
+        <td><b>PR</b></td>
+        <td><b>PLS</b></td>
+        <td><b>PP</b></td>
+        <td><b>Speed</b></td>
+        <td><b>Change Bits</b></td>
+        <td><b>Wake Enables</b></td>
+        <td><b>PORTPMSC</b></td>
+        <td><b>Link Errors</b></td>
+        <td><b>PORTHLPMC</b></td>
+    </tr>{rows}
+</table>
+"""
+
+#########################################################################################
+# Compact tables: one cell per field instead of one cell per bit
+#########################################################################################
+
+# Titles of context fields in compact tables, matching the titles of the bit-exact tables
+fieldTitles:dict[str,str] = {
+  "routeString"         : "Route String",
+  "speed"               : "Speed",
+  "multiTT"             : "MTT",
+  "hub"                 : "Hub",
+  "contextEntries"      : "Context Entries",
+  "maxExitLatency"      : "Max Exit Latency",
+  "rootHubPortNumber"   : "Root Hub Port Number",
+  "numberOfPorts"       : "Number of Ports",
+  "parentHubSlotId"     : "TT Hub Slot ID",
+  "parentPortNumber"    : "TT Port Number",
+  "ttThinkTime"         : "TTT",
+  "interrupterTarget"   : "Interrupter Target",
+  "usbDeviceAddress"    : "USB Device Address",
+  "slotState"           : "Slot State",
+  "endpointState"       : "Endpoint State",
+  "mult"                : "Mult",
+  "maxPStreams"         : "Max Primary Streams",
+  "linearStreamArray"   : "LSA",
+  "interval"            : "Interval",
+  "maxESITPayloadHi"    : "Max ESIT Payload Hi",
+  "errorCount"          : "CErr",
+  "epType"              : "EP Type",
+  "hostInitiateDisable" : "HID",
+  "maxBurstSize"        : "Max Burst Size",
+  "maxPacketSize"       : "Max Packet Size",
+  "dequeueCycleState"   : "DCS",
+  "trDequeuePointerLo"  : "TR Dequeue Pointer Lo",
+  "trDequeuePointerHi"  : "TR Dequeue Pointer Hi",
+  "averageTRBLength"    : "Average TRB Length",
+  "maxESITPayloadLo"    : "Max ESIT Payload Lo",
+  "dropContextFlags"    : "Drop Context Flags (D31-D0)",
+  "addContextFlags"     : "Add Context Flags (A31-A0)",
+  "configurationValue"  : "Configuration Value",
+  "interfaceNumber"     : "Interface Number",
+  "alternateSetting"    : "Alternate Setting",
+}
+
+def compactValue(value:int, width:int) -> str:
+    '''This function formats a field value as a bit string (up to 4 bits) or as hex'''
+    if width <= 4:
+        return format(value, f"0{width}b")
+    return f"0x{value:0{(width + 3)//4}X}"
+
+def dwordOffsets(first:int, last:int) -> str:
+    '''This function returns the byte offsets covered by dwords first..last, e.g. 1F-10H'''
+    return f"{format(last*4 + 3,"02X")}-{format(first*4,"02X")}H"
+
+# Width in points of every bit column of compact tables, and of their offset column. Every cell is at least
+# as wide as the bits it spans, so all compact tables of a graph share the columns of the bit-index header
+compactBitWidth = 32
+compactOffsetWidth = 96
+
+# Padding of compact cells, and the rough width of a bold character and height of a line in font sizes, used to
+# fit titles into their cells and to size the tables
+compactCellPadding = 2
+titleCharacterWidth = 0.85
+titleFontSize = 14
+lineHeight = 1.25
+
+# Row of empty, borderless cells one bit wide, opening every compact table. Graphviz sizes columns spanned only by
+# wide cells unevenly, these pin every column to its bit
+compactColumnRow = f'''<tr>{f'<td width="{compactBitWidth}" border="0" cellpadding="0"></td>' * 32}<td width="{compactOffsetWidth}" border="0" cellpadding="0"></td></tr>'''
+
+def compactTableTag(rowLines:list[int]) -> str:
+    '''
+    This function opens a compact table holding rows of the given numbers of lines. The table is of fixed size,
+    so Graphviz never stretches its columns to fill a wider cell (like a long description below it), and its
+    columns stay where the bit-index header has them. Rows are sized generously, leaving a few points below the last one.
+    '''
+    width = 32 * compactBitWidth + compactOffsetWidth + 2
+    height = sum(math.ceil(lines * lineHeight * titleFontSize) + 2 * (compactCellPadding + 1) for lines in rowLines) + 2
+    return f'<table border="1" cellborder="1" cellspacing="0" cellpadding="{compactCellPadding}" fixedsize="true" width="{width}" height="{height}">'
+
+def compactTitle(title:str, width:int) -> str:
+    '''
+    This function fits a field title into the cell of a field `width` bits wide: its words are wrapped onto
+    lines, and the font is made smaller if a single word is still wider than the cell (e.g. RsvdZ in 1 bit)
+    '''
+    room = width * compactBitWidth - 2 * (compactCellPadding + 1)
+    lines:list[str] = []
+    for word in title.split():
+        if lines and (len(lines[-1]) + 1 + len(word)) * titleCharacterWidth * titleFontSize <= room:
+            lines[-1] += f" {word}"
+        else:
+            lines.append(word)
+    text = f"<b>{'<br/>'.join(lines)}</b>"
+    fontSize = int(room / (max(len(line) for line in lines) * titleCharacterWidth))
+    return f'<font point-size="{max(fontSize, 6)}">{text}</font>' if fontSize < titleFontSize else text
+
+def bitIndexHeader():
+    '''
+    This function creates the bit-index header shared by all compact tables of a graph. Its 32 bit columns have
+    the width compact tables give every bit, and it is framed like the contexts below it, so its columns line up
+    with theirs and field widths can be read against it.
+    '''
+    header = f'''{compactTableTag([1])}<tr>{''.join(compactCell(1, f'<b>{format(i,"02")}</b>') for i in reversed(range(32)))}{offsetCell("<b>Offset</b>")}</tr></table>'''
+    return createInfoTable("Bit Index", header, "Bits of every dword of the compact tables below")
+
+def compactCell(width:int, text:str) -> str:
+    '''This function creates a cell spanning `width` bits of a compact table'''
+    return f'<td colspan="{width}" width="{width * compactBitWidth}">{text}</td>' if width > 1 else f'<td width="{compactBitWidth}">{text}</td>'
+
+def offsetCell(text:str) -> str:
+    '''This function creates the offset (or dword value) cell closing a row of a compact table'''
+    return f'<td width="{compactOffsetWidth}">{text}</td>'
+
+def zeroCompactTable(dwordCount:int = 8):
+    '''This function creates the compact table of a structure whose bytes are all zero, like an unused endpoint context'''
+    return f'''{compactTableTag([1])}{compactColumnRow}<tr>{compactCell(32, "All fields are 0")}{offsetCell(f"<b>{dwordOffsets(0, dwordCount - 1)}</b>")}</tr></table>'''
+
+@lru_cache(maxsize=None)
+def compactRows(layout:tuple[tuple[str,int,int,int],...]) -> tuple[int, tuple]:
+    '''
+    This function works out the rows of the compact table of a layout once, so that tables of many
+    structures of the same layout only fill in the values. Returns the number of dwords of the layout and
+    its rows, each either ("fields", dword, title cells, (lowest bit, mask, width) per field, lines of the titles)
+    or ("reserved", dwords, names) for a run of reserved dwords.
+    '''
+    rowCount = max(dword for _, dword, _, _ in layout) + 1
+    rows:list[tuple] = []
+    reservedRun:list[int] = []
+
+    def reservedRow() -> tuple:
+        return ("reserved", tuple(reservedRun), "/".join(sorted({name for name, dword, _, _ in layout if dword in reservedRun})))
+
+    for dword in range(rowCount):
+        fields = sorted((entry for entry in layout if entry[1] == dword), key=lambda entry: -entry[2])
+        if all(name.startswith("Rsvd") for name, _, _, _ in fields):
+            reservedRun.append(dword)
+            continue
+        if reservedRun:
+            rows.append(reservedRow())
+            reservedRun = []
+        titles = [compactTitle(fieldTitles.get(name, name), width) for name, _, _, width in fields]
+        titleCells = ''.join(compactCell(width, title) for title, (_, _, _, width) in zip(titles, fields))
+        rows.append(("fields", dword, f'<tr>{titleCells}{offsetCell(f"<b>{dwordOffsets(dword, dword)}</b>")}</tr>',
+                     tuple((lowBit, (1 << width) - 1, width) for _, _, lowBit, width in fields),
+                     max(title.count("<br/>") + 1 for title in titles)))
+    if reservedRun:
+        rows.append(reservedRow())
+    return rowCount, tuple(rows)
+
+def compactTable(layout:list[tuple[str,int,int,int]], data:list[int]):
+    '''
+    This function creates a compact table of a data structure out of its layout. Each field is
+    a single cell holding its value, and consecutive fully reserved dwords are collapsed into one row.
+    The bit-index header is left out, it is drawn once per graph using `bitIndexHeader`.
+    '''
+    rowCount, layoutRows = compactRows(tuple(layout))
+    dwords = bytes2dwords(data, 0, rowCount)
+    rows:list[str] = []
+    rowLines:list[int] = []
+
+    for row in layoutRows:
+        if row[0] == "reserved":
+            _, reservedRun, text = row
+            values = [dwords[dword] for dword in reservedRun if dword < len(dwords)]
+            if any(values):
+                text += f" ({' '.join(format(value,"08X") for value in values)})"
+            rows.append(f'<tr>{compactCell(32, text)}{offsetCell(f"<b>{dwordOffsets(reservedRun[0], reservedRun[-1])}</b>")}</tr>')
+            rowLines.append(1)
+            continue
+        _, dword, titles, fields, titleLines = row
+        value = dwords[dword] if dword < len(dwords) else None
+        values = ''.join(compactCell(width, "—" if value is None else compactValue((value >> lowBit) & mask, width))
+                         for lowBit, mask, width in fields)
+        rows.append(titles)
+        rows.append(f'<tr>{values}{offsetCell("—" if value is None else format(value,"08X"))}</tr>')
+        rowLines += [titleLines, 1]
+
+    return f'''{compactTableTag(rowLines)}{compactColumnRow}{"".join(rows)}</table>'''
+
+def extendedCapabilitiesTable(capabilities:list[dict]):
+    '''
+    This function creates the compact chain of Extended Capabilities: one row per capability
+    holding its offset, ID, name and the offset of the next capability.
+    '''
+    rows = ""
+    for capability in capabilities:
+        if capability.get("error"):
+            rows += f"""
+    <tr>
+        <td><b>{format(capability["offset"],"04X")}H</b></td>
+        <td colspan="3">{capability["error"]}</td>
+    </tr>"""
+            continue
+        rows += f"""
+    <tr>
+        <td><b>{format(capability["offset"],"04X")}H</b></td>
+        <td>{capability["id"]}</td>
+        <td>{capability["name"]}</td>
+        <td>{format(capability["next"],"04X") + "H" if capability["next"] else "End"}</td>
+    </tr>"""
+
+    return f"""
+<table border="1" cellborder="1" cellspacing="0" cellpadding="4">
+    <tr>
+        <td><b>Offset</b></td>
+        <td><b>ID</b></td>
+        <td><b>Capability</b></td>
+        <td><b>Next</b></td>
+    </tr>{rows}
+</table>
+"""
+
+def protocolSpeedTable(speeds:list[dict]):
+    '''This function creates the table of Protocol Speed IDs (PSI) of a Supported Protocol capability'''
+    rows = ''.join(f"""
+    <tr>
+        <td>{speed["PSIV"]}</td>
+        <td>{speed["speed"]}</td>
+        <td>{speed["linkType"]}</td>
+        <td>{"Full-Duplex" if speed["PFD"] else "Half-Duplex"}</td>
+        <td>{speed["linkProtocol"]}</td>
+    </tr>""" for speed in speeds)
+
+    return f"""
+<table border="1" cellborder="1" cellspacing="0" cellpadding="4">
+    <tr>
+        <td><b>PSIV</b></td>
+        <td><b>Speed</b></td>
+        <td><b>Link Type</b></td>
+        <td><b>Duplex</b></td>
+        <td><b>Link Protocol</b></td>
+    </tr>{rows}
+</table>
+"""
+
+def timelineTable(tracks:dict[str, list[tuple[int,str]]], steps:int, maxChanges:int = 48):
+    '''
+    This function creates the per-field timeline of a series of snapshots: one row per field listing
+    the steps at which its value changed. Fields changing more than `maxChanges` times only show
+    their first and last changes.
+    '''
+    rows = ""
+    for name, changes in tracks.items():
+        shown = [f"{step}: {value}" for step, value in changes]
+        if len(shown) > maxChanges:
+            shown = shown[:maxChanges//2] + [f"… {len(shown) - maxChanges} more changes …"] + shown[-(maxChanges//2):]
+        rows += f"""
+    <tr>
+        <td align="left"><b>{name}</b></td>
+        <td>{len(changes) - 1}</td>
+        <td align="left">{'<br/>'.join(shown)}</td>
+    </tr>"""
+
+    return f"""
+<table border="1" cellborder="1" cellspacing="0" cellpadding="4">
+    <tr>
+        <td><b>Field ({steps} steps)</b></td>
+        <td><b>Changes</b></td>
+        <td><b>Step: Value</b></td>
+    </tr>{rows}
+</table>
+"""
+
+def trbFieldText(name:str, value:int) -> str:
+    '''This function formats one decoded TRB field: pointers and data in hex, completion codes by name'''
+    if name == "completionCode":
+        return f"{name}={mapCompletionCode(value)}"
+    if name.endswith(("Pointer", "Data")) or name in ("parameter", "status", "control"):
+        return f"{name}={value:X}H"
+    return f"{name}={value}"
+
+def trbTable(trbs:list[dict]):
+    '''
+    This function creates one compact table for an array of TRBs: one row per TRB holding its index,
+    offset, type, cycle bit and the fields of its type. Thousands of TRBs stay a single Graphviz node.
+    '''
+    rows = []
+    for trb in trbs:
+        fields = ", ".join(trbFieldText(name, value) for name, value in trb["fields"].items() if name not in ("cycleBit", "trbType"))
+        rows.append(f"<tr><td>{trb['index']}</td><td>{trb['offset']:04X}H</td><td align=\"left\">{trb['trbTypeName']}</td>"
+                    f"<td>{trb['fields'].get('cycleBit', 0)}</td><td align=\"left\">{fields or '—'}</td></tr>")
+
+    return f'''<table border="1" cellborder="1" cellspacing="0" cellpadding="2"><tr><td><b>#</b></td><td><b>Offset</b></td><td><b>TRB Type</b></td><td><b>C</b></td><td><b>Fields</b></td></tr>{"".join(rows)}</table>'''
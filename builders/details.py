@@ -8,6 +8,9 @@
 # and significances based on the data structure.
 
 from builders.constants import *
+from builders.fields import *
+from builders.registry import checkSize, loadFunction
+from helpers import byteView
 
 
 def slotContextDetails(data:list[int]) -> str:
@@ -258,4 +261,217 @@ def inputControlContextContextDetails(data:list[int]):
         </tr>
     </table>
 
-"""
\ No newline at end of file
+"""
+
+
+def capabilityRegistersDetails(data:list[int]) -> str:
+    '''This function details the host controller capability registers'''
+    
+    fields = capabilityRegisterFields(data)
+    
+    hciVersion = f"{fields['HCIVERSION'] >> 8:x}.{(fields['HCIVERSION'] >> 4) & 0xF:x}{fields['HCIVERSION'] & 0xF:x}"
+    contextSize = "64 bytes (CSZ = 1)" if fields["CSZ"] else "32 bytes (CSZ = 0)"
+    addressing = "64-bit addressing capable" if fields["AC64"] else "32-bit addressing only"
+    isochThreshold = f"{fields['IST'] & 0x7} {'Frames' if fields['IST'] & 0x8 else 'Microframes'}"
+    
+    return f"""
+    <table border="1" cellborder="1" cellspacing="0" cellpadding="4">
+        <tr>
+            <td> Capability Registers Length </td>
+            <td> {fields['CAPLENGTH']} bytes. Operational Registers start at {hex(fields['CAPLENGTH'])} </td>
+        </tr>
+        <tr>
+            <td> Interface Version </td>
+            <td> {hciVersion} </td>
+        </tr>
+        <tr>
+            <td> Device Slots / Interrupters / Ports </td>
+            <td> {fields['MaxSlots']} / {fields['MaxIntrs']} / {fields['MaxPorts']} </td>
+        </tr>
+        <tr>
+            <td> Isochronous Scheduling Threshold </td>
+            <td> {isochThreshold} </td>
+        </tr>
+        <tr>
+            <td> Event Ring Segment Table Max </td>
+            <td> {2**fields['ERSTMax']} entries </td>
+        </tr>
+        <tr>
+            <td> Max Scratchpad Buffers </td>
+            <td> {fields['MaxScratchpadBufs']}. {"Scratchpad buffers are restored after a save/restore." if fields['SPR'] else "Scratchpad buffers may be lost after a save/restore."} </td>
+        </tr>
+        <tr>
+            <td> U1 / U2 Device Exit Latency </td>
+            <td> {fields['U1DeviceExitLatency']}µS / {fields['U2DeviceExitLatency']}µS </td>
+        </tr>
+        <tr>
+            <td> Addressing </td>
+            <td> {addressing} </td>
+        </tr>
+        <tr>
+            <td> Context Size </td>
+            <td> {contextSize} </td>
+        </tr>
+        <tr>
+            <td> Port Power Control / Port Indicators </td>
+            <td> {"Supported" if fields['PPC'] else "Not supported"} / {"Supported" if fields['PIND'] else "Not supported"} </td>
+        </tr>
+        <tr>
+            <td> Maximum Primary Stream Array Size </td>
+            <td> {0 if fields['MaxPSASize'] == 0 else 2**(fields['MaxPSASize']+1)} </td>
+        </tr>
+        <tr>
+            <td> Extended Capabilities Pointer </td>
+            <td> {"None" if fields['xECP'] == 0 else hex(fields['xECP'] << 2)} </td>
+        </tr>
+        <tr>
+            <td> Doorbell Offset </td>
+            <td> {hex(fields['DBOFF'] << 2)} </td>
+        </tr>
+        <tr>
+            <td> Runtime Register Space Offset </td>
+            <td> {hex(fields['RTSOFF'] << 5)} </td>
+        </tr>
+        <tr>
+            <td> Large ESIT Payload Capability </td>
+            <td> {"Supported" if fields['LEC'] else "Not supported"} </td>
+        </tr>
+        <tr>
+            <td> Configuration Information Capability </td>
+            <td> {"Supported" if fields['CIC'] else "Not supported"} </td>
+        </tr>
+    </table>
+"""
+
+
+def operationalRegistersDetails(data:list[int]) -> str:
+    '''This function details the host controller operational registers'''
+    
+    fields = operationalRegisterFields(data)
+    
+    runState = "Running" if fields['RS'] else "Stopped"
+    halted = "Halted" if fields['HCH'] else "Not Halted"
+    errors = ', '.join(text for name, text in (("HSE", "Host System Error"), ("HCE", "Host Controller Error")) if fields[name]) or "None"
+    pageSize = f"{(fields['PageSize'] & -fields['PageSize']) * 4096} bytes" if fields['PageSize'] else "Invalid"
+    
+    return f"""
+    <table border="1" cellborder="1" cellspacing="0" cellpadding="4">
+        <tr>
+            <td> Run/Stop </td>
+            <td> {runState} </td>
+        </tr>
+        <tr>
+            <td> HC Halted </td>
+            <td> {halted} </td>
+        </tr>
+        <tr>
+            <td> Controller Not Ready </td>
+            <td> {"Not Ready" if fields['CNR'] else "Ready"} </td>
+        </tr>
+        <tr>
+            <td> Errors </td>
+            <td> {errors} </td>
+        </tr>
+        <tr>
+            <td> Event Interrupt / Port Change Detect </td>
+            <td> {fields['EINT']} / {fields['PCD']} </td>
+        </tr>
+        <tr>
+            <td> Page Size </td>
+            <td> {pageSize} </td>
+        </tr>
+        <tr>
+            <td> Command Ring </td>
+            <td> {"Running" if fields['CRR'] else "Stopped"}. Ring Cycle State = {fields['RCS']}. Pointer = {hex(fields['CommandRingPointer'])} </td>
+        </tr>
+        <tr>
+            <td> Device Context Base Address Array Pointer </td>
+            <td> {hex(fields['DCBAAP'])} </td>
+        </tr>
+        <tr>
+            <td> Max Device Slots Enabled </td>
+            <td> {fields['MaxSlotsEn']} </td>
+        </tr>
+        <tr>
+            <td> U3 Entry / Configuration Information </td>
+            <td> {"Enabled" if fields['U3E'] else "Disabled"} / {"Enabled" if fields['CIE'] else "Disabled"} </td>
+        </tr>
+    </table>
+"""
+
+
+#########################################################################################
+# The following functions describe data structures as plain dictionaries instead of
+# HTML tables. They are used where the result is consumed by other tools (JSON etc.)
+#########################################################################################
+
+def slotContextDecoded(data:list[int]) -> dict:
+    '''This function describes the slot context as a dictionary of field values and meanings'''
+    fields:dict = slotContextFields(data)
+    fields["speedName"] = mapPortSpeed(fields["speed"])
+    fields["slotStateName"] = mapSlotState(fields["slotState"])
+    return fields
+
+def endpointContextDecoded(data:list[int]) -> dict:
+    '''This function describes the endpoint context as a dictionary of field values and meanings'''
+    fields:dict = endpointContextFields(data)
+    # 64-bit pointers are given as hex strings since JSON numbers lose precision above 2^53
+    fields["trDequeuePointer"] = hex(fields["trDequeuePointer"])
+    fields["endpointStateName"] = mapEndpointState(fields["endpointState"])
+    fields["epTypeName"] = mapEPType(fields["epType"])
+    return fields
+
+def inputControlContextDecoded(data:list[int]) -> dict:
+    '''This function describes the input control context as a dictionary of field values'''
+    fields:dict = inputControlContextFields(data)
+    fields["droppedContexts"] = [bit for bit in range(2, 32) if (fields["dropContextFlags"] >> bit) & 1]
+    fields["addedContexts"] = [bit for bit in range(32) if (fields["addContextFlags"] >> bit) & 1]
+    return fields
+
+def deviceContextDecoded(data:list[int]) -> dict:
+    '''This function describes the device context as a dictionary holding all its contexts'''
+    data = byteView(data)
+    endpoints = []
+    for endpointIndex in range(31):
+        endpoint = endpointContextDecoded(data[(endpointIndex+1)*32 : (endpointIndex+2)*32])
+        endpoint["dci"] = endpointIndex + 1
+        endpoint["name"] = endpointContextName(endpointIndex).strip()
+        endpoints.append(endpoint)
+    return {"slotContext": slotContextDecoded(data[:32]), "endpointContexts": endpoints}
+
+def inputContextDecoded(data:list[int]) -> dict:
+    '''This function describes the input context as a dictionary holding all its contexts'''
+    data = byteView(data)
+    decoded = {"inputControlContext": inputControlContextDecoded(data[:32])}
+    decoded.update(deviceContextDecoded(data[32:]))
+    return decoded
+
+def portRegisterSetsDecoded(data:list[int], count:int = 0) -> list[dict]:
+    '''This function describes Port Register Sets as one dictionary per port'''
+    count = count if count else len(data) // portRegisterSetSize
+    columns = portRegisterSetColumns(data, count)
+    ports = [{name: column[port] for name, column in columns.items()} for port in range(count)]
+    for port in ports:
+        port["PLSName"] = mapPortLinkState(port["PLS"])
+        port["PortSpeedName"] = mapPortSpeed(port["PortSpeed"])
+    return ports
+
+def mmioRegistersDecoded(data:list[int]) -> dict:
+    '''This function describes a dump of the MMIO register space starting at the Capability Base'''
+    data = byteView(data)
+    capabilities = capabilityRegisterFields(data)
+    operationalBase = capabilities["CAPLENGTH"]
+    if operationalBase < 32 or len(data) < operationalBase + 60:
+        raise VisualizationException(f"Operational Registers at {hex(operationalBase)} are not part of the {len(data)} bytes of data")
+    portsBase = operationalBase + portRegisterSetsOffset
+    count = min(capabilities["MaxPorts"], max(len(data) - portsBase, 0) // portRegisterSetSize)
+    return {
+        "capabilityRegisters": capabilities,
+        "operationalRegisters": operationalRegisterFields(data[operationalBase:]),
+        "portRegisterSets": portRegisterSetsDecoded(data[portsBase:], count) if count else [],
+    }
+
+def decodeStructure(struct:str, data:list[int]) -> dict | list:
+    '''This function describes any supported data structure as plain values, using its registered decoder'''
+    checkSize(struct, data)
+    return loadFunction(struct, "decoder")(data)
@@ -0,0 +1,386 @@
+# Copyright (c) 2025 Darshan P. All rights reserved.
+
+# This work is licensed under the terms of the MIT license.
+# For a copy, see <https://opensource.org/licenses/MIT>.
+
+# This file holds the bit-level layouts of xHCI data structures and decodes raw
+# data into plain numeric field values. Nothing in here builds a visualization,
+# so it can be used by checks and exports that never render anything.
+
+from helpers import bytes2dwords
+
+# Every layout entry is (field name, dword index, lowest bit, width in bits).
+# Entries named RsvdZ must be zero, entries named RsvdO are owned by the xHC.
+
+slotContextLayout:list[tuple[str,int,int,int]] = [
+  ("routeString",        0,  0, 20),
+  ("speed",              0, 20,  4),
+  ("RsvdZ",              0, 24,  1),
+  ("multiTT",            0, 25,  1),
+  ("hub",                0, 26,  1),
+  ("contextEntries",     0, 27,  5),
+  ("maxExitLatency",     1,  0, 16),
+  ("rootHubPortNumber",  1, 16,  8),
+  ("numberOfPorts",      1, 24,  8),
+  ("parentHubSlotId",    2,  0,  8),
+  ("parentPortNumber",   2,  8,  8),
+  ("ttThinkTime",        2, 16,  2),
+  ("RsvdZ",              2, 18,  4),
+  ("interrupterTarget",  2, 22, 10),
+  ("usbDeviceAddress",   3,  0,  8),
+  ("RsvdZ",              3,  8, 19),
+  ("slotState",          3, 27,  5),
+  ("RsvdO",              4,  0, 32),
+  ("RsvdO",              5,  0, 32),
+  ("RsvdO",              6,  0, 32),
+  ("RsvdO",              7,  0, 32),
+]
+
+endpointContextLayout:list[tuple[str,int,int,int]] = [
+  ("endpointState",        0,  0,  3),
+  ("RsvdZ",                0,  3,  5),
+  ("mult",                 0,  8,  2),
+  ("maxPStreams",          0, 10,  5),
+  ("linearStreamArray",    0, 15,  1),
+  ("interval",             0, 16,  8),
+  ("maxESITPayloadHi",     0, 24,  8),
+  ("RsvdZ",                1,  0,  1),
+  ("errorCount",           1,  1,  2),
+  ("epType",               1,  3,  3),
+  ("RsvdZ",                1,  6,  1),
+  ("hostInitiateDisable",  1,  7,  1),
+  ("maxBurstSize",         1,  8,  8),
+  ("maxPacketSize",        1, 16, 16),
+  ("dequeueCycleState",    2,  0,  1),
+  ("RsvdZ",                2,  1,  3),
+  ("trDequeuePointerLo",   2,  4, 28),
+  ("trDequeuePointerHi",   3,  0, 32),
+  ("averageTRBLength",     4,  0, 16),
+  ("maxESITPayloadLo",     4, 16, 16),
+  ("RsvdO",                5,  0, 32),
+  ("RsvdO",                6,  0, 32),
+  ("RsvdO",                7,  0, 32),
+]
+
+# Drop flags are kept as the full dword so that bit N always stands for DCI N.
+# D0 and D1 are reserved and are checked by the validation rules instead.
+inputControlContextLayout:list[tuple[str,int,int,int]] = [
+  ("dropContextFlags",    0,  0, 32),
+  ("addContextFlags",     1,  0, 32),
+  ("RsvdZ",               2,  0, 32),
+  ("RsvdZ",               3,  0, 32),
+  ("RsvdZ",               4,  0, 32),
+  ("RsvdZ",               5,  0, 32),
+  ("RsvdZ",               6,  0, 32),
+  ("configurationValue",  7,  0,  8),
+  ("interfaceNumber",     7,  8,  8),
+  ("alternateSetting",    7, 16,  8),
+  ("RsvdZ",               7, 24,  8),
+]
+
+def compileFields(layout:list[tuple[str,int,int,int]], names:list[str] | None = None) -> list[tuple[str,int,int,int]]:
+  '''
+  This function returns (name, dword, lowest bit, mask) for the named fields of a layout
+  (all non-reserved fields if `names` is None), ready for fast repeated extraction.
+  '''
+  compiled = {name: (name, dword, lowBit, (1 << width) - 1) for name, dword, lowBit, width in layout if not name.startswith("Rsvd")}
+  return list(compiled.values()) if names is None else [compiled[name] for name in names]
+
+# Compiled fields of every layout passed to extractFields, id(layout) -> (layout, compiled fields)
+compiledLayoutCache:dict[int, tuple[list, list]] = {}
+
+def extractFields(layout:list[tuple[str,int,int,int]], dwords:list[int]) -> dict[str,int]:
+  '''This function pulls every named (non-reserved) field of a layout out of a list of dwords'''
+  # Layouts are compiled on their first use. The cache holds the layout itself, so its id is never reused
+  if id(layout) not in compiledLayoutCache:
+    compiledLayoutCache[id(layout)] = (layout, compileFields(layout))
+  count = len(dwords)
+  return {name: (dwords[dword] >> lowBit) & mask for name, dword, lowBit, mask in compiledLayoutCache[id(layout)][1] if dword < count}
+
+def reservedBitViolations(layout:list[tuple[str,int,int,int]], dwords:list[int], skip:tuple = ()) -> list[tuple[int,int,int,int]]:
+  '''
+  This function returns (dword, lowest bit, width, value) for every RsvdZ field that is not zero.
+  Entries whose (dword, lowest bit) is listed in `skip` are left to more specific checks.
+  '''
+  violations:list[tuple[int,int,int,int]] = []
+  for name, dword, lowBit, width in layout:
+    if name != "RsvdZ" or dword >= len(dwords) or (dword, lowBit) in skip:
+      continue
+    value = (dwords[dword] >> lowBit) & ((1 << width) - 1)
+    if value:
+      violations.append((dword, lowBit, width, value))
+  return violations
+
+def slotContextFields(data:list[int]) -> dict[str,int]:
+  '''This function decodes the slot context into numeric field values'''
+  return extractFields(slotContextLayout, bytes2dwords(data, 0, 8))
+
+def endpointContextFields(data:list[int]) -> dict[str,int]:
+  '''This function decodes the endpoint context into numeric field values'''
+  fields = extractFields(endpointContextLayout, bytes2dwords(data, 0, 8))
+  fields["trDequeuePointer"] = (fields.get("trDequeuePointerHi", 0) << 32) | (fields.get("trDequeuePointerLo", 0) << 4)
+  fields["maxESITPayload"] = (fields.get("maxESITPayloadHi", 0) << 16) | fields.get("maxESITPayloadLo", 0)
+  return fields
+
+def inputControlContextFields(data:list[int]) -> dict[str,int]:
+  '''This function decodes the input control context into numeric field values'''
+  return extractFields(inputControlContextLayout, bytes2dwords(data, 0, 8))
+
+def endpointContextName(endpointIndex:int) -> str:
+  '''
+  This function returns the name used for the endpoint context at a given index
+  (0 to 30) inside a device context. The index is the Device Context Index minus one.
+  '''
+  if endpointIndex == 0:
+    return "Endpoint Context 0 - Bi-Directional "
+  return f"Endpoint Context {(endpointIndex//2)+(endpointIndex % 2)} {"- OUT" if endpointIndex % 2 == 1 else "- IN"} "
+
+# Layouts of the Transfer Request Blocks (TRBs) shared by the command and event rings.
+# Command TRBs only differ in how they use the parameter dwords, so a single layout
+# covers all of them. Bit 9 is BSR for Address Device and DC for Configure Endpoint.
+trbSize = 16
+
+commandTRBLayout:list[tuple[str,int,int,int]] = [
+  ("parameterLo",          0,  0, 32),
+  ("parameterHi",          1,  0, 32),
+  ("status",               2,  0, 32),
+  ("cycleBit",             3,  0,  1),
+  ("RsvdZ",                3,  1,  8),
+  ("commandFlag",          3,  9,  1),
+  ("trbType",              3, 10,  6),
+  ("endpointId",           3, 16,  5),
+  ("RsvdZ",                3, 21,  3),
+  ("slotId",               3, 24,  8),
+]
+
+commandCompletionEventLayout:list[tuple[str,int,int,int]] = [
+  ("RsvdZ",                      0,  0,  4),
+  ("commandTRBPointerLo",        0,  4, 28),
+  ("commandTRBPointerHi",        1,  0, 32),
+  ("commandCompletionParameter", 2,  0, 24),
+  ("completionCode",             2, 24,  8),
+  ("cycleBit",                   3,  0,  1),
+  ("RsvdZ",                      3,  1,  9),
+  ("trbType",                    3, 10,  6),
+  ("vfId",                       3, 16,  8),
+  ("slotId",                     3, 24,  8),
+]
+
+def commandTRBFields(data:list[int]) -> dict[str,int]:
+  '''
+  This function decodes a command TRB into numeric field values. The Input Context Pointer
+  of Address Device, Configure Endpoint and Evaluate Context is the 16-byte aligned parameter.
+  '''
+  fields = extractFields(commandTRBLayout, bytes2dwords(data, 0, trbSize//4))
+  fields["inputContextPointer"] = (fields["parameterHi"] << 32) | (fields["parameterLo"] & ~0xF)
+  return fields
+
+def commandCompletionEventFields(data:list[int]) -> dict[str,int]:
+  '''This function decodes a Command Completion Event TRB into numeric field values'''
+  fields = extractFields(commandCompletionEventLayout, bytes2dwords(data, 0, trbSize//4))
+  fields["commandTRBPointer"] = (fields["commandTRBPointerHi"] << 32) | (fields["commandTRBPointerLo"] << 4)
+  return fields
+
+#########################################################################################
+# Layouts of the MMIO register space. Dword indexes are relative to the start of
+# the register block (Capability Base, Operational Base or a Port Register Set).
+# Registers are referred to by their mnemonics from the specification.
+#########################################################################################
+
+capabilityRegistersLayout:list[tuple[str,int,int,int]] = [
+  ("CAPLENGTH",           0,  0,  8),
+  ("Rsvd",                0,  8,  8),
+  ("HCIVERSION",          0, 16, 16),
+  ("MaxSlots",            1,  0,  8),
+  ("MaxIntrs",            1,  8, 11),
+  ("Rsvd",                1, 19,  5),
+  ("MaxPorts",            1, 24,  8),
+  ("IST",                 2,  0,  4),
+  ("ERSTMax",             2,  4,  4),
+  ("Rsvd",                2,  8, 13),
+  ("MaxScratchpadBufsHi", 2, 21,  5),
+  ("SPR",                 2, 26,  1),
+  ("MaxScratchpadBufsLo", 2, 27,  5),
+  ("U1DeviceExitLatency", 3,  0,  8),
+  ("Rsvd",                3,  8,  8),
+  ("U2DeviceExitLatency", 3, 16, 16),
+  ("AC64",                4,  0,  1),
+  ("BNC",                 4,  1,  1),
+  ("CSZ",                 4,  2,  1),
+  ("PPC",                 4,  3,  1),
+  ("PIND",                4,  4,  1),
+  ("LHRC",                4,  5,  1),
+  ("LTC",                 4,  6,  1),
+  ("NSS",                 4,  7,  1),
+  ("PAE",                 4,  8,  1),
+  ("SPC",                 4,  9,  1),
+  ("SEC",                 4, 10,  1),
+  ("CFC",                 4, 11,  1),
+  ("MaxPSASize",          4, 12,  4),
+  ("xECP",                4, 16, 16),
+  ("Rsvd",                5,  0,  2),
+  ("DBOFF",               5,  2, 30),
+  ("Rsvd",                6,  0,  5),
+  ("RTSOFF",              6,  5, 27),
+  ("U3C",                 7,  0,  1),
+  ("CMC",                 7,  1,  1),
+  ("FSC",                 7,  2,  1),
+  ("CTC",                 7,  3,  1),
+  ("LEC",                 7,  4,  1),
+  ("CIC",                 7,  5,  1),
+  ("ETC",                 7,  6,  1),
+  ("ETC_TSC",             7,  7,  1),
+  ("GSC",                 7,  8,  1),
+  ("VTC",                 7,  9,  1),
+  ("Rsvd",                7, 10, 22),
+]
+capabilityRegisterNames:dict[int,str] = {
+  0 : "CAPLENGTH / HCIVERSION",
+  1 : "HCSPARAMS1",
+  2 : "HCSPARAMS2",
+  3 : "HCSPARAMS3",
+  4 : "HCCPARAMS1",
+  5 : "DBOFF",
+  6 : "RTSOFF",
+  7 : "HCCPARAMS2",
+}
+
+operationalRegistersLayout:list[tuple[str,int,int,int]] = [
+  ("RS",                  0,  0,  1),
+  ("HCRST",               0,  1,  1),
+  ("INTE",                0,  2,  1),
+  ("HSEE",                0,  3,  1),
+  ("Rsvd",                0,  4,  3),
+  ("LHCRST",              0,  7,  1),
+  ("CSS",                 0,  8,  1),
+  ("CRS",                 0,  9,  1),
+  ("EWE",                 0, 10,  1),
+  ("EU3S",                0, 11,  1),
+  ("Rsvd",                0, 12,  1),
+  ("CME",                 0, 13,  1),
+  ("ETE",                 0, 14,  1),
+  ("TSC_EN",              0, 15,  1),
+  ("VTIOE",               0, 16,  1),
+  ("Rsvd",                0, 17, 15),
+  ("HCH",                 1,  0,  1),
+  ("Rsvd",                1,  1,  1),
+  ("HSE",                 1,  2,  1),
+  ("EINT",                1,  3,  1),
+  ("PCD",                 1,  4,  1),
+  ("Rsvd",                1,  5,  3),
+  ("SSS",                 1,  8,  1),
+  ("RSS",                 1,  9,  1),
+  ("SRE",                 1, 10,  1),
+  ("CNR",                 1, 11,  1),
+  ("HCE",                 1, 12,  1),
+  ("Rsvd",                1, 13, 19),
+  ("PageSize",            2,  0, 16),
+  ("Rsvd",                2, 16, 16),
+  ("Rsvd",                3,  0, 32),
+  ("Rsvd",                4,  0, 32),
+  ("DNCTRL",              5,  0, 16),
+  ("Rsvd",                5, 16, 16),
+  ("RCS",                 6,  0,  1),
+  ("CS",                  6,  1,  1),
+  ("CA",                  6,  2,  1),
+  ("CRR",                 6,  3,  1),
+  ("Rsvd",                6,  4,  2),
+  ("CommandRingPointerLo",6,  6, 26),
+  ("CommandRingPointerHi",7,  0, 32),
+  ("Rsvd",                8,  0, 32),
+  ("Rsvd",                9,  0, 32),
+  ("Rsvd",               10,  0, 32),
+  ("Rsvd",               11,  0, 32),
+  ("Rsvd",               12,  0,  6),
+  ("DCBAAPLo",           12,  6, 26),
+  ("DCBAAPHi",           13,  0, 32),
+  ("MaxSlotsEn",         14,  0,  8),
+  ("U3E",                14,  8,  1),
+  ("CIE",                14,  9,  1),
+  ("Rsvd",               14, 10, 22),
+]
+operationalRegisterNames:dict[int,str] = {
+  0  : "USBCMD",
+  1  : "USBSTS",
+  2  : "PAGESIZE",
+  5  : "DNCTRL",
+  6  : "CRCR (Lo)",
+  7  : "CRCR (Hi)",
+  12 : "DCBAAP (Lo)",
+  13 : "DCBAAP (Hi)",
+  14 : "CONFIG",
+}
+
+# PORTPMSC and PORTHLPMC depend on the protocol of the port, so they are kept whole
+portRegisterSetLayout:list[tuple[str,int,int,int]] = [
+  ("CCS",                 0,  0,  1),
+  ("PED",                 0,  1,  1),
+  ("Rsvd",                0,  2,  1),
+  ("OCA",                 0,  3,  1),
+  ("PR",                  0,  4,  1),
+  ("PLS",                 0,  5,  4),
+  ("PP",                  0,  9,  1),
+  ("PortSpeed",           0, 10,  4),
+  ("PIC",                 0, 14,  2),
+  ("LWS",                 0, 16,  1),
+  ("CSC",                 0, 17,  1),
+  ("PEC",                 0, 18,  1),
+  ("WRC",                 0, 19,  1),
+  ("OCC",                 0, 20,  1),
+  ("PRC",                 0, 21,  1),
+  ("PLC",                 0, 22,  1),
+  ("CEC",                 0, 23,  1),
+  ("CAS",                 0, 24,  1),
+  ("WCE",                 0, 25,  1),
+  ("WDE",                 0, 26,  1),
+  ("WOE",                 0, 27,  1),
+  ("Rsvd",                0, 28,  2),
+  ("DR",                  0, 30,  1),
+  ("WPR",                 0, 31,  1),
+  ("PORTPMSC",            1,  0, 32),
+  ("LinkErrorCount",      2,  0, 16),
+  ("RLC",                 2, 16,  4),
+  ("TLC",                 2, 20,  4),
+  ("Rsvd",                2, 24,  8),
+  ("PORTHLPMC",           3,  0, 32),
+]
+portRegisterSetNames:dict[int,str] = {
+  0 : "PORTSC",
+  1 : "PORTPMSC",
+  2 : "PORTLI",
+  3 : "PORTHLPMC",
+}
+
+# Offset of the first Port Register Set from the Operational Base, and size of each set
+portRegisterSetsOffset = 0x400
+portRegisterSetSize = 16
+
+def capabilityRegisterFields(data:list[int]) -> dict[str,int]:
+  '''This function decodes the capability registers into numeric field values'''
+  fields = extractFields(capabilityRegistersLayout, bytes2dwords(data, 0, 8))
+  fields["MaxScratchpadBufs"] = (fields["MaxScratchpadBufsHi"] << 5) | fields["MaxScratchpadBufsLo"]
+  return fields
+
+def operationalRegisterFields(data:list[int]) -> dict[str,int]:
+  '''This function decodes the operational registers into numeric field values'''
+  fields = extractFields(operationalRegistersLayout, bytes2dwords(data, 0, 15))
+  fields["CommandRingPointer"] = (fields["CommandRingPointerHi"] << 32) | (fields["CommandRingPointerLo"] << 6)
+  fields["DCBAAP"] = (fields["DCBAAPHi"] << 32) | (fields["DCBAAPLo"] << 6)
+  return fields
+
+def portRegisterSetColumns(data:list[int], count:int) -> dict[str,list[int]]:
+  '''
+  This function decodes `count` consecutive Port Register Sets in a single pass.
+  All dwords are read at once and every field is extracted for all ports together,
+  so the result holds one column (list with one value per port) per field.
+  '''
+  dwords = bytes2dwords(data, 0, count*portRegisterSetSize//4)
+  registers = [dwords[index::4] for index in range(4)]
+  columns:dict[str,list[int]] = {"Port": list(range(1, count+1))}
+  for name, dword, lowBit, width in portRegisterSetLayout:
+    if name.startswith("Rsvd"):
+      continue
+    mask = (1 << width) - 1
+    columns[name] = [(value >> lowBit) & mask for value in registers[dword]]
+  columns["PORTSC"] = registers[0]
+  return columns
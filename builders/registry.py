@@ -0,0 +1,93 @@
+# Copyright (c) 2025 Darshan P. All rights reserved.
+
+# This work is licensed under the terms of the MIT license.
+# For a copy, see <https://opensource.org/licenses/MIT>.
+
+# This file holds the registry of supported data structures. Every structure declares
+# its codename, description, minimum size and the functions that build, decode and
+# validate it. Functions are given as (module, function name) and are only imported
+# when that structure is selected, so the tool starts without loading every builder.
+
+import importlib
+from typing import Callable
+
+from builders.constants import VisualizationException
+
+# Codename -> registered details of the structure
+structureRegistry:dict[str, dict] = {}
+
+# Codename -> description, kept in sync with the registry for help messages and prompts
+supportedStructures:dict[str, str] = {}
+
+def registerStructure(codename:str, description:str, size:int, builder:tuple[str,str], grouped:bool = False,
+                      decoder:tuple[str,str] | None = None, validator:tuple[str,str] | None = None, options:tuple[str,...] = ()):
+  '''
+  This function adds a data structure to the registry.
+  - `size` is the minimum number of bytes the structure needs.
+  - `builder` builds the node label (or, for `grouped` structures, a dict of chained node labels).
+  - `decoder` describes the structure as plain values, `validator` checks it against the specification.
+  - `options` names the rendering options (like `compact`) the builder takes as keyword arguments.
+  '''
+  codename = codename.strip().lower()
+  structureRegistry[codename] = {
+    "codename"    : codename,
+    "description" : description,
+    "size"        : size,
+    "builder"     : builder,
+    "grouped"     : grouped,
+    "decoder"     : decoder,
+    "validator"   : validator,
+    "options"     : options,
+  }
+  supportedStructures[codename] = description
+
+def getStructure(codename:str) -> dict:
+  '''This function returns the registered details of a structure'''
+  entry = structureRegistry.get(codename.strip().lower())
+  if entry is None:
+    raise VisualizationException(f"Invalid Data Structure codename {codename}")
+  return entry
+
+def loadFunction(codename:str, role:str) -> Callable:
+  '''
+  This function imports (on first use) and returns the function registered for a role
+  ("builder", "decoder" or "validator") of a structure.
+  '''
+  entry = getStructure(codename)
+  if entry[role] is None:
+    raise VisualizationException(f"{entry['description']} ({entry['codename']}) does not support this operation")
+  moduleName, functionName = entry[role]
+  return getattr(importlib.import_module(moduleName), functionName)
+
+def checkSize(codename:str, byteData) -> None:
+  '''This function raises an exception if the data is too short for the structure'''
+  entry = getStructure(codename)
+  if len(byteData) < entry["size"]:
+    raise VisualizationException(f"{entry['description']} expects at-least {entry['size']} bytes of data. Got {len(byteData)} bytes")
+
+#########################################################################################
+# Built-in data structures
+#########################################################################################
+
+registerStructure("slotctx",  "Slot Context",          16,   ("builder", "buildSlotContext"),
+                  decoder=("builders.details", "slotContextDecoded"), validator=("builders.validation", "validateSlotContext"), options=("compact",))
+registerStructure("endpctx",  "Endpoint Context",      20,   ("builder", "buildEndpointContext"),
+                  decoder=("builders.details", "endpointContextDecoded"), validator=("builders.validation", "validateEndpointContext"), options=("compact",))
+registerStructure("icctx",    "Input Control Context", 32,   ("builder", "buildInputControlContext"),
+                  decoder=("builders.details", "inputControlContextDecoded"), validator=("builders.validation", "validateInputControlContext"), options=("compact",))
+registerStructure("devctx",   "Device Context",        1024, ("builder", "buildDeviceContext"), grouped=True,
+                  decoder=("builders.details", "deviceContextDecoded"), validator=("builders.validation", "validateDeviceContext"), options=("compact",))
+registerStructure("ipctx",    "Input Context",         1056, ("builder", "buildInputContext"), grouped=True,
+                  decoder=("builders.details", "inputContextDecoded"), validator=("builders.validation", "validateInputContext"), options=("compact",))
+registerStructure("capregs",  "Capability Registers",  32,   ("builder", "buildCapabilityRegisters"),
+                  decoder=("builders.fields", "capabilityRegisterFields"))
+registerStructure("opregs",   "Operational Registers", 60,   ("builder", "buildOperationalRegisters"),
+                  decoder=("builders.fields", "operationalRegisterFields"))
+registerStructure("portregs", "Port Register Sets",    16,   ("builder", "buildPortRegisterSets"),
+                  decoder=("builders.details", "portRegisterSetsDecoded"))
+registerStructure("mmio",     "MMIO Register Space",   92,   ("builder", "buildMMIORegisters"), grouped=True,
+                  decoder=("builders.details", "mmioRegistersDecoded"))
+registerStructure("xecp",     "Extended Capabilities", 32,   ("builder", "buildExtendedCapabilities"), grouped=True,
+                  decoder=("builders.capabilities", "extendedCapabilitiesDecoded"), options=("capabilities",))
+registerStructure("trb",      "Transfer Request Blocks", 16,  ("builder", "buildTRBs"),
+                  decoder=("builders.trbs", "trbsDecoded"))
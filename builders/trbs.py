@@ -0,0 +1,142 @@
+# Copyright (c) 2025 Darshan P. All rights reserved.
+
+# This work is licensed under the terms of the MIT license.
+# For a copy, see <https://opensource.org/licenses/MIT>.
+
+# This file decodes arrays of Transfer Request Blocks (TRBs). Every TRB is 16 bytes and
+# its TRB Type field (bits 15:10 of its last dword) selects the layout of the rest of
+# it: transfer TRBs, command TRBs and event TRBs each have their own. TRB types without
+# a layout of their own are decoded with the generic parameter/status/control layout.
+
+from builders.constants import VisualizationException, mapTRBType, mapCompletionCode
+from builders.fields import trbSize, extractFields, commandCompletionEventLayout
+from helpers import byteView, bytes2dwords
+
+# Layout pieces shared by many TRB types (field name, dword index, lowest bit, width in bits)
+dataBufferPointer = [("dataBufferPointerLo", 0, 0, 32), ("dataBufferPointerHi", 1, 0, 32)]
+noParameter = [("RsvdZ", 0, 0, 32), ("RsvdZ", 1, 0, 32)]
+interrupterOnly = [("RsvdZ", 2, 0, 22), ("interrupterTarget", 2, 22, 10)]
+transferStatus = [("trbTransferLength", 2, 0, 17), ("tdSize", 2, 17, 5), ("interrupterTarget", 2, 22, 10)]
+noStatus = [("RsvdZ", 2, 0, 32)]
+completionStatus = [("RsvdZ", 2, 0, 24), ("completionCode", 2, 24, 8)]
+cycleAndType = [("cycleBit", 3, 0, 1), ("trbType", 3, 10, 6)]
+slotIdControl = [("RsvdZ", 3, 16, 8), ("slotId", 3, 24, 8)]
+
+trbLayouts:dict[int, list[tuple[str,int,int,int]]] = {
+  # Normal
+  1  : dataBufferPointer + transferStatus + cycleAndType + [
+        ("ENT", 3, 1, 1), ("ISP", 3, 2, 1), ("NS", 3, 3, 1), ("CH", 3, 4, 1), ("IOC", 3, 5, 1), ("IDT", 3, 6, 1),
+        ("RsvdZ", 3, 7, 2), ("BEI", 3, 9, 1), ("RsvdZ", 3, 16, 16)],
+  # Setup Stage
+  2  : [("bmRequestType", 0, 0, 8), ("bRequest", 0, 8, 8), ("wValue", 0, 16, 16), ("wIndex", 1, 0, 16), ("wLength", 1, 16, 16),
+        ("trbTransferLength", 2, 0, 17), ("RsvdZ", 2, 17, 5), ("interrupterTarget", 2, 22, 10)] + cycleAndType + [
+        ("RsvdZ", 3, 1, 4), ("IOC", 3, 5, 1), ("IDT", 3, 6, 1), ("RsvdZ", 3, 7, 3), ("TRT", 3, 16, 2), ("RsvdZ", 3, 18, 14)],
+  # Data Stage
+  3  : dataBufferPointer + transferStatus + cycleAndType + [
+        ("ENT", 3, 1, 1), ("ISP", 3, 2, 1), ("NS", 3, 3, 1), ("CH", 3, 4, 1), ("IOC", 3, 5, 1), ("IDT", 3, 6, 1),
+        ("RsvdZ", 3, 7, 3), ("DIR", 3, 16, 1), ("RsvdZ", 3, 17, 15)],
+  # Status Stage
+  4  : noParameter + interrupterOnly + cycleAndType + [
+        ("ENT", 3, 1, 1), ("RsvdZ", 3, 2, 2), ("CH", 3, 4, 1), ("IOC", 3, 5, 1), ("RsvdZ", 3, 6, 4), ("DIR", 3, 16, 1), ("RsvdZ", 3, 17, 15)],
+  # Isoch
+  5  : dataBufferPointer + transferStatus + cycleAndType + [
+        ("ENT", 3, 1, 1), ("ISP", 3, 2, 1), ("NS", 3, 3, 1), ("CH", 3, 4, 1), ("IOC", 3, 5, 1), ("IDT", 3, 6, 1),
+        ("TBC", 3, 7, 2), ("BEI", 3, 9, 1), ("TLBPC", 3, 16, 4), ("frameId", 3, 20, 11), ("SIA", 3, 31, 1)],
+  # Link
+  6  : [("RsvdZ", 0, 0, 4), ("ringSegmentPointerLo", 0, 4, 28), ("ringSegmentPointerHi", 1, 0, 32)] + interrupterOnly + cycleAndType + [
+        ("TC", 3, 1, 1), ("RsvdZ", 3, 2, 2), ("CH", 3, 4, 1), ("IOC", 3, 5, 1), ("RsvdZ", 3, 6, 4), ("RsvdZ", 3, 16, 16)],
+  # Event Data
+  7  : [("eventDataLo", 0, 0, 32), ("eventDataHi", 1, 0, 32)] + interrupterOnly + cycleAndType + [
+        ("ENT", 3, 1, 1), ("RsvdZ", 3, 2, 2), ("CH", 3, 4, 1), ("IOC", 3, 5, 1), ("RsvdZ", 3, 6, 3), ("BEI", 3, 9, 1), ("RsvdZ", 3, 16, 16)],
+  # No Op
+  8  : noParameter + interrupterOnly + cycleAndType + [
+        ("ENT", 3, 1, 1), ("RsvdZ", 3, 2, 2), ("CH", 3, 4, 1), ("IOC", 3, 5, 1), ("RsvdZ", 3, 6, 4), ("RsvdZ", 3, 16, 16)],
+  # Enable Slot Command
+  9  : noParameter + noStatus + cycleAndType + [("RsvdZ", 3, 1, 9), ("slotType", 3, 16, 5), ("RsvdZ", 3, 21, 11)],
+  # Disable Slot Command
+  10 : noParameter + noStatus + cycleAndType + [("RsvdZ", 3, 1, 9)] + slotIdControl,
+  # Address Device Command
+  11 : [("RsvdZ", 0, 0, 4), ("inputContextPointerLo", 0, 4, 28), ("inputContextPointerHi", 1, 0, 32)] + noStatus + cycleAndType + [
+        ("RsvdZ", 3, 1, 8), ("BSR", 3, 9, 1)] + slotIdControl,
+  # Configure Endpoint Command
+  12 : [("RsvdZ", 0, 0, 4), ("inputContextPointerLo", 0, 4, 28), ("inputContextPointerHi", 1, 0, 32)] + noStatus + cycleAndType + [
+        ("RsvdZ", 3, 1, 8), ("DC", 3, 9, 1)] + slotIdControl,
+  # Evaluate Context Command
+  13 : [("RsvdZ", 0, 0, 4), ("inputContextPointerLo", 0, 4, 28), ("inputContextPointerHi", 1, 0, 32)] + noStatus + cycleAndType + [
+        ("RsvdZ", 3, 1, 9)] + slotIdControl,
+  # Reset Endpoint Command
+  14 : noParameter + noStatus + cycleAndType + [("RsvdZ", 3, 1, 8), ("TSP", 3, 9, 1), ("endpointId", 3, 16, 5), ("RsvdZ", 3, 21, 3), ("slotId", 3, 24, 8)],
+  # Stop Endpoint Command
+  15 : noParameter + noStatus + cycleAndType + [("RsvdZ", 3, 1, 9), ("endpointId", 3, 16, 5), ("RsvdZ", 3, 21, 2), ("SP", 3, 23, 1), ("slotId", 3, 24, 8)],
+  # Set TR Dequeue Pointer Command
+  16 : [("DCS", 0, 0, 1), ("SCT", 0, 1, 3), ("newTRDequeuePointerLo", 0, 4, 28), ("newTRDequeuePointerHi", 1, 0, 32),
+        ("RsvdZ", 2, 0, 16), ("streamId", 2, 16, 16)] + cycleAndType + [
+        ("RsvdZ", 3, 1, 9), ("endpointId", 3, 16, 5), ("RsvdZ", 3, 21, 3), ("slotId", 3, 24, 8)],
+  # Reset Device Command
+  17 : noParameter + noStatus + cycleAndType + [("RsvdZ", 3, 1, 9)] + slotIdControl,
+  # No Op Command
+  23 : noParameter + noStatus + cycleAndType + [("RsvdZ", 3, 1, 9), ("RsvdZ", 3, 16, 16)],
+  # Transfer Event
+  32 : [("trbPointerLo", 0, 0, 32), ("trbPointerHi", 1, 0, 32), ("trbTransferLength", 2, 0, 24), ("completionCode", 2, 24, 8)] + cycleAndType + [
+        ("RsvdZ", 3, 1, 1), ("ED", 3, 2, 1), ("RsvdZ", 3, 3, 7), ("endpointId", 3, 16, 5), ("RsvdZ", 3, 21, 3), ("slotId", 3, 24, 8)],
+  # Command Completion Event
+  33 : commandCompletionEventLayout,
+  # Port Status Change Event
+  34 : [("RsvdZ", 0, 0, 24), ("portId", 0, 24, 8), ("RsvdZ", 1, 0, 32)] + completionStatus + cycleAndType + [("RsvdZ", 3, 1, 9), ("RsvdZ", 3, 16, 16)],
+  # Bandwidth Request Event
+  35 : noParameter + completionStatus + cycleAndType + [("RsvdZ", 3, 1, 9)] + slotIdControl,
+  # Doorbell Event
+  36 : [("dbReason", 0, 0, 5), ("RsvdZ", 0, 5, 27), ("RsvdZ", 1, 0, 32)] + completionStatus + cycleAndType + [
+        ("RsvdZ", 3, 1, 9), ("vfId", 3, 16, 8), ("slotId", 3, 24, 8)],
+  # Host Controller Event
+  37 : noParameter + completionStatus + cycleAndType + [("RsvdZ", 3, 1, 9), ("RsvdZ", 3, 16, 16)],
+  # Device Notification Event
+  38 : [("RsvdZ", 0, 0, 4), ("notificationType", 0, 4, 4), ("notificationDataLo", 0, 8, 24), ("notificationDataHi", 1, 0, 32)] +
+        completionStatus + cycleAndType + [("RsvdZ", 3, 1, 9)] + slotIdControl,
+  # MFINDEX Wrap Event
+  39 : noParameter + completionStatus + cycleAndType + [("RsvdZ", 3, 1, 9), ("RsvdZ", 3, 16, 16)],
+}
+
+# Layout of the TRB types without a layout of their own
+genericTRBLayout:list[tuple[str,int,int,int]] = [
+  ("parameterLo", 0, 0, 32), ("parameterHi", 1, 0, 32), ("status", 2, 0, 32),
+  ("cycleBit", 3, 0, 1), ("flags", 3, 1, 9), ("trbType", 3, 10, 6), ("control", 3, 16, 16),
+]
+
+def joinSplitFields(layout:list[tuple[str,int,int,int]], fields:dict[str,int]) -> dict[str,int]:
+  '''
+  This function joins every field split into a Lo and a Hi part (64-bit pointers and data) into a single
+  value. The Lo part keeps its position, so 16-byte aligned pointers come out as full addresses.
+  '''
+  lowBits = {name: lowBit for name, _, lowBit, _ in layout}
+  joined:dict[str,int] = {}
+  for name, value in fields.items():
+    if name.endswith("Lo") and name[:-2] + "Hi" in fields:
+      high = fields[name[:-2] + "Hi"]
+      if name == "notificationDataLo":
+        # Device Notification Data is a value starting at bit 8, not an address
+        joined[name[:-2]] = (high << 24) | value
+      else:
+        joined[name[:-2]] = (high << 32) | (value << lowBits[name])
+    elif not (name.endswith("Hi") and name[:-2] + "Lo" in fields):
+      joined[name] = value
+  return joined
+
+def decodeTRB(data:list[int] | bytes) -> dict:
+  '''This function decodes one TRB with the layout of its TRB Type'''
+  dwords = bytes2dwords(data, 0, trbSize//4)
+  trbType = (dwords[3] >> 10) & 0x3F
+  layout = trbLayouts.get(trbType, genericTRBLayout)
+  fields = joinSplitFields(layout, extractFields(layout, dwords))
+  decoded = {"trbType": trbType, "trbTypeName": mapTRBType(trbType), "fields": fields}
+  if "completionCode" in fields:
+    decoded["completionCodeName"] = mapCompletionCode(fields["completionCode"])
+  return decoded
+
+def trbsDecoded(data:list[int]) -> list[dict]:
+  '''This function decodes every complete TRB of the data, in order, with its index and byte offset'''
+  if len(data) < trbSize:
+    raise VisualizationException(f"Expecting at-least {trbSize} bytes per TRB. Got {len(data)} bytes")
+  data = byteView(data)
+  return [{"index": index, "offset": offset, **decodeTRB(data[offset:offset+trbSize])}
+          for index, offset in enumerate(range(0, len(data) - trbSize + 1, trbSize))]
@@ -0,0 +1,184 @@
+# Copyright (c) 2025 Darshan P. All rights reserved.
+
+# This work is licensed under the terms of the MIT license.
+# For a copy, see <https://opensource.org/licenses/MIT>.
+
+# This file contains the rules that check xHCI data structures against the
+# constraints of the specification. Rules only look at decoded field values and
+# never build a visualization, so whole batches of captures can be checked quickly.
+
+import json
+import xml.etree.ElementTree as ET
+from typing import Iterable
+
+from builders.constants import VisualizationException, slotStateMap, endpointStateMap, epTypeMap
+from builders.fields import (slotContextLayout, endpointContextLayout, inputControlContextLayout,
+                             extractFields, reservedBitViolations, endpointContextName)
+from builders.registry import checkSize, loadFunction
+from helpers import byteView, bytes2dwords
+
+def createIssue(rule:str, severity:str, context:str, message:str) -> dict[str,str]:
+  '''This function creates a single validation finding'''
+  return {"rule": rule, "severity": severity, "context": context, "message": message}
+
+def reservedIssues(layout:list[tuple[str,int,int,int]], dwords:list[int], context:str, skip:tuple = ()) -> list[dict[str,str]]:
+  '''This function reports every RsvdZ field which is not zero'''
+  return [
+    createIssue("rsvdz", "error", context,
+                f"RsvdZ bits {lowBit+width-1}:{lowBit} of dword {dword} ({format(dword*4,"02X")}H) are {hex(value)}, expected 0")
+    for dword, lowBit, width, value in reservedBitViolations(layout, dwords, skip)
+  ]
+
+#########################################################################################
+# Rules for individual data structures
+#########################################################################################
+
+def validateSlotContext(data:list[int], context:str = "Slot Context") -> list[dict[str,str]]:
+  '''This function validates a slot context'''
+  dwords = bytes2dwords(data, 0, 8)
+  fields = extractFields(slotContextLayout, dwords)
+  issues = reservedIssues(slotContextLayout, dwords, context)
+
+  if fields["slotState"] not in slotStateMap:
+    issues.append(createIssue("slot-state", "error", context, f"Slot State {fields['slotState']} is reserved"))
+  if fields["slotState"] != 0 and fields["contextEntries"] == 0:
+    issues.append(createIssue("context-entries", "error", context, "Context Entries is 0 while the slot is not Disabled"))
+  return issues
+
+def validateEndpointContext(data:list[int], context:str = "Endpoint Context") -> list[dict[str,str]]:
+  '''This function validates an endpoint context'''
+  dwords = bytes2dwords(data, 0, 8)
+  fields = extractFields(endpointContextLayout, dwords)
+  # Dword 2 bits 3:1 belong to the TR Dequeue Pointer and get their own rule below
+  issues = reservedIssues(endpointContextLayout, dwords, context, skip=((2, 1),))
+
+  state = fields["endpointState"]
+  epType = fields["epType"]
+  if state not in endpointStateMap:
+    issues.append(createIssue("ep-state", "error", context, f"Endpoint State {state} is reserved"))
+  if epType not in epTypeMap and state != 0:
+    issues.append(createIssue("ep-type", "error", context, f"EP Type {epType} is not valid for an endpoint in {endpointStateMap.get(state, 'Reserved')} state"))
+  if fields["maxPStreams"] != 0 and epType not in (2, 6):
+    issues.append(createIssue("max-pstreams", "error", context,
+                              f"MaxPStreams is {fields['maxPStreams']} on a {epTypeMap.get(epType, 'Not Valid')} endpoint. Streams are only supported on Bulk endpoints"))
+  if (dwords[2] >> 1) & 0x7:
+    issues.append(createIssue("dequeue-alignment", "error", context,
+                              f"TR Dequeue Pointer is not 16-byte aligned (bits 3:1 of dword 2 are {bin((dwords[2] >> 1) & 0x7)})"))
+  return issues
+
+def validateInputControlContext(data:list[int], context:str = "Input Control Context") -> list[dict[str,str]]:
+  '''This function validates an input control context'''
+  dwords = bytes2dwords(data, 0, 8)
+  fields = extractFields(inputControlContextLayout, dwords)
+  issues = reservedIssues(inputControlContextLayout, dwords, context)
+
+  dropFlags = fields["dropContextFlags"]
+  addFlags = fields["addContextFlags"]
+  if dropFlags & 0x3:
+    issues.append(createIssue("drop-flags", "error", context, "Drop flags D0 and D1 are reserved. The Slot and EP0 contexts can not be dropped"))
+  overlap = dropFlags & addFlags & ~0x3
+  if overlap:
+    flags = ", ".join(f"{bit}" for bit in range(32) if (overlap >> bit) & 1)
+    issues.append(createIssue("add-drop-conflict", "warning", context,
+                              f"Contexts {flags} are both dropped and added. They will be dropped and re-added"))
+  return issues
+
+#########################################################################################
+# Rules for chained/grouped data structures
+#########################################################################################
+
+def validateDeviceContext(data:list[int], context:str = "Device Context") -> list[dict[str,str]]:
+  '''This function validates a device context, including consistency between its contexts'''
+  data = byteView(data)
+  issues = validateSlotContext(data[:32], f"{context} / Slot Context")
+  contextEntries = extractFields(slotContextLayout, bytes2dwords(data, 0, 8))["contextEntries"]
+
+  for endpointIndex in range(31):
+    endpointSegment = data[(endpointIndex+1)*32 : (endpointIndex+2)*32]
+    endpointName = f"{context} / {endpointContextName(endpointIndex).strip()}"
+    issues += validateEndpointContext(endpointSegment, endpointName)
+    # Device Context Index of this endpoint is its index + 1
+    state = extractFields(endpointContextLayout, bytes2dwords(endpointSegment, 0, 8))["endpointState"]
+    if state != 0 and endpointIndex + 1 > contextEntries:
+      issues.append(createIssue("context-entries", "error", endpointName,
+                                f"Endpoint is {endpointStateMap.get(state, 'Reserved')} at DCI {endpointIndex+1} but Context Entries is {contextEntries}"))
+  return issues
+
+def validateInputContext(data:list[int], context:str = "Input Context") -> list[dict[str,str]]:
+  '''This function validates an input context, including add flags against the slot context'''
+  data = byteView(data)
+  issues = validateInputControlContext(data[:32], f"{context} / Input Control Context")
+  issues += validateDeviceContext(data[32:], context)
+
+  addFlags = extractFields(inputControlContextLayout, bytes2dwords(data, 0, 8))["addContextFlags"]
+  contextEntries = extractFields(slotContextLayout, bytes2dwords(data, 32, 8))["contextEntries"]
+  if addFlags & 0x1:
+    lastAdded = addFlags.bit_length() - 1
+    if lastAdded > contextEntries:
+      issues.append(createIssue("context-entries", "error", f"{context} / Input Control Context",
+                                f"Add flag A{lastAdded} is set but the Slot Context's Context Entries is {contextEntries}"))
+  for dci in range(2, 32):
+    if (addFlags >> dci) & 1:
+      epType = extractFields(endpointContextLayout, bytes2dwords(data, 32+dci*32, 8))["epType"]
+      if epType not in epTypeMap:
+        issues.append(createIssue("ep-type", "error", f"{context} / {endpointContextName(dci-1).strip()}",
+                                  f"Add flag A{dci} is set but the endpoint's EP Type is {epType} (Not Valid)"))
+  return issues
+
+#########################################################################################
+# The following functions run the rules and create reports
+#########################################################################################
+
+def validateStructure(struct:str, byteData:list[int]) -> list[dict[str,str]]:
+  '''This function runs every rule that applies to the given data structure'''
+  checkSize(struct, byteData)
+  return loadFunction(struct, "validator")(byteData)
+
+def validateBatch(struct:str, captures:Iterable[tuple[str, list[int] | Exception]]) -> dict:
+  '''
+  This function validates a batch of (name, bytes) captures and returns a report.
+  A capture that can not be validated at all (too short etc.) is reported as an error, and so is a
+  capture that could not be read, which is given as the exception raised reading it instead of its bytes.
+  '''
+  results:list[dict] = []
+  for name, byteData in captures:
+    if isinstance(byteData, Exception):
+      results.append({"name": name, "issues": [createIssue("read", "error", name, str(byteData))]})
+      continue
+    try:
+      issues = validateStructure(struct, byteData)
+    except VisualizationException as e:
+      issues = [createIssue("size", "error", name, str(e))]
+    results.append({"name": name, "issues": issues})
+
+  return {
+    "struct": struct,
+    "captures": len(results),
+    "errors": sum(1 for result in results for issue in result["issues"] if issue["severity"] == "error"),
+    "warnings": sum(1 for result in results for issue in result["issues"] if issue["severity"] == "warning"),
+    "results": results,
+  }
+
+def reportToJSON(report:dict) -> str:
+  '''This function formats a validation report as JSON'''
+  return json.dumps(report, indent=2)
+
+def reportToJUnit(report:dict) -> str:
+  '''
+  This function formats a validation report as JUnit XML. Every capture becomes a test case,
+  errors become failures and warnings are listed in the test case's output.
+  '''
+  failedCaptures = sum(1 for result in report["results"] if any(issue["severity"] == "error" for issue in result["issues"]))
+  suite = ET.Element("testsuite", name=f"xhci-validation-{report['struct']}", tests=str(report["captures"]),
+                     failures=str(failedCaptures), errors="0")
+  for result in report["results"]:
+    case = ET.SubElement(suite, "testcase", classname=report["struct"], name=result["name"])
+    errors = [issue for issue in result["issues"] if issue["severity"] == "error"]
+    warnings = [issue for issue in result["issues"] if issue["severity"] == "warning"]
+    if errors:
+      failure = ET.SubElement(case, "failure", message=f"{len(errors)} spec violation(s)", type="xhci-spec")
+      failure.text = "\n".join(f"[{issue['rule']}] {issue['context']}: {issue['message']}" for issue in errors)
+    if warnings:
+      output = ET.SubElement(case, "system-out")
+      output.text = "\n".join(f"[{issue['rule']}] {issue['context']}: {issue['message']}" for issue in warnings)
+  return ET.tostring(suite, encoding="unicode")
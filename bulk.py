@@ -0,0 +1,102 @@
+# Copyright (c) 2025 Darshan P. All rights reserved.
+
+# This work is licensed under the terms of the MIT license.
+# For a copy, see <https://opensource.org/licenses/MIT>.
+
+# This file decodes many contexts at once using NumPy. A contiguous buffer of N records
+# is viewed as an N x dwords array without copying, every field is extracted for all
+# contexts with one vectorized shift and mask, and enumerated values are mapped to
+# their names through lookup tables. The result is columnar: field name -> array.
+# NumPy is optional, it is only needed by the functions of this file.
+
+from typing import Callable
+
+from builders.constants import VisualizationException, mapSlotState, mapEndpointState, mapEPType, mapPortSpeed
+from builders.fields import slotContextLayout, endpointContextLayout, inputControlContextLayout, compileFields
+
+# Size of one record, and (byte offset of the input control context, slot context, DCI 0) inside it
+bulkStructures:dict[str, tuple[int, int | None, int | None, int | None]] = {
+  "slotctx" : (32,   None, 0,    None),
+  "endpctx" : (32,   None, None, 0),
+  "icctx"   : (32,   0,    None, None),
+  "devctx"  : (1024, None, 0,    0),
+  "ipctx"   : (1056, 0,    32,   32),
+}
+
+# Enumerated fields that also get a column holding their names, named like the columns of the decoders in details.py
+namedColumns:dict[str, dict[str, tuple[str, Callable[[int],str], int]]] = {
+  "slot_context"     : {"slotState": ("slotStateName", mapSlotState, 5), "speed": ("speedName", mapPortSpeed, 4)},
+  "endpoint_context" : {"endpointState": ("endpointStateName", mapEndpointState, 3), "epType": ("epTypeName", mapEPType, 3)},
+}
+
+def importNumpy():
+  '''This function imports NumPy, which is only needed for bulk decoding'''
+  try:
+    import numpy
+  except ImportError:
+    raise VisualizationException("Bulk decoding needs numpy. Install it using: pip install numpy")
+  return numpy
+
+def lookupTable(mapper:Callable[[int],str], width:int):
+  '''This function creates an array holding the name of every value of a `width`-bit field'''
+  np = importNumpy()
+  return np.array([mapper(value) for value in range(1 << width)])
+
+def extractColumns(table:str, layout:list[tuple[str,int,int,int]], block) -> dict:
+  '''
+  This function extracts every named field of a layout out of an M x 8 array of dwords (one context
+  per row) using vectorized shifts and masks, and adds name columns for enumerated fields.
+  '''
+  np = importNumpy()
+  columns:dict = {}
+  for name, dword, lowBit, mask in compileFields(layout):
+    columns[name] = ((block[:, dword] >> np.uint32(lowBit)) & np.uint32(mask)).astype(np.uint32)
+  for field, (columnName, mapper, width) in namedColumns.get(table, {}).items():
+    columns[columnName] = lookupTable(mapper, width)[columns[field]]
+  return columns
+
+def decodeBulk(structName:str, buffer) -> dict[str, dict]:
+  '''
+  This function decodes every complete record of `structName` in a contiguous buffer (bytes, mmap, ...)
+  into columns, one dict of field name -> NumPy array per table. Rows of every table carry the "record"
+  number they came from, endpoint rows also carry their Device Context Index ("dci").
+  Dwords are read in the same byte order as `bytes2dwords`.
+  '''
+  np = importNumpy()
+  structName = structName.strip().lower()
+  if structName not in bulkStructures:
+    raise VisualizationException(f"Bulk decoding of {structName} is not supported. Supported structures are {', '.join(bulkStructures)}")
+  recordSize, inputControlOffset, slotOffset, endpointOffset = bulkStructures[structName]
+  count = len(buffer) // recordSize
+  dwords = np.frombuffer(buffer, dtype='>u4', count=count * recordSize // 4).reshape(count, recordSize // 4)
+  records = np.arange(count, dtype=np.uint32)
+  result:dict[str, dict] = {}
+
+  if inputControlOffset is not None:
+    block = dwords[:, inputControlOffset//4 : inputControlOffset//4 + 8]
+    result["input_control_context"] = {"record": records, **extractColumns("input_control_context", inputControlContextLayout, block)}
+
+  if slotOffset is not None:
+    block = dwords[:, slotOffset//4 : slotOffset//4 + 8]
+    result["slot_context"] = {"record": records, **extractColumns("slot_context", slotContextLayout, block)}
+
+  if endpointOffset is not None:
+    if structName == "endpctx":
+      block, dcis = dwords, np.zeros(count, dtype=np.uint32)
+    else:
+      # Endpoint contexts follow the slot context: 31 of them per record, DCI 1 to 31
+      base = endpointOffset // 4 + 8
+      block = dwords[:, base : base + 31*8].reshape(count * 31, 8)
+      dcis = np.tile(np.arange(1, 32, dtype=np.uint32), count)
+      records = np.repeat(records, 31)
+    columns = extractColumns("endpoint_context", endpointContextLayout, block)
+    columns["trDequeuePointer"] = (columns["trDequeuePointerHi"].astype(np.uint64) << np.uint64(32)) | (columns["trDequeuePointerLo"].astype(np.uint64) << np.uint64(4))
+    columns["maxESITPayload"] = (columns["maxESITPayloadHi"] << np.uint32(16)) | columns["maxESITPayloadLo"]
+    result["endpoint_context"] = {"record": records, "dci": dcis, **columns}
+
+  return result
+
+def toStructuredArray(columns:dict):
+  '''This function joins the columns of a table into a single NumPy structured array (one record per row)'''
+  np = importNumpy()
+  return np.rec.fromarrays(list(columns.values()), names=list(columns.keys()))
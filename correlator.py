@@ -0,0 +1,139 @@
+# Copyright (c) 2025 Darshan P. All rights reserved.
+
+# This work is licensed under the terms of the MIT license.
+# For a copy, see <https://opensource.org/licenses/MIT>.
+
+# This file matches the commands of a Command Ring with the Command Completion Events
+# the controller posted for them. Commands are kept in a hash index on their TRB
+# pointer until their event arrives, so captures of any length are correlated in a
+# single pass. The result holds per command type latency percentiles, completion code
+# histograms and the commands that never completed.
+
+from collections import Counter, deque
+from typing import Iterable, Iterator
+
+from builders.constants import VisualizationException, mapTRBType, mapCompletionCode
+from builders.fields import trbSize, commandTRBFields, commandCompletionEventFields
+
+# TRB Types of the commands (Enable Slot to Set Extended Property) and of the events they complete with
+commandTRBTypes = range(9, 26)
+commandCompletionEventType = 33
+
+# Commands whose parameter is the pointer to an Input Context
+inputContextCommandTypes = (11, 12, 13)
+
+# Latency percentiles reported for every command type
+reportedPercentiles = (50, 90, 99)
+
+def ringRecords(data:bytes, baseAddress:int = 0) -> Iterator[dict]:
+  '''
+  This function yields every TRB of a ring dump as a record. The pointer of a TRB is its physical
+  address, `baseAddress` being the address of the first TRB of the dump. All-zero (never written)
+  TRBs are skipped. A dump holds no time, so the records carry none.
+  '''
+  for offset in range(0, len(data) - trbSize + 1, trbSize):
+    trb = bytes(data[offset:offset+trbSize])
+    if any(trb):
+      yield {"pointer": baseAddress + offset, "time": None, "trb": trb}
+
+def traceRecords(lines:Iterable[str]) -> Iterator[dict]:
+  '''
+  This function yields the records of a text trace. Every line holds a timestamp in microseconds,
+  the address of the TRB (hex) and its 16 bytes (hex, contiguous or space separated), in the order
+  they were seen on the bus. Empty lines and lines starting with # are skipped.
+  '''
+  for lineNumber, line in enumerate(lines, 1):
+    line = line.strip()
+    if not line or line.startswith("#"):
+      continue
+    tokens = line.replace(",", " ").split()
+    try:
+      trb = bytes.fromhex("".join(token[2:] if token.lower().startswith("0x") else token for token in tokens[2:]))
+      if len(trb) != trbSize:
+        raise ValueError(f"expecting {trbSize} TRB bytes")
+      yield {"pointer": int(tokens[1], 16), "time": float(tokens[0]), "trb": trb}
+    except ValueError as e:
+      raise VisualizationException(f"Line {lineNumber} of the trace is not <time> <address> <TRB bytes>: {e}")
+
+def percentile(sortedValues:list[float], rank:int) -> float:
+  '''This function returns the nearest-rank percentile of sorted values'''
+  return sortedValues[max(0, -(-rank * len(sortedValues) // 100) - 1)]
+
+def latencyStatistics(latencies:list[float]) -> dict:
+  '''This function summarizes the latencies of one command type'''
+  if not latencies:
+    return {}
+  latencies = sorted(latencies)
+  statistics = {f"p{rank}": percentile(latencies, rank) for rank in reportedPercentiles}
+  statistics["mean"] = sum(latencies) / len(latencies)
+  statistics["max"] = latencies[-1]
+  return statistics
+
+def correlateCommands(records:Iterable[dict]) -> dict:
+  '''
+  This function correlates command TRBs with their Command Completion Events in a single pass over
+  `records` (in the order they were written). Issued commands wait in an index keyed by their TRB
+  pointer, so every event is matched in constant time. A ring reuses its TRBs, so the index holds a
+  queue per pointer and an event completes the oldest command issued at its pointer.
+  Returns the per command type statistics, the outstanding commands, the completed commands that
+  reference an Input Context and the number of events no command was found for.
+  '''
+  pending:dict[int, deque] = {}
+  latencies:dict[str, list[float]] = {}
+  completionCodes:dict[str, Counter] = {}
+  issued:Counter = Counter()
+  inputContexts:list[dict] = []
+  unmatchedEvents = 0
+
+  for record in records:
+    # TRB Type sits in bits 15:10 of the last dword, read in the same byte order as `bytes2dwords`
+    trbType = (int.from_bytes(record["trb"][12:16], 'big') >> 10) & 0x3F
+    if trbType in commandTRBTypes:
+      fields = commandTRBFields(record["trb"])
+      command = {"pointer": record["pointer"], "time": record["time"], "type": mapTRBType(trbType), "slotId": fields["slotId"]}
+      if trbType in inputContextCommandTypes:
+        command["inputContextPointer"] = fields["inputContextPointer"]
+      pending.setdefault(record["pointer"], deque()).append(command)
+      issued[command["type"]] += 1
+    elif trbType == commandCompletionEventType:
+      fields = commandCompletionEventFields(record["trb"])
+      waiting = pending.get(fields["commandTRBPointer"])
+      if not waiting:
+        unmatchedEvents += 1
+        continue
+      command = waiting.popleft()
+      if not waiting:
+        del pending[fields["commandTRBPointer"]]
+      completionCodes.setdefault(command["type"], Counter())[mapCompletionCode(fields["completionCode"])] += 1
+      if command["time"] is not None and record["time"] is not None:
+        latencies.setdefault(command["type"], []).append(record["time"] - command["time"])
+      if "inputContextPointer" in command:
+        inputContexts.append({**command, "completionCode": mapCompletionCode(fields["completionCode"]), "eventSlotId": fields["slotId"]})
+
+  outstanding = sorted((command for waiting in pending.values() for command in waiting),
+                       key=lambda command: (command["time"] is None, command["time"] or 0, command["pointer"]))
+  statistics = {commandType: {
+      "issued"          : count,
+      "completed"       : sum(completionCodes.get(commandType, Counter()).values()),
+      "completionCodes" : dict(completionCodes.get(commandType, Counter()).most_common()),
+      "latency"         : latencyStatistics(latencies.get(commandType, [])),
+    } for commandType, count in issued.most_common()}
+  return {"statistics": statistics, "outstanding": outstanding, "inputContexts": inputContexts, "unmatchedEvents": unmatchedEvents}
+
+def correlationReport(result:dict) -> str:
+  '''This function formats the result of `correlateCommands` as a plain text report'''
+  lines:list[str] = []
+  for commandType, statistics in result["statistics"].items():
+    lines.append(f"{commandType}: {statistics['issued']} issued, {statistics['completed']} completed")
+    latency = statistics["latency"]
+    if latency:
+      lines.append("  latency (us): " + ", ".join(f"{name} {value:.3f}" for name, value in latency.items()))
+    for code, count in statistics["completionCodes"].items():
+      lines.append(f"  {code:<36} {count}")
+  lines.append(f"{len(result['outstanding'])} outstanding command(s)")
+  for command in result["outstanding"]:
+    issuedAt = f" issued at {command['time']} us" if command["time"] is not None else ""
+    lines.append(f"  {command['type']} at {hex(command['pointer'])} for slot {command['slotId']}{issuedAt}")
+  if result["unmatchedEvents"]:
+    lines.append(f"{result['unmatchedEvents']} Command Completion Event(s) without a matching command")
+  return "\n".join(lines)
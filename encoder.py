@@ -0,0 +1,236 @@
+# Copyright (c) 2025 Darshan P. All rights reserved.
+
+# This work is licensed under the terms of the MIT license.
+# For a copy, see <https://opensource.org/licenses/MIT>.
+
+# This file is the inverse of the decoders: it builds the raw bytes of contexts out of
+# field values. Values are given by field name (as in builders/fields.py, or in snake_case),
+# enumerated fields also take their names, and the output of the decoders in details.py
+# is accepted as a spec, so decoding and encoding round-trip. Bytes are laid out in the
+# same order `bytes2dwords` reads them, so encoded contexts decode to the same values.
+
+import json
+import random
+import re
+import struct
+
+from builders.constants import (VisualizationException, slotStateMap, endpointStateMap, epTypeMap, portSpeedMap)
+from builders.fields import slotContextLayout, endpointContextLayout, inputControlContextLayout, compileFields
+
+# Short names accepted next to the field names of every context
+fieldAliases:dict[str, dict[str,str]] = {
+  "slot"     : {"route": "routeString", "port": "rootHubPortNumber", "address": "usbDeviceAddress", "state": "slotState",
+                "entries": "contextEntries"},
+  "endpoint" : {"state": "endpointState", "type": "epType", "mps": "maxPacketSize", "dcs": "dequeueCycleState"},
+  "control"  : {"add": "addContextFlags", "drop": "dropContextFlags"},
+}
+
+# Enumerated fields whose values may also be given by name
+namedValues:dict[str, dict[int,str]] = {
+  "speed"         : portSpeedMap,
+  "slotState"     : slotStateMap,
+  "endpointState" : endpointStateMap,
+  "epType"        : epTypeMap,
+}
+
+# Decoded values that are not fields of the layouts and are rebuilt from the fields themselves
+derivedValues = {"dci", "name"}
+
+contextLayouts:dict[str, list[tuple[str,int,int,int]]] = {
+  "slot"     : slotContextLayout,
+  "endpoint" : endpointContextLayout,
+  "control"  : inputControlContextLayout,
+}
+
+# (name, dword, lowest bit, mask) of every named field, compiled once
+compiledLayouts:dict[str, dict[str, tuple[str,int,int,int]]] = {
+  context: {field[0]: field for field in compileFields(layout)} for context, layout in contextLayouts.items()
+}
+
+# Values that span several fields (or a whole flags dword), accepted next to the fields themselves
+compositeValues = ("trDequeuePointer", "maxESITPayload", "addedContexts", "droppedContexts")
+
+snakeCasePattern = re.compile(r"_([a-z])")
+
+def resolveName(context:str, name:str) -> str:
+  '''This function maps a field name, snake_case name or alias to the name used by the layout'''
+  name = snakeCasePattern.sub(lambda match: match.group(1).upper(), name)
+  name = fieldAliases[context].get(name, name)
+  for known in (*compiledLayouts[context], *compositeValues, *(f"{field}Name" for field in namedValues)):
+    if known.lower() == name.lower():
+      return known
+  return name
+
+def resolveValue(name:str, value) -> int:
+  '''This function converts a given value (number, hex string or name of an enumerated value) into an integer'''
+  if isinstance(value, bool):
+    return int(value)
+  if isinstance(value, int):
+    return value
+  text = str(value).strip()
+  try:
+    return int(text, 0)
+  except ValueError:
+    pass
+  candidates = [code for code, codeName in namedValues.get(name, {}).items() if codeName.lower().startswith(text.lower())]
+  exact = [code for code in candidates if namedValues[name][code].lower() == text.lower()]
+  if len(exact) == 1 or len(candidates) == 1:
+    return (exact or candidates)[0]
+  choices = f". Valid names are {', '.join(namedValues[name].values())}" if name in namedValues else ""
+  raise VisualizationException(f"{value!r} is not a valid value of {name}{choices}")
+
+def expandValues(context:str, values:dict) -> dict[str,int]:
+  '''
+  This function resolves the names and values given for a context into field name -> integer,
+  splitting values that span several fields (TR Dequeue Pointer, Max ESIT Payload, context flag lists).
+  '''
+  fields:dict[str,int] = {}
+  given = {resolveName(context, name) for name in values}
+  for name, value in values.items():
+    if name in derivedValues:
+      continue
+    name = resolveName(context, name)
+    if name == "trDequeuePointer":
+      pointer = resolveValue(name, value)
+      fields["trDequeuePointerLo"], fields["trDequeuePointerHi"] = (pointer & 0xFFFFFFFF) >> 4, pointer >> 32
+    elif name == "maxESITPayload":
+      payload = resolveValue(name, value)
+      fields["maxESITPayloadLo"], fields["maxESITPayloadHi"] = payload & 0xFFFF, payload >> 16
+    elif name in ("addedContexts", "droppedContexts"):
+      # Lists of context indexes are only used when the flags themselves are not given
+      flagsName = "addContextFlags" if name == "addedContexts" else "dropContextFlags"
+      if flagsName not in given:
+        fields[flagsName] = sum(1 << index for index in value)
+    elif name.endswith("Name") and name[:-4] in namedValues:
+      # Names of enumerated values are only used when the value itself is not given
+      if name[:-4] not in given:
+        fields[name[:-4]] = resolveValue(name[:-4], value)
+    else:
+      fields[name] = resolveValue(name, value)
+  return fields
+
+def encodeContext(context:str, values:dict) -> bytes:
+  '''
+  This function encodes one 32-byte context ("slot", "endpoint" or "control") out of field values.
+  Fields that are not given are zero, and values that do not fit in their field are an error.
+  '''
+  dwords = [0] * 8
+  compiled = compiledLayouts[context]
+  for name, value in expandValues(context, values).items():
+    if name not in compiled:
+      raise VisualizationException(f"{name} is not a field of the {context} context. Fields are {', '.join(compiled)}")
+    _, dword, lowBit, mask = compiled[name]
+    if not 0 <= value <= mask:
+      raise VisualizationException(f"{value} does not fit in {name} (at most {mask})")
+    dwords[dword] |= value << lowBit
+  return struct.pack(">8I", *dwords)
+
+def slot(**values) -> bytes:
+  '''This function encodes a slot context, e.g. slot(route=0, speed="High-speed", context_entries=3)'''
+  return encodeContext("slot", values)
+
+def endpoint(**values) -> bytes:
+  '''This function encodes an endpoint context, e.g. endpoint(state="Running", ep_type="Bulk In", mps=512)'''
+  return encodeContext("endpoint", values)
+
+def inputControl(**values) -> bytes:
+  '''This function encodes an input control context, e.g. inputControl(added_contexts=[0, 1])'''
+  return encodeContext("control", values)
+
+def contextBytes(context:str, given) -> bytes:
+  '''This function takes an already encoded context as is, and encodes field values otherwise'''
+  if isinstance(given, (bytes, bytearray)):
+    return bytes(given[:32]).ljust(32, b"\0")
+  return encodeContext(context, given or {})
+
+def endpointsByDCI(endpoints) -> dict[int, object]:
+  '''This function accepts endpoints as {DCI: values} or as a list of values carrying a "dci" (as decoded)'''
+  if isinstance(endpoints, dict):
+    return {int(dci): values for dci, values in endpoints.items()}
+  byDCI:dict[int, object] = {}
+  for index, values in enumerate(endpoints):
+    dci = values.get("dci", index + 1) if isinstance(values, dict) else index + 1
+    byDCI[dci] = values
+  return byDCI
+
+def deviceContext(slotContext = None, endpoints = ()) -> bytes:
+  '''
+  This function encodes a device context out of a slot context and endpoint contexts given by
+  Device Context Index (1 to 31). Both may be field values or already encoded bytes.
+  '''
+  contexts = [contextBytes("slot", slotContext)] + [bytes(32)] * 31
+  for dci, values in endpointsByDCI(endpoints).items():
+    if not 1 <= dci <= 31:
+      raise VisualizationException(f"Device Context Index {dci} is not between 1 and 31")
+    contexts[dci] = contextBytes("endpoint", values)
+  return b"".join(contexts)
+
+def inputContext(control = None, slotContext = None, endpoints = ()) -> bytes:
+  '''This function encodes an input context: an input control context followed by a device context'''
+  return contextBytes("control", control) + deviceContext(slotContext, endpoints)
+
+def encodeStructure(structName:str, spec:dict) -> bytes:
+  '''
+  This function encodes any structure the encoder supports out of a spec. Specs use the keys of the
+  decoders ("slotContext", "endpointContexts", "inputControlContext") or for single contexts hold the
+  field values directly, so the output of `decodeStructure` encodes back to the same bytes.
+  '''
+  structName = structName.strip().lower()
+  if structName == "slotctx":
+    return encodeContext("slot", spec)
+  if structName == "endpctx":
+    return encodeContext("endpoint", spec)
+  if structName == "icctx":
+    return encodeContext("control", spec)
+  if structName == "devctx":
+    return deviceContext(spec.get("slotContext"), spec.get("endpointContexts", ()))
+  if structName == "ipctx":
+    return inputContext(spec.get("inputControlContext"), spec.get("slotContext"), spec.get("endpointContexts", ()))
+  raise VisualizationException(f"Encoding {structName} is not supported. Supported structures are slotctx, endpctx, icctx, devctx, ipctx")
+
+def loadSpec(specPath:str) -> dict:
+  '''This function reads a JSON or YAML (needs PyYAML) spec. Specs may name their structure using a "struct" key'''
+  with open(specPath, 'r') as specFile:
+    if specPath.lower().endswith((".yaml", ".yml")):
+      try:
+        import yaml
+      except ImportError:
+        raise VisualizationException("YAML specs need PyYAML. Install it using: pip install pyyaml")
+      return yaml.safe_load(specFile) or {}
+    return json.load(specFile)
+
+def randomContext(context:str, rng:random.Random, valid:bool = True) -> bytes:
+  '''
+  This function encodes a context with random field values. With `valid`, enumerated fields only take
+  defined values and reserved bits stay zero, otherwise every bit of the context is random.
+  '''
+  if not valid:
+    return rng.randbytes(32)
+  dwords = [0] * 8
+  for name, dword, lowBit, mask in compiledLayouts[context].values():
+    value = rng.choice(list(namedValues[name])) if name in namedValues else rng.getrandbits(mask.bit_length())
+    dwords[dword] |= value << lowBit
+  return struct.pack(">8I", *dwords)
+
+def randomVariants(structName:str, count:int, seed:int | None = None, valid:bool = True):
+  '''
+  This function yields `count` random encodings of a structure for throughput and fuzz testing.
+  A `seed` makes the series reproducible.
+  '''
+  rng = random.Random(seed)
+  structName = structName.strip().lower()
+  contexts = {"slotctx": ["slot"], "endpctx": ["endpoint"], "icctx": ["control"],
+              "devctx": ["slot"] + ["endpoint"]*31, "ipctx": ["control", "slot"] + ["endpoint"]*31}.get(structName)
+  if contexts is None:
+    raise VisualizationException(f"Encoding {structName} is not supported. Supported structures are slotctx, endpctx, icctx, devctx, ipctx")
+  for _ in range(count):
+    yield b"".join(randomContext(context, rng, valid) for context in contexts)
+
+def formatEncoded(data:bytes, outputFormat:str = "bytes") -> str:
+  '''
+  This function formats encoded data as text the tool reads back: hex bytes, or 32-bit words
+  (for --word, which reads every word as little-endian bytes)
+  '''
+  if outputFormat == "words":
+    return " ".join(f"0x{word:08x}" for word in struct.unpack(f"<{len(data)//4}I", data))
+  return " ".join(f"{byte:02x}" for byte in data)
@@ -0,0 +1,178 @@
+# Copyright (c) 2025 Darshan P. All rights reserved.
+
+# This work is licensed under the terms of the MIT license.
+# For a copy, see <https://opensource.org/licenses/MIT>.
+
+# This file exports decoded fields of many captured contexts into columnar tables,
+# one table per structure type with a column per field. Tables are written to
+# SQLite using batched inserts or to Parquet (needs pyarrow) using row groups.
+
+import importlib.util
+import os
+import sqlite3
+import struct
+from itertools import repeat
+from typing import Iterable, Iterator
+
+from builders.constants import VisualizationException
+from builders.fields import slotContextLayout, endpointContextLayout, inputControlContextLayout, compileFields
+
+# Table name and layout of every structure type that can be exported
+exportTables:dict[str, list[tuple[str,int,int,int]]] = {
+  "slot_context"          : slotContextLayout,
+  "endpoint_context"      : endpointContextLayout,
+  "input_control_context" : inputControlContextLayout,
+}
+
+# Columns identifying where a row came from. Endpoint rows also carry their Device Context Index
+keyColumns:dict[str, list[str]] = {
+  "slot_context"          : ["source", "record"],
+  "endpoint_context"      : ["source", "record", "dci"],
+  "input_control_context" : ["source", "record"],
+}
+
+# Size in bytes of one record of every structure that can be exported
+recordSizes:dict[str,int] = {
+  "slotctx" : 32,
+  "endpctx" : 32,
+  "icctx"   : 32,
+  "devctx"  : 1024,
+  "ipctx"   : 1056,
+}
+
+# Precomputed field columns, so the per-context work is only shifts and masks
+tableColumns:dict[str, list[tuple[str,int,int,int]]] = {table: compileFields(layout) for table, layout in exportTables.items()}
+
+def columnNames(table:str) -> list[str]:
+  '''This function returns all column names of an export table'''
+  return keyColumns[table] + [name for name, _, _, _ in tableColumns[table]]
+
+def extractRow(table:str, dwords:tuple[int,...], base:int) -> tuple[int,...]:
+  '''This function extracts the field columns of a context starting at dword `base`'''
+  return tuple((dwords[base + dword] >> lowBit) & mask for _, dword, lowBit, mask in tableColumns[table])
+
+def recordRows(structName:str, dwords:tuple[int,...], source:str, record:int) -> Iterator[tuple[str, tuple]]:
+  '''This function yields (table, row) for every context inside one record'''
+  match structName:
+    case "slotctx":
+      yield "slot_context", (source, record) + extractRow("slot_context", dwords, 0)
+    case "endpctx":
+      yield "endpoint_context", (source, record, 0) + extractRow("endpoint_context", dwords, 0)
+    case "icctx":
+      yield "input_control_context", (source, record) + extractRow("input_control_context", dwords, 0)
+    case "devctx" | "ipctx":
+      base = 0
+      if structName == "ipctx":
+        yield "input_control_context", (source, record) + extractRow("input_control_context", dwords, 0)
+        base = 8
+      yield "slot_context", (source, record) + extractRow("slot_context", dwords, base)
+      for dci in range(1, 32):
+        yield "endpoint_context", (source, record, dci) + extractRow("endpoint_context", dwords, base + dci*8)
+
+def decodeRecordsBulk(structName:str, captures:Iterable[tuple[str, bytes]]) -> Iterator[tuple[str, tuple]]:
+  '''This function decodes captures like `decodeRecords`, extracting the columns of every capture at once using NumPy'''
+  from bulk import decodeBulk
+
+  for source, data in captures:
+    for table, columns in decodeBulk(structName, data).items():
+      keys = [repeat(source), columns["record"].tolist()] + ([columns["dci"].tolist()] if "dci" in keyColumns[table] else [])
+      for row in zip(*keys, *(columns[name].tolist() for name, _, _, _ in tableColumns[table])):
+        yield table, row
+
+def decodeRecords(structName:str, captures:Iterable[tuple[str, bytes]]) -> Iterator[tuple[str, tuple]]:
+  '''
+  This function batch-decodes captures into (table, row) pairs. Every capture is a
+  (source name, bytes) pair holding one or more consecutive records of `structName`.
+  Dwords are read in the same byte order as `bytes2dwords`. If NumPy is installed,
+  the fields of all records of a capture are extracted at once.
+  '''
+  structName = structName.strip().lower()
+  if structName not in recordSizes:
+    raise VisualizationException(f"Exporting {structName} is not supported. Supported structures are {', '.join(recordSizes)}")
+  if importlib.util.find_spec("numpy") is not None:
+    yield from decodeRecordsBulk(structName, captures)
+    return
+  recordSize = recordSizes[structName]
+  recordStruct = struct.Struct(f">{recordSize//4}I")
+
+  for source, data in captures:
+    for record, offset in enumerate(range(0, len(data) - recordSize + 1, recordSize)):
+      yield from recordRows(structName, recordStruct.unpack_from(data, offset), source, record)
+
+def exportToSQLite(path:str, rows:Iterable[tuple[str, tuple]], batchSize:int = 50000) -> dict[str,int]:
+  '''
+  This function writes decoded rows into an SQLite database using batched inserts inside a
+  single transaction. Returns the number of rows written per table.
+  '''
+  connection = sqlite3.connect(path)
+  connection.execute("PRAGMA journal_mode=OFF")
+  connection.execute("PRAGMA synchronous=OFF")
+  for table in exportTables:
+    columns = ", ".join(f'"{name}" {"TEXT" if name == "source" else "INTEGER"}' for name in columnNames(table))
+    connection.execute(f'CREATE TABLE IF NOT EXISTS "{table}" ({columns})')
+  statements = {table: f'INSERT INTO "{table}" VALUES ({", ".join("?" * len(columnNames(table)))})' for table in exportTables}
+
+  pending:dict[str, list[tuple]] = {table: [] for table in exportTables}
+  written:dict[str,int] = {table: 0 for table in exportTables}
+  with connection:
+    for table, row in rows:
+      pending[table].append(row)
+      if len(pending[table]) >= batchSize:
+        connection.executemany(statements[table], pending[table])
+        written[table] += len(pending[table])
+        pending[table].clear()
+    for table, tableRows in pending.items():
+      connection.executemany(statements[table], tableRows)
+      written[table] += len(tableRows)
+  connection.close()
+  return written
+
+def exportToParquet(path:str, rows:Iterable[tuple[str, tuple]], batchSize:int = 50000) -> dict[str,int]:
+  '''
+  This function writes decoded rows into one Parquet file per table, named
+  `<path without extension>-<table>.parquet`. Every batch becomes a row group.
+  Returns the number of rows written per table.
+  '''
+  try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+  except ImportError:
+    raise VisualizationException("Exporting to Parquet needs pyarrow. Install it using: pip install pyarrow")
+
+  prefix = os.path.splitext(path)[0]
+  schemas = {
+    table: pa.schema([(name, pa.string() if name == "source" else pa.uint64()) for name in columnNames(table)])
+    for table in exportTables
+  }
+  writers:dict[str, "pq.ParquetWriter"] = {}
+  pending:dict[str, list[tuple]] = {table: [] for table in exportTables}
+  written:dict[str,int] = {table: 0 for table in exportTables}
+
+  def flush(table:str):
+    if not pending[table]:
+      return
+    if table not in writers:
+      writers[table] = pq.ParquetWriter(f"{prefix}-{table}.parquet", schemas[table])
+    columns = list(zip(*pending[table]))
+    writers[table].write_table(pa.Table.from_arrays([pa.array(column, type=field.type) for column, field in zip(columns, schemas[table])], schema=schemas[table]))
+    written[table] += len(pending[table])
+    pending[table].clear()
+
+  try:
+    for table, row in rows:
+      pending[table].append(row)
+      if len(pending[table]) >= batchSize:
+        flush(table)
+    for table in exportTables:
+      flush(table)
+  finally:
+    for writer in writers.values():
+      writer.close()
+  return written
+
+def exportRecords(path:str, structName:str, captures:Iterable[tuple[str, bytes]], batchSize:int = 50000) -> dict[str,int]:
+  '''This function decodes captures and exports them, choosing the format from the file extension'''
+  rows = decodeRecords(structName, captures)
+  if path.lower().endswith(".parquet"):
+    return exportToParquet(path, rows, batchSize)
+  return exportToSQLite(path, rows, batchSize)
@@ -5,8 +5,15 @@
 
 # This file contains helper functions
 
-from PIL import Image, ImageFont, ImageDraw
-from graphviz import Digraph
+import mmap
+import struct
+from functools import lru_cache
+from typing import TYPE_CHECKING
+
+# Rendering dependencies are only imported by the functions that need them so that
+# decoding-only modes (validation, streaming) can use these helpers without them
+if TYPE_CHECKING:
+    from graphviz import Digraph
 
 def convert32BitToBytesArray(dataIn32BitForm:list[int]) -> list[int]:
   '''This function Converts 32-bit int array to an array of bytes'''
@@ -17,22 +24,75 @@ def convert32BitToBytesArray(dataIn32BitForm:list[int]) -> list[int]:
   return result
 
 
-def bytes2binList(dataBytesList:list[int]) -> list[int]:
+def byteView(data) -> memoryview:
+    '''
+    This function returns a read-only view of the bytes of a structure. Buffers (bytes, bytearray,
+    mmap, memoryview) are viewed in place, lists of byte values are converted once. Slices of the
+    view are views themselves, so contexts inside larger structures are never copied.
+    '''
+    if isinstance(data, memoryview):
+        return data if data.format == 'B' else data.cast('B')
+    if not isinstance(data, (bytes, bytearray, mmap.mmap)):
+        data = bytes(data)
+    return memoryview(data).toreadonly()
+
+# The 8 bits of every byte value, most significant bit first
+byteBits:tuple[tuple[int,...],...] = tuple(tuple((value >> shift) & 1 for shift in range(7, -1, -1)) for value in range(256))
+
+def bytes2binList(dataBytesList:list[int]) -> list[list[int]]:
     '''This function takes in a list of bytes (Little Endian format) and creates 32-bit binary list and returns it'''
-    rows:list[int] = []
-    for i in range(0,len(dataBytesList),4):
-        intBytes = dataBytesList[i:i+4]
-        row = int.from_bytes(intBytes) # Here, the byteList is in Big-Endian order since we re-arrange it)
-        rows.append(row)
-    
-    # We have the values. Split them in binary list items
-    rawBinData:list[list[int]] = []
-    for i in range(0, len(rows),1):
-        rawBinary = bin(rows[i])[2:].zfill(32)
-        rawBinaryList = [int(bit) for bit in rawBinary]
-        rawBinData.append(rawBinaryList)
+    # Every group of 4 bytes is read in Big-Endian order (since we re-arrange it), most significant bit first
+    data = byteView(dataBytesList)
+    return [[*byteBits[data[i]], *byteBits[data[i+1]], *byteBits[data[i+2]], *byteBits[data[i+3]]]
+            for i in range(0, len(data) - 3, 4)]
+
+def bytes2dwords(dataBytesList:list[int], offset:int = 0, count:int | None = None) -> list[int]:
+    '''
+    This function groups a list of bytes into 32-bit values. The bytes of every group are read
+    in the same order as `bytes2binList`, so decoded fields always agree with the drawn bits.
+    `count` dwords (as many as the data holds if None) are read in place starting at `offset`.
+    '''
+    available = max(len(dataBytesList) - offset, 0) // 4
+    count = available if count is None else min(count, available)
+    if isinstance(dataBytesList, (list, tuple)):
+        dataBytesList = bytes(dataBytesList[offset:offset + count*4])
+        offset = 0
+    return list(struct.unpack_from(f">{count}I", dataBytesList, offset))
+
+def parseRawData(rawDataIn:list[str], isWord:bool = False) -> list[int]:
+    '''This function converts hex tokens (bytes or 32-bit words) into a list of bytes'''
+    rawDataInt = [int(data,16) for data in rawDataIn]
+    return convert32BitToBytesArray(rawDataInt) if isWord else rawDataInt
+
+def readDataFile(filePath:str, isWord:bool = False) -> list[int]:
+    '''This function reads a text file of space/comma-separated hex values into a list of bytes'''
+    with open(filePath,'r') as dataFile:
+        return parseRawData(dataFile.read().strip().replace(",", " ").split(), isWord)
+
+def mapBinaryFile(filePath:str) -> mmap.mmap | bytes:
+    '''
+    This function memory-maps a raw binary file for reading, so that large captures are
+    paged in on demand instead of being read into memory. Empty files give empty bytes.
+    '''
+    with open(filePath,'rb') as dataFile:
+        try:
+            return mmap.mmap(dataFile.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # mmap can not map empty files
+            return b""
 
-    return rawBinData
+@lru_cache(maxsize=32)
+def watermarkFont(fontSize:float):
+    '''
+    This function loads the watermark font at a given size. Fonts are kept once loaded, so a
+    long-running session (like the interactive shell) parses the font file only once per size.
+    '''
+    from PIL import ImageFont
+    try:
+        return ImageFont.truetype("Anta-Regular.ttf", fontSize)
+    except IOError:
+        print("Font not found, using default font")
+        return ImageFont.load_default()
 
 def addWatermark(image_path):
     """
@@ -41,6 +101,8 @@ def addWatermark(image_path):
     Args:
         image_path (str): Path to the PNG image file.
     """
+    from PIL import Image, ImageDraw
+
     # Open the original image
     img = Image.open(image_path)
     original_height = img.height
@@ -52,11 +114,7 @@ def addWatermark(image_path):
     dynamic_size = original_height/69
     font_size = max(dynamic_size, 18)
     
-    try:
-        font = ImageFont.truetype("Anta-Regular.ttf", font_size)
-    except IOError:
-        print("Font not found, using default font")
-        font = ImageFont.load_default()
+    font = watermarkFont(font_size)
     
     # Define texts
     left_text = "Made with xHCI-DataStructures-Visualizer"
@@ -84,16 +142,10 @@ def addWatermark(image_path):
     # Set extension height based on text size
     extension_height = max_text_height + 2 * padding
     
-    # Create new image with extended height
-    new_height = original_height + extension_height
-    if mode == 'RGBA':
-        new_img = Image.new('RGBA', (img.width, new_height), (255, 255, 255, 255))
-    else:
-        new_img = Image.new('RGB', (img.width, new_height), (255, 255, 255))
-    new_img.paste(img, (0, 0))
-    
-    # Create draw object for new image
-    draw = ImageDraw.Draw(new_img)
+    # Draw the watermark on its own strip, so the original image doesn't have to be decoded
+    strip_mode = mode if mode == 'RGBA' else 'RGB'
+    strip = Image.new(strip_mode, (original_width, extension_height), (255, 255, 255, 255) if strip_mode == 'RGBA' else (255, 255, 255))
+    draw = ImageDraw.Draw(strip)
     
     # Set text color based on image mode
     if mode == 'RGBA':
@@ -102,25 +154,38 @@ def addWatermark(image_path):
         text_color = (0, 0, 0)  # Solid black
     
     # Calculate y position for all texts
-    y_position = original_height + padding
+    y_position = padding
     
     # Draw left text
     left_x = padding
     draw.text((left_x, y_position), left_text, font=font, fill=text_color)
     
     # Draw center text
-    center_x = (img.width - center_width) / 2
+    center_x = (original_width - center_width) / 2
     draw.text((center_x, y_position), center_text, font=font, fill=text_color)
     
     # Draw right text
-    right_x = img.width - right_width - padding
+    right_x = original_width - right_width - padding
     draw.text((right_x, y_position), right_text, font=font, fill=text_color)
     
+    # Append the strip to the bottom of the image. 8-bit RGB(A) PNGs (what Graphviz writes) are
+    # extended as a stream, other images are decoded and extended in memory
+    from pngwriter import canAppendRows, appendRowsToPNG
+    if image_path.lower().endswith(".png") and canAppendRows(image_path) == strip_mode:
+        img.close()
+        appendRowsToPNG(image_path, strip)
+        return
+    
+    new_height = original_height + extension_height
+    new_img = Image.new(strip_mode, (original_width, new_height), (255, 255, 255, 255) if strip_mode == 'RGBA' else (255, 255, 255))
+    new_img.paste(img, (0, 0))
+    new_img.paste(strip, (0, original_height))
+    
     # Save over original file
     new_img.save(image_path)
     
 
-def addWatermarkDot(dot:Digraph, names:list[str]):
+def addWatermarkDot(dot:"Digraph", names:list[str]):
     '''
     This function adds watermark to the dot object
     '''
@@ -0,0 +1,272 @@
+# Copyright (c) 2025 Darshan P. All rights reserved.
+
+# This work is licensed under the terms of the MIT license.
+# For a copy, see <https://opensource.org/licenses/MIT>.
+
+# This file builds a persistent sidecar index over large binary capture archives and
+# answers small queries (for example: ep.state==Halted and ep.type=='Bulk In') using
+# the index, so that only matching contexts have to be read back and rendered.
+
+import os
+import re
+import sqlite3
+import struct
+
+from builders.constants import (VisualizationException, slotStateMap, endpointStateMap, epTypeMap, portSpeedMap)
+from builders.fields import slotContextLayout, endpointContextLayout, inputControlContextLayout, compileFields
+from helpers import mapBinaryFile
+
+# Bumped whenever the layout of the index changes, so old index files get rebuilt
+indexVersion = 1
+
+# Size of one record and (byte offset of the slot context, byte offset of DCI 0) for every
+# structure that can be indexed. None means the record does not hold that context.
+indexedStructures:dict[str, tuple[int, int | None, int | None]] = {
+  "slotctx" : (32,   0,    None),
+  "endpctx" : (32,   None, 0),
+  "devctx"  : (1024, 0,    0),
+  "ipctx"   : (1056, 32,   32),
+}
+
+slotColumns = compileFields(slotContextLayout, ["slotState", "usbDeviceAddress", "rootHubPortNumber", "speed", "contextEntries"])
+endpointColumns = compileFields(endpointContextLayout, ["endpointState", "epType", "dequeueCycleState", "maxPacketSize",
+                                                        "trDequeuePointerLo", "trDequeuePointerHi"])
+inputControlColumns = compileFields(inputControlContextLayout, ["dropContextFlags", "addContextFlags"])
+
+# Query field -> (table alias, column, map of names to values used for symbolic values)
+queryFields:dict[str, tuple[str, str, dict[int,str] | None]] = {
+  "record"        : ("s", "record", None),
+  "slot.state"    : ("s", "slotState", slotStateMap),
+  "slot.address"  : ("s", "usbDeviceAddress", None),
+  "slot.port"     : ("s", "rootHubPortNumber", None),
+  "slot.speed"    : ("s", "speed", portSpeedMap),
+  "slot.entries"  : ("s", "contextEntries", None),
+  "icc.add"       : ("s", "addContextFlags", None),
+  "icc.drop"      : ("s", "dropContextFlags", None),
+  "ep.dci"        : ("e", "dci", None),
+  "ep.state"      : ("e", "endpointState", endpointStateMap),
+  "ep.type"       : ("e", "epType", epTypeMap),
+  "ep.dcs"        : ("e", "dequeueCycleState", None),
+  "ep.mps"        : ("e", "maxPacketSize", None),
+  "ep.dequeue"    : ("e", "trDequeuePointer", None),
+}
+
+def indexPath(archivePath:str) -> str:
+  '''This function returns the path of the sidecar index of an archive'''
+  return archivePath + ".xidx"
+
+def toSigned64(value:int) -> int:
+  '''SQLite integers are signed 64-bit, so the top half of the address space is stored wrapped around'''
+  return value - (1 << 64) if value >= (1 << 63) else value
+
+def extractColumns(columns:list[tuple[str,int,int,int]], dwords:tuple[int,...], base:int) -> tuple[int,...]:
+  '''This function extracts precompiled columns of a context starting at dword `base`'''
+  return tuple((dwords[base + dword] >> lowBit) & mask for _, dword, lowBit, mask in columns)
+
+def archiveSignature(archivePath:str, structName:str) -> str:
+  '''This function returns a signature used to tell whether an index is still up to date'''
+  stat = os.stat(archivePath)
+  return f"{indexVersion}:{structName}:{stat.st_size}:{stat.st_mtime_ns}"
+
+def isIndexCurrent(archivePath:str, structName:str) -> bool:
+  '''This function checks whether the sidecar index exists and matches the archive'''
+  if not os.path.exists(indexPath(archivePath)):
+    return False
+  connection = sqlite3.connect(indexPath(archivePath))
+  try:
+    row = connection.execute("SELECT value FROM meta WHERE key = 'signature'").fetchone()
+  except sqlite3.DatabaseError:
+    return False
+  finally:
+    connection.close()
+  return row is not None and row[0] == archiveSignature(archivePath, structName)
+
+def buildIndex(archivePath:str, structName:str, batchSize:int = 50000) -> tuple[int,int]:
+  '''
+  This function scans a binary archive of consecutive `structName` records and writes the
+  sidecar index. Endpoint contexts that are entirely zero (unused) are not indexed.
+  Returns the number of indexed (slot rows, endpoint rows).
+  '''
+  structName = structName.strip().lower()
+  if structName not in indexedStructures:
+    raise VisualizationException(f"Indexing {structName} is not supported. Supported structures are {', '.join(indexedStructures)}")
+  recordSize, slotOffset, endpointOffset = indexedStructures[structName]
+  recordStruct = struct.Struct(f">{recordSize//4}I")
+  endpointsPerRecord = 0 if endpointOffset is None else 1 if structName == "endpctx" else 31
+  firstDCI = 0 if structName == "endpctx" else 1
+
+  if os.path.exists(indexPath(archivePath)):
+    os.remove(indexPath(archivePath))
+  connection = sqlite3.connect(indexPath(archivePath))
+  connection.execute("PRAGMA journal_mode=OFF")
+  connection.execute("PRAGMA synchronous=OFF")
+  connection.execute("CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT)")
+  connection.execute("""CREATE TABLE slots (record INTEGER PRIMARY KEY, offset INTEGER, slotState INTEGER, usbDeviceAddress INTEGER,
+                        rootHubPortNumber INTEGER, speed INTEGER, contextEntries INTEGER, dropContextFlags INTEGER, addContextFlags INTEGER)""")
+  connection.execute("""CREATE TABLE endpoints (record INTEGER, dci INTEGER, offset INTEGER, endpointState INTEGER, epType INTEGER,
+                        dequeueCycleState INTEGER, maxPacketSize INTEGER, trDequeuePointer INTEGER)""")
+
+  archive = mapBinaryFile(archivePath)
+  slotRows:list[tuple] = []
+  endpointRows:list[tuple] = []
+  slotCount = endpointCount = 0
+  with connection:
+    for record, offset in enumerate(range(0, len(archive) - recordSize + 1, recordSize)):
+      dwords = recordStruct.unpack_from(archive, offset)
+      if slotOffset is not None:
+        flags = extractColumns(inputControlColumns, dwords, 0) if structName == "ipctx" else (0, 0)
+        slotRows.append((record, offset + slotOffset) + extractColumns(slotColumns, dwords, slotOffset//4) + flags)
+      for index in range(endpointsPerRecord):
+        dci = firstDCI + index
+        base = (endpointOffset + dci*32) // 4
+        if not any(dwords[base:base+8]):
+          continue
+        state, epType, dcs, mps, pointerLo, pointerHi = extractColumns(endpointColumns, dwords, base)
+        pointer = toSigned64((pointerHi << 32) | (pointerLo << 4))
+        endpointRows.append((record, dci, offset + base*4, state, epType, dcs, mps, pointer))
+      if len(endpointRows) >= batchSize or len(slotRows) >= batchSize:
+        connection.executemany("INSERT INTO slots VALUES (?,?,?,?,?,?,?,?,?)", slotRows)
+        connection.executemany("INSERT INTO endpoints VALUES (?,?,?,?,?,?,?,?)", endpointRows)
+        slotCount += len(slotRows)
+        endpointCount += len(endpointRows)
+        slotRows.clear()
+        endpointRows.clear()
+    connection.executemany("INSERT INTO slots VALUES (?,?,?,?,?,?,?,?,?)", slotRows)
+    connection.executemany("INSERT INTO endpoints VALUES (?,?,?,?,?,?,?,?)", endpointRows)
+    slotCount += len(slotRows)
+    endpointCount += len(endpointRows)
+    connection.execute("CREATE INDEX endpointsByState ON endpoints (endpointState, epType)")
+    connection.execute("CREATE INDEX endpointsByRecord ON endpoints (record)")
+    connection.execute("INSERT INTO meta VALUES ('signature', ?)", (archiveSignature(archivePath, structName),))
+    connection.execute("INSERT INTO meta VALUES ('struct', ?)", (structName,))
+  connection.close()
+  return slotCount, endpointCount
+
+#########################################################################################
+# The following functions parse and compile the query syntax
+#########################################################################################
+
+queryTokenPattern = re.compile(r"""\s*(?:(?P<number>0[xX][0-9a-fA-F]+|\d+)|(?P<string>'[^']*'|"[^"]*")|(?P<op>==|!=|<=|>=|<|>|\(|\))|(?P<word>[A-Za-z_][\w.\-]*))""")
+
+def tokenizeQuery(query:str) -> list[tuple[str,str]]:
+  '''This function splits a query into (kind, text) tokens'''
+  tokens:list[tuple[str,str]] = []
+  position = 0
+  query = query.strip()
+  while position < len(query):
+    match = queryTokenPattern.match(query, position)
+    if not match or match.end() == position:
+      raise VisualizationException(f"Can not understand the query near '{query[position:]}'")
+    kind = match.lastgroup
+    tokens.append((kind, match.group(kind)))
+    position = match.end()
+    while position < len(query) and query[position].isspace():
+      position += 1
+  return tokens
+
+def resolveValue(field:str, kind:str, text:str) -> int:
+  '''This function converts a query value into the number stored in the index'''
+  if kind == "number":
+    # Decimal unless prefixed with 0x, so leading zeros (e.g. port 08) are fine
+    try:
+      return toSigned64(int(text, 16) if text.lower().startswith("0x") else int(text, 10))
+    except ValueError:
+      raise VisualizationException(f"{text} is not a number (value of {field})")
+  name = text.strip("'\"").lower()
+  valueMap = queryFields[field][2]
+  if valueMap:
+    for value, valueName in valueMap.items():
+      # "Configured" matches "Configured State", "Bulk In" matches "Bulk In", and names holding
+      # several states match each of them ("Disabled" and "Enabled" match "Disabled/Enabled State")
+      for candidate in (valueName.lower(), *valueName.lower().split("/")):
+        if candidate == name or candidate.startswith(name + " "):
+          return value
+  raise VisualizationException(f"Unknown value '{text}' for {field}")
+
+def compileQuery(query:str) -> tuple[str, list[int], bool]:
+  '''
+  This function compiles a query into an SQL condition and its parameters. The syntax is
+  comparisons (FIELD OP VALUE, with OP one of == != < <= > >=) combined with and, or, not
+  and parentheses. Returns (condition, parameters, whether endpoint fields are used).
+  '''
+  tokens = tokenizeQuery(query)
+  parameters:list[int] = []
+  usesEndpoints = False
+  position = 0
+
+  def peek() -> tuple[str,str] | None:
+    return tokens[position] if position < len(tokens) else None
+
+  def take() -> tuple[str,str]:
+    nonlocal position
+    if position >= len(tokens):
+      raise VisualizationException("Query ended unexpectedly")
+    position += 1
+    return tokens[position-1]
+
+  def parseOr() -> str:
+    condition = parseAnd()
+    while peek() and peek()[1].lower() == "or":
+      take()
+      condition = f"({condition} OR {parseAnd()})"
+    return condition
+
+  def parseAnd() -> str:
+    condition = parseNot()
+    while peek() and peek()[1].lower() == "and":
+      take()
+      condition = f"({condition} AND {parseNot()})"
+    return condition
+
+  def parseNot() -> str:
+    if peek() and peek()[1].lower() == "not":
+      take()
+      return f"(NOT {parseNot()})"
+    if peek() and peek()[1] == "(":
+      take()
+      condition = parseOr()
+      if take()[1] != ")":
+        raise VisualizationException("Missing ')' in query")
+      return condition
+    return parseComparison()
+
+  def parseComparison() -> str:
+    nonlocal usesEndpoints
+    kind, field = take()
+    if kind != "word" or field.lower() not in queryFields:
+      raise VisualizationException(f"Unknown field '{field}'. Known fields are {', '.join(queryFields)}")
+    field = field.lower()
+    kind, operator = take()
+    if operator not in ("==", "!=", "<", "<=", ">", ">="):
+      raise VisualizationException(f"Expecting a comparison after {field}, got '{operator}'")
+    valueKind, valueText = take()
+    alias, column, _ = queryFields[field]
+    usesEndpoints = usesEndpoints or alias == "e"
+    parameters.append(resolveValue(field, valueKind, valueText))
+    return f"{alias}.{column} {'=' if operator == '==' else operator} ?"
+
+  condition = parseOr()
+  if position != len(tokens):
+    raise VisualizationException(f"Unexpected '{tokens[position][1]}' in query")
+  return condition, parameters, usesEndpoints
+
+def queryIndex(archivePath:str, query:str, limit:int = 0) -> list[dict]:
+  '''
+  This function runs a query against the sidecar index of an archive. Every match holds the
+  record number, DCI (or None for a whole record) and the byte offset and size of the
+  matching context inside the archive, ready to be read back and rendered.
+  '''
+  condition, parameters, usesEndpoints = compileQuery(query)
+  connection = sqlite3.connect(indexPath(archivePath))
+  structName = connection.execute("SELECT value FROM meta WHERE key = 'struct'").fetchone()[0]
+  recordSize = indexedStructures[structName][0]
+  limitClause = f" LIMIT {int(limit)}" if limit > 0 else ""
+  if usesEndpoints:
+    rows = connection.execute(f"""SELECT e.record, e.dci, e.offset FROM endpoints e LEFT JOIN slots s ON s.record = e.record
+                                  WHERE {condition} ORDER BY e.record, e.dci{limitClause}""", parameters).fetchall()
+    matches = [{"record": record, "dci": dci, "offset": offset, "size": 32, "struct": "endpctx"} for record, dci, offset in rows]
+  else:
+    rows = connection.execute(f"SELECT s.record FROM slots s WHERE {condition} ORDER BY s.record{limitClause}", parameters).fetchall()
+    matches = [{"record": record, "dci": None, "offset": record*recordSize, "size": recordSize, "struct": structName} for record, in rows]
+  connection.close()
+  return matches
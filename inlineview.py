@@ -0,0 +1,137 @@
+# Copyright (c) 2025 Darshan P. All rights reserved.
+
+# This work is licensed under the terms of the MIT license.
+# For a copy, see <https://opensource.org/licenses/MIT>.
+
+# This file makes visualizations display inline in Jupyter/IPython. A StructureView wraps
+# the graph of a data structure and renders it in memory (SVG or PNG) the first time it is
+# displayed, keeping the output so that displaying it again costs nothing. Grouped
+# structures (devctx, ipctx, ...) are shown as collapsible tables of decoded fields instead,
+# with the graph one call away.
+#
+#   from inlineview import visualize
+#   visualize("devctx", open("devctx.bin", "rb").read(), compact=True)
+
+import html
+
+from builders.constants import VisualizationException
+from builders.registry import getStructure
+from helpers import parseRawData
+
+def toByteList(data, isWord:bool = False) -> list[int]:
+  '''This function accepts raw data as bytes, a list of byte values or a string of hex values (bytes or words)'''
+  if isinstance(data, str):
+    return parseRawData(data.replace(",", " ").split(), isWord)
+  return list(data)
+
+def isUnused(fields:dict) -> bool:
+  '''This function tells whether every numeric value (or hex pointer) of a decoded context is zero'''
+  return all(value in (0, "0x0") for value in fields.values()
+             if isinstance(value, int) or (isinstance(value, str) and value.startswith("0x")))
+
+def isContextList(value) -> bool:
+  '''This function tells whether a decoded value is a list of contexts (like the endpoint contexts of a devctx)'''
+  return isinstance(value, list) and bool(value) and isinstance(value[0], dict)
+
+def fieldsTable(fields:dict) -> str:
+  '''This function formats decoded field values as a two-column HTML table'''
+  rows = "".join(f"<tr><td style='text-align:left'>{html.escape(str(name))}</td><td style='text-align:left'>{html.escape(str(value))}</td></tr>"
+                 for name, value in fields.items())
+  return f"<table>{rows}</table>"
+
+def decodedToHTML(title:str, decoded) -> str:
+  '''
+  This function formats a decoded structure as nested collapsible sections, one per context. Runs of
+  unused (all zero) contexts are folded into a single line, so a mostly empty devctx stays short.
+  '''
+  if isinstance(decoded, list):
+    sections:list[str] = []
+    unused:list[str] = []
+    for index, item in enumerate(decoded):
+      name = str(item.get("name", f"{title} {index}")) if isinstance(item, dict) else f"{title} {index}"
+      if isUnused({key: value for key, value in item.items() if key not in ("dci", "name")}):
+        unused.append(name)
+        continue
+      sections.append(decodedToHTML(name, item))
+    if unused:
+      sections.append(f"<div>{len(unused)} unused: {html.escape(', '.join(unused))}</div>")
+    return f"<details><summary>{html.escape(title)} ({len(decoded)})</summary>{''.join(sections)}</details>"
+
+  nested = "".join(decodedToHTML(name, value) for name, value in decoded.items() if isinstance(value, dict) or isContextList(value))
+  values = {name: value for name, value in decoded.items() if not isinstance(value, dict) and not isContextList(value)}
+  table = fieldsTable(values) if values else ""
+  return f"<details><summary>{html.escape(title)}</summary>{table}{nested}</details>"
+
+class StructureView:
+  '''
+  This class displays a data structure inline in Jupyter/IPython. The graph is built on first use and
+  every rendered format is kept, so a cell is rendered once however often it is displayed.
+  `tables` picks the collapsible table view for grouped structures (the default) or the graph, which
+  is displayed in one `format` ("svg" or "png") only.
+  '''
+
+  def __init__(self, struct:str, data, isWord:bool = False, tables:bool | None = None, format:str = 'svg', **options):
+    if format not in ('svg', 'png'):
+      raise VisualizationException(f"Graphs are displayed as svg or png. Got {format}")
+    self.struct = getStructure(struct)["codename"]
+    self.data = toByteList(data, isWord)
+    self.options = options
+    self.tables = getStructure(self.struct)["grouped"] if tables is None else tables
+    self.format = format
+    self._graph = None
+    self._rendered:dict[str, bytes | str] = {}
+
+  def graph(self):
+    '''This function returns the Digraph of the structure, built once'''
+    if self._graph is None:
+      from builder import processAndBuildData
+      self._graph = processAndBuildData(self.struct, self.data, [], **self.options)
+    return self._graph
+
+  def render(self, format:str) -> bytes:
+    '''This function renders the graph in memory in `format` (svg, png, pdf, ...), reusing earlier output'''
+    if format not in self._rendered:
+      from layoutcache import pipeWithCachedLayout
+      self._rendered[format] = pipeWithCachedLayout(self.graph(), format)
+    return self._rendered[format]
+
+  def svg(self) -> str:
+    '''This function returns the graph as SVG markup'''
+    return self.render('svg').decode()
+
+  def png(self) -> bytes:
+    '''This function returns the graph as PNG bytes'''
+    return self.render('png')
+
+  def html(self) -> str:
+    '''This function returns the decoded fields as collapsible HTML tables'''
+    if 'html' not in self._rendered:
+      from builders.details import decodeStructure
+      try:
+        decoded = decodeStructure(self.struct, self.data)
+      except (VisualizationException, KeyError, ValueError) as e:
+        return f"<pre>{html.escape(str(e))}</pre>"
+      self._rendered['html'] = decodedToHTML(getStructure(self.struct)["description"], decoded).replace("<details>", "<details open>", 1)
+    return self._rendered['html']
+
+  def save(self, fileName:str, format:str = 'png') -> str:
+    '''This function writes the rendered graph to `fileName`.`format` and returns its path'''
+    path = f"{fileName}.{format}"
+    with open(path, 'wb') as outputFile:
+      outputFile.write(self.render(format))
+    return path
+
+  def _repr_mimebundle_(self, include=None, exclude=None) -> dict:
+    # IPython calls every _repr_*_ method an object has, so a single bundle keeps a display to one render
+    if self.tables:
+      return {"text/html": self.html()}
+    if self.format == 'png':
+      return {"image/png": self.png()}
+    return {"image/svg+xml": self.svg()}
+
+  def __repr__(self) -> str:
+    return f"StructureView({self.struct!r}, {len(self.data)} bytes)"
+
+def visualize(struct:str, data, isWord:bool = False, tables:bool | None = None, format:str = 'svg', **options) -> StructureView:
+  '''This function wraps raw data of a structure for inline display, e.g. visualize("slotctx", "03 00 07 04 ...")'''
+  return StructureView(struct, data, isWord, tables, format, **options)
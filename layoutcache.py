@@ -0,0 +1,126 @@
+# Copyright (c) 2025 Darshan P. All rights reserved.
+
+# This work is licensed under the terms of the MIT license.
+# For a copy, see <https://opensource.org/licenses/MIT>.
+
+# This file caches the layouts Graphviz computes for the graphs of the tool. Graphs of
+# the same structure have the same nodes, edges and table shapes, and only the text in
+# the cells changes. The node positions of a laid out graph are kept per shape (in memory
+# and on disk), and later graphs of the same shape are rendered by neato in its no-layout
+# mode (-n2) with the nodes pinned to those positions, so only the labels are rasterized.
+# The bounding box of the graph is kept with the positions, so the size of a graph can be
+# read without laying it out again.
+
+import hashlib
+import json
+import os
+import re
+from typing import TYPE_CHECKING, Callable
+
+if TYPE_CHECKING:
+  from graphviz import Digraph
+
+# Bumped whenever the way shapes are keyed or positions are stored changes
+layoutCacheVersion = 2
+
+# Text between two tags of an HTML label. Removing it leaves the shape of the tables
+labelTextPattern = re.compile(r">[^<>]*<")
+
+# Layouts computed or loaded by this process, shape key -> {"bb": "x0,y0,x1,y1", "positions": {node name: "x,y"}}
+layoutCache:dict[str, dict] = {}
+
+def layoutCacheDirectory() -> str:
+  '''This function returns the directory layouts are kept in across runs'''
+  cacheHome = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+  return os.path.join(cacheHome, "xHCI-DS-Visualizer", "layouts")
+
+def shapeKey(dot:"Digraph") -> str:
+  '''
+  This function returns the key of the shape of a graph: its source with the text of every table
+  cell removed. Graphs with the same key have the same nodes, edges, rows and cells, so they only
+  differ in the width of their text. Nodes of the tool's graphs are chained one per rank and centered,
+  so wider text never makes two nodes overlap.
+  '''
+  skeleton = labelTextPattern.sub("><", dot.source)
+  return hashlib.sha1(f"{layoutCacheVersion}\n{skeleton}".encode()).hexdigest()
+
+def parseLayout(layoutJSON:bytes) -> dict:
+  '''
+  This function returns the bounding box of a graph and the position of every node (in points) out of
+  a layout in Graphviz's json0 format
+  '''
+  layout = json.loads(layoutJSON)
+  return {"bb": layout.get("bb", "0,0,0,0"),
+          "positions": {node["name"]: node["pos"] for node in layout.get("objects", []) if "pos" in node}}
+
+def computeLayout(dot:"Digraph") -> dict:
+  '''This function lays out a graph with its own engine and returns its bounding box and node positions'''
+  return parseLayout(dot.pipe(format='json0'))
+
+def layoutSize(layout:dict) -> tuple[float,float]:
+  '''This function returns the width and height (in points) of a laid out graph'''
+  left, bottom, right, top = (float(value) for value in layout["bb"].split(","))
+  return right - left, top - bottom
+
+def cachedLayout(dot:"Digraph", useDisk:bool = True, compute:Callable[["Digraph"], dict] = computeLayout) -> dict:
+  '''
+  This function returns the bounding box and node positions of a graph, computing them using `compute`
+  and storing them on the first use of its shape
+  '''
+  key = shapeKey(dot)
+  if key in layoutCache:
+    return layoutCache[key]
+
+  cachePath = os.path.join(layoutCacheDirectory(), key + ".json")
+  if useDisk and os.path.exists(cachePath):
+    try:
+      with open(cachePath, 'r') as cacheFile:
+        layoutCache[key] = json.load(cacheFile)
+      return layoutCache[key]
+    except (OSError, ValueError):
+      # A damaged entry is simply laid out again
+      pass
+
+  layoutCache[key] = compute(dot)
+  if useDisk:
+    try:
+      # Written aside and moved in place, so concurrent renders never read a partial entry
+      os.makedirs(os.path.dirname(cachePath), exist_ok=True)
+      temporaryPath = f"{cachePath}.{os.getpid()}.{id(dot)}"
+      with open(temporaryPath, 'w') as cacheFile:
+        json.dump(layoutCache[key], cacheFile)
+      os.replace(temporaryPath, cachePath)
+    except OSError:
+      # Caching across runs is best effort
+      pass
+  return layoutCache[key]
+
+def pinGraph(dot:"Digraph", layout:dict) -> "Digraph":
+  '''This function returns a copy of a graph with every node pinned to its position in a layout'''
+  pinned = dot.copy()
+  for name, position in layout["positions"].items():
+    pinned.node(name, pos=position)
+  return pinned
+
+def pinnedGraph(dot:"Digraph", useDisk:bool = True, compute:Callable[["Digraph"], dict] = computeLayout) -> "Digraph":
+  '''This function returns a copy of a graph with every node pinned to the cached position for its shape'''
+  return pinGraph(dot, cachedLayout(dot, useDisk, compute))
+
+def renderPinned(dot:"Digraph", layout:dict, fileName:str, format:str, view:bool = False) -> str:
+  '''
+  This function renders a graph as `fileName`.`format` with its nodes pinned to a layout computed before,
+  so neato only routes the edges and draws the labels. Returns the path of the rendered file.
+  '''
+  return pinGraph(dot, layout).render(fileName, format=format, view=view, cleanup=True, engine='neato', neato_no_op=2)
+
+def renderWithCachedLayout(dot:"Digraph", fileName:str, format:str, view:bool = False, useDisk:bool = True) -> str:
+  '''
+  This function renders a graph as `fileName`.`format` using the cached layout of its shape. The nodes
+  are pinned to their cached positions and neato only routes the edges and draws the labels.
+  Returns the path of the rendered file.
+  '''
+  return renderPinned(dot, cachedLayout(dot, useDisk), fileName, format, view)
+
+def pipeWithCachedLayout(dot:"Digraph", format:str, useDisk:bool = True) -> bytes:
+  '''This function renders a graph in memory using the cached layout of its shape, and returns the output'''
+  return pinnedGraph(dot, useDisk).pipe(format=format, engine='neato', neato_no_op=2)
@@ -0,0 +1,136 @@
+# Copyright (c) 2025 Darshan P. All rights reserved.
+
+# This work is licensed under the terms of the MIT license.
+# For a copy, see <https://opensource.org/licenses/MIT>.
+
+# This file writes PNG images strip by strip. Images of large data structures are tens
+# of thousands of pixels tall, so instead of building the whole image in memory, rows
+# are compressed as they are produced and only one strip is held at any time.
+
+import os
+import struct
+import zlib
+from typing import TYPE_CHECKING, BinaryIO, Iterable, Iterator
+
+if TYPE_CHECKING:
+  from PIL.Image import Image
+
+pngSignature = b"\x89PNG\r\n\x1a\n"
+
+# Size of the data of every IDAT chunk written
+idatChunkSize = 1 << 16
+
+# PNG colour type and bytes per pixel of the supported 8-bit PIL modes
+pngColourTypes:dict[str, tuple[int,int]] = {
+  "RGB"  : (2, 3),
+  "RGBA" : (6, 4),
+}
+
+def writeChunk(output:BinaryIO, chunkType:bytes, data:bytes):
+  '''This function writes a single PNG chunk'''
+  output.write(struct.pack(">I", len(data)))
+  output.write(chunkType)
+  output.write(data)
+  output.write(struct.pack(">I", zlib.crc32(data, zlib.crc32(chunkType))))
+
+def readChunks(source:BinaryIO) -> Iterator[tuple[bytes, bytes]]:
+  '''This function yields (type, data) of every chunk of a PNG file, one at a time'''
+  if source.read(8) != pngSignature:
+    raise ValueError("Not a PNG file")
+  while header := source.read(8):
+    length, chunkType = struct.unpack(">I4s", header)
+    data = source.read(length)
+    source.read(4)
+    yield chunkType, data
+
+def stripRows(strip:"Image") -> Iterator[bytes]:
+  '''This function yields the filtered scanlines (filter type None) of a strip'''
+  rowSize = strip.width * pngColourTypes[strip.mode][1]
+  pixels = strip.tobytes()
+  for offset in range(0, len(pixels), rowSize):
+    yield b"\x00" + pixels[offset:offset+rowSize]
+
+def writeIDAT(output:BinaryIO, compressedParts:Iterable[bytes]):
+  '''This function groups compressed image data into IDAT chunks of `idatChunkSize` bytes'''
+  pending = bytearray()
+  for part in compressedParts:
+    pending += part
+    while len(pending) >= idatChunkSize:
+      writeChunk(output, b"IDAT", bytes(pending[:idatChunkSize]))
+      del pending[:idatChunkSize]
+  if pending:
+    writeChunk(output, b"IDAT", bytes(pending))
+
+def compressStrips(strips:Iterable["Image"], compressor) -> Iterator[bytes]:
+  '''This function compresses the scanlines of strips as they are produced'''
+  for strip in strips:
+    for row in stripRows(strip):
+      yield compressor.compress(row)
+
+def writeStripedPNG(path:str, width:int, height:int, mode:str, strips:Iterable["Image"]):
+  '''
+  This function writes a `width` x `height` PNG from an iterable of strips. Every strip must be
+  `width` pixels wide and in `mode` ("RGB" or "RGBA"), and the strips must add up to `height` rows.
+  '''
+  colourType, _ = pngColourTypes[mode]
+  compressor = zlib.compressobj(6)
+  with open(path, "wb") as output:
+    output.write(pngSignature)
+    writeChunk(output, b"IHDR", struct.pack(">IIBBBBB", width, height, 8, colourType, 0, 0, 0))
+    writeIDAT(output, compressStrips(strips, compressor))
+    writeIDAT(output, [compressor.flush()])
+    writeChunk(output, b"IEND", b"")
+
+def canAppendRows(path:str) -> str | None:
+  '''
+  This function returns the PIL mode of the rows that can be appended to a PNG file, or None if
+  rows can't be appended without decoding it (palette, 16-bit, grayscale or interlaced images).
+  '''
+  with open(path, "rb") as source:
+    for chunkType, data in readChunks(source):
+      if chunkType == b"IHDR":
+        _, _, bitDepth, colourType, _, _, interlace = struct.unpack(">IIBBBBB", data)
+        if bitDepth != 8 or interlace != 0:
+          return None
+        return next((mode for mode, (pngType, _) in pngColourTypes.items() if pngType == colourType), None)
+  return None
+
+def appendRowsToPNG(path:str, strip:"Image"):
+  '''
+  This function appends the rows of `strip` to the bottom of a PNG file without decoding the image.
+  The existing compressed data is re-compressed as a stream, so memory use does not depend on the
+  size of the image. The strip must have the width and mode reported by `canAppendRows`.
+  '''
+  temporaryPath = path + ".tmp"
+  decompressor = zlib.decompressobj()
+  compressor = zlib.compressobj(6)
+
+  with open(path, "rb") as source, open(temporaryPath, "wb") as output:
+    output.write(pngSignature)
+    chunks = readChunks(source)
+    for chunkType, data in chunks:
+      if chunkType == b"IHDR":
+        width, height = struct.unpack(">II", data[:8])
+        if width != strip.width:
+          raise ValueError(f"Strip is {strip.width} pixels wide, image is {width} pixels wide")
+        data = struct.pack(">II", width, height + strip.height) + data[8:]
+      elif chunkType == b"IDAT":
+        # Re-compress the existing rows followed by the new ones
+        def existingRows():
+          yield compressor.compress(decompressor.decompress(data))
+          for nextType, nextData in chunks:
+            if nextType != b"IDAT":
+              # Chunks after the image data (text, IEND) are copied after the new rows
+              pendingChunks.append((nextType, nextData))
+              continue
+            yield compressor.compress(decompressor.decompress(nextData))
+          yield compressor.compress(decompressor.flush())
+        pendingChunks:list[tuple[bytes, bytes]] = []
+        writeIDAT(output, existingRows())
+        writeIDAT(output, compressStrips([strip], compressor))
+        writeIDAT(output, [compressor.flush()])
+        for pendingType, pendingData in pendingChunks:
+          writeChunk(output, pendingType, pendingData)
+        break
+      writeChunk(output, chunkType, data)
+  os.replace(temporaryPath, path)
@@ -0,0 +1,151 @@
+# Copyright (c) 2025 Darshan P. All rights reserved.
+
+# This work is licensed under the terms of the MIT license.
+# For a copy, see <https://opensource.org/licenses/MIT>.
+
+# This file contains the logic to render the nodes of a data structure as
+# separate small images on a pool of processes and to stack them into one image,
+# and to render large data structures within a memory budget.
+
+import io
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterator
+
+from graphviz import Digraph
+from PIL import Image, ImageDraw
+
+from builders.constants import VisualizationException
+from helpers import addWatermark
+from pngwriter import writeStripedPNG
+
+# Vertical space between two stacked contexts, used to draw the connecting arrow
+arrowGap = 48
+
+# Resolution Graphviz renders bitmaps at, unless a DPI is given
+defaultDPI = 96.0
+
+def fitToPixelBudget(dot:Digraph, maxPixels:int = 0, dpi:float = 0, layout:dict | None = None) -> float:
+  '''
+  This function sets the resolution of a graph so that its bitmap has at most `maxPixels` pixels.
+  The size of the graph is read from `layout` (see layoutcache), which the graph should then be rendered
+  with (renderPinned), so the graph is laid out only once and nothing is rasterized to measure it.
+  Without a layout, the graph is laid out here. Returns the DPI the graph will be rendered at.
+  '''
+  dpi = dpi if dpi > 0 else defaultDPI
+  if maxPixels > 0:
+    from layoutcache import computeLayout, layoutSize
+    width, height = layoutSize(layout or computeLayout(dot))
+    # Sizes are in points, 72 to the inch
+    area = (width / 72) * (height / 72)
+    if area * dpi * dpi > maxPixels:
+      dpi = (maxPixels / area) ** 0.5
+  dot.attr(dpi=f"{dpi:.2f}")
+  return dpi
+
+def renderNode(node:tuple[str,str,float]) -> bytes:
+  '''
+  This function renders a single node into PNG bytes. It runs inside the worker processes,
+  so it only takes and returns plain picklable values.
+  '''
+  name, content, dpi = node
+  dot = Digraph()
+  if dpi > 0:
+    dot.attr(dpi=f"{dpi:.2f}")
+  dot.node(name, content, shape='none')
+  return dot.pipe(format='png')
+
+def drawArrow(draw:ImageDraw.ImageDraw, x:int, top:int, bottom:int):
+  '''This function draws a downward arrow, similar to the edges drawn by Graphviz'''
+  draw.line((x, top, x, bottom - 10), fill=(0, 0, 0), width=2)
+  draw.polygon(((x - 6, bottom - 12), (x + 6, bottom - 12), (x, bottom)), fill=(0, 0, 0))
+
+def stackedStrips(renderedNodes:list[bytes], width:int, sizes:list[tuple[int,int]], gap:int, header:bool = False) -> Iterator[Image.Image]:
+  '''
+  This function yields the strips of the stacked image, top to bottom: every rendered node centered
+  (and scaled to its entry in `sizes`) followed by an arrow to the next one. Only one node is decoded at a time.
+  With `header`, the first node is a header and is not connected to the next one.
+  '''
+  for index, (rendered, size) in enumerate(zip(renderedNodes, sizes)):
+    image = Image.open(io.BytesIO(rendered)).convert('RGB')
+    if image.size != size:
+      image = image.resize(size, Image.Resampling.LANCZOS)
+    strip = Image.new('RGB', (width, image.height), (255, 255, 255))
+    strip.paste(image, ((width - image.width) // 2, 0))
+    image.close()
+    yield strip
+    if index < len(renderedNodes) - 1:
+      arrow = Image.new('RGB', (width, gap), (255, 255, 255))
+      if not (header and index == 0):
+        drawArrow(ImageDraw.Draw(arrow), width // 2, 0, gap)
+      yield arrow
+
+def renderParallel(nodes:dict[str,str], fileName:str, jobs:int = 0, dpi:float = 0, maxPixels:int = 0, header:str | None = None) -> str:
+  '''
+  This function renders every node as its own image on a process pool and stacks the results
+  in order into `fileName`.png, strip by strip, and adds the watermark once. `jobs` = 0 uses all cores.
+  If the stacked image would have more than `maxPixels` pixels, every node is scaled down to fit.
+  A `header` (like the bit-index header of compact tables) is stacked above the first node.
+  Returns the path of the created image.
+  '''
+  if header:
+    nodes = {"Bit Index": header, **nodes}
+  jobs = jobs if jobs > 0 else (os.cpu_count() or 1)
+  with ProcessPoolExecutor(max_workers=min(jobs, len(nodes))) as pool:
+    renderedNodes = list(pool.map(renderNode, [(name, content, dpi) for name, content in nodes.items()]))
+
+  # Only the headers are read here, images are decoded one by one while they are written
+  sizes = [Image.open(io.BytesIO(rendered)).size for rendered in renderedNodes]
+  width = max(nodeWidth for nodeWidth, _ in sizes)
+  height = sum(nodeHeight for _, nodeHeight in sizes) + arrowGap * (len(sizes) - 1)
+  gap = arrowGap
+  if maxPixels > 0 and width * height > maxPixels:
+    scale = (maxPixels / (width * height)) ** 0.5
+    sizes = [(max(1, int(nodeWidth * scale)), max(1, int(nodeHeight * scale))) for nodeWidth, nodeHeight in sizes]
+    gap = max(12, int(arrowGap * scale))
+    width = max(nodeWidth for nodeWidth, _ in sizes)
+    height = sum(nodeHeight for _, nodeHeight in sizes) + gap * (len(sizes) - 1)
+
+  imagePath = fileName + ".png"
+  writeStripedPNG(imagePath, width, height, 'RGB', stackedStrips(renderedNodes, width, sizes, gap, bool(header)))
+  addWatermark(imagePath)
+  return imagePath
+
+def pageWatermark(dot:Digraph, name:str):
+  '''This function adds the watermark below the node of a single page'''
+  dot.edge(name, "Watermark", style='invis')
+  dot.node("Watermark", """<
+             <table BORDER='0'>
+                <tr>
+                   <td HREF="https://github.com/thisisthedarshan/xHCI-DataStructures-Visualizer" TARGET="_blank"> Made with xHCI-DataStructures-Visualizer :D </td>
+                </tr>
+             </table>
+             >""", shape='none', fontsize="21")
+
+def renderPaginatedPDF(nodes:dict[str,str], fileName:str, header:str | None = None) -> str:
+  '''
+  This function renders a PDF with one node per page. Pages are laid out and appended one at a
+  time, so no graph of the whole data structure is ever built. Needs pypdf to join the pages.
+  A `header` (like the bit-index header of compact tables) is drawn above the node of every page.
+  Returns the path of the created PDF.
+  '''
+  try:
+    from pypdf import PdfWriter
+  except ImportError:
+    raise VisualizationException("Paginated PDFs need pypdf. Install it using: pip install pypdf")
+
+  writer = PdfWriter()
+  for name, content in nodes.items():
+    dot = Digraph()
+    if header:
+      dot.node("Bit Index", header, shape='none')
+      dot.edge("Bit Index", name, style='invis')
+    dot.node(name, content, shape='none')
+    pageWatermark(dot, name)
+    writer.append(io.BytesIO(dot.pipe(format='pdf')))
+
+  pdfPath = fileName + ".pdf"
+  with open(pdfPath, "wb") as pdfFile:
+    writer.write(pdfFile)
+  writer.close()
+  return pdfPath
@@ -0,0 +1,144 @@
+# Copyright (c) 2025 Darshan P. All rights reserved.
+
+# This work is licensed under the terms of the MIT license.
+# For a copy, see <https://opensource.org/licenses/MIT>.
+
+# This file searches raw memory images for device contexts when their addresses (DCBAAP)
+# are not known. The image is memory-mapped and split into chunks that are scanned on
+# a pool of processes. Every 64-byte aligned position is checked for a plausible Slot
+# Context using vectorized checks (needs NumPy), and the few positions that pass are
+# scored by checking the endpoint contexts that follow them.
+
+import mmap
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from builders.constants import VisualizationException, endpointStateMap, epTypeMap
+from builders.fields import slotContextLayout, endpointContextLayout, extractFields, reservedBitViolations
+from bulk import importNumpy
+from helpers import bytes2dwords
+
+# Device contexts (and so their slot contexts) are 64-byte aligned
+candidateAlignment = 64
+
+# Bytes scanned by one task. Every task maps its own window of the image
+scanChunkSize = 64 << 20
+
+# Candidates scoring lower than this are not reported
+defaultMinimumScore = 0.9
+
+def deviceContextSize(contextSize:int) -> int:
+  '''This function returns the size of a device context made of 32 contexts of `contextSize` bytes'''
+  if contextSize not in (32, 64):
+    raise VisualizationException(f"Context size must be 32 or 64 bytes (HCCPARAMS1.CSZ). Got {contextSize}")
+  return 32 * contextSize
+
+def contextsOf(data:bytes, contextSize:int) -> bytes:
+  '''
+  This function returns a device context in the 32-byte context layout used by the builders.
+  With 64-byte contexts, only the first 32 bytes of each context are kept (the rest is reserved).
+  '''
+  if contextSize == 32:
+    return bytes(data[:1024])
+  return b"".join(data[index*64 : index*64+32] for index in range(32))
+
+def slotCandidates(window, count:int):
+  '''
+  This function checks `count` 64-byte aligned positions of a window at once and returns the
+  indexes of those holding a plausible Slot Context: RsvdZ bits zero, a valid Slot State,
+  Context Entries between 1 and 31 and a Root Hub Port Number.
+  '''
+  np = importNumpy()
+  dwords = np.frombuffer(window, dtype='>u4', count=count * candidateAlignment // 4).reshape(count, candidateAlignment // 4)
+  d0, d1, d2, d3 = dwords[:, 0], dwords[:, 1], dwords[:, 2], dwords[:, 3]
+  contextEntries = d0 >> 27
+  plausible = (
+    ((d0 >> 24) & 0x1) == 0) & (((d2 >> 18) & 0xF) == 0) & (((d3 >> 8) & 0x7FFFF) == 0) & (
+    (d3 >> 27) <= 3) & (contextEntries >= 1) & (((d1 >> 16) & 0xFF) != 0)
+  return np.nonzero(plausible)[0]
+
+def scoreDeviceContext(data:bytes) -> tuple[float, dict]:
+  '''
+  This function scores how plausible a device context (in the 32-byte layout) is, as the fraction of
+  checks it passes. Endpoints up to Context Entries must have valid states and types, zero RsvdZ bits
+  and aligned dequeue pointers, and endpoints after it are expected to be unused.
+  Returns the score and the decoded slot context.
+  '''
+  dwords = bytes2dwords(data, 0, 256)
+  slot = extractFields(slotContextLayout, dwords[:8])
+  checks = [
+    slot["speed"] != 0,
+    all(value == 0 for value in dwords[4:8]),
+  ]
+  for dci in range(1, 32):
+    endpointDwords = dwords[dci*8 : dci*8+8]
+    endpoint = extractFields(endpointContextLayout, endpointDwords)
+    if dci > slot["contextEntries"]:
+      checks.append(not any(endpointDwords))
+      continue
+    checks.append(endpoint["endpointState"] in endpointStateMap)
+    checks.append(not reservedBitViolations(endpointContextLayout, endpointDwords))
+    if endpoint["endpointState"] != 0:
+      checks.append(endpoint["epType"] in epTypeMap)
+      checks.append(endpoint["maxPacketSize"] != 0)
+      checks.append(endpoint["trDequeuePointerLo"] != 0 or endpoint["trDequeuePointerHi"] != 0)
+      if dci == 1:
+        # The Default Control Endpoint
+        checks.append(endpoint["epType"] == 4)
+  return sum(checks) / len(checks), slot
+
+def scanChunk(task:tuple[str, int, int, int, float]) -> list[dict]:
+  '''
+  This function scans the positions from `start` up to `end` of an image for device contexts. It runs
+  inside the worker processes, so it maps the image itself and only takes and returns plain values.
+  '''
+  path, start, end, contextSize, minimumScore = task
+  size = deviceContextSize(contextSize)
+  fileSize = os.path.getsize(path)
+  # Positions up to `end` are checked, and the window also covers the device contexts starting near it
+  lastStart = min(end, fileSize - size + 1)
+  if lastStart <= start:
+    return []
+  count = (lastStart - start + candidateAlignment - 1) // candidateAlignment
+  windowEnd = min(end + size, fileSize)
+
+  matches:list[dict] = []
+  with open(path, 'rb') as image:
+    with mmap.mmap(image.fileno(), windowEnd - start, access=mmap.ACCESS_READ, offset=start) as window:
+      for index in slotCandidates(window, count).tolist():
+        offset = index * candidateAlignment
+        score, slot = scoreDeviceContext(contextsOf(window[offset:offset+size], contextSize))
+        if score >= minimumScore:
+          matches.append({
+            "offset"         : start + offset,
+            "score"          : round(score, 3),
+            "slotState"      : slot["slotState"],
+            "contextEntries" : slot["contextEntries"],
+            "address"        : slot["usbDeviceAddress"],
+            "port"           : slot["rootHubPortNumber"],
+          })
+  return matches
+
+def scanImage(path:str, contextSize:int = 32, minimumScore:float = defaultMinimumScore, jobs:int = 0) -> list[dict]:
+  '''
+  This function scans a raw memory image for device contexts of `contextSize`-byte contexts on `jobs`
+  processes (0 uses all cores), and returns the matches, best first. Offsets are relative to the start of the image.
+  '''
+  importNumpy()
+  deviceContextSize(contextSize)
+  fileSize = os.path.getsize(path)
+  # Chunk boundaries must stay aligned to both the candidates and the pages mmap works with
+  granularity = max(mmap.ALLOCATIONGRANULARITY, candidateAlignment)
+  chunkSize = max(scanChunkSize - scanChunkSize % granularity, granularity)
+  tasks = [(path, start, min(start + chunkSize, fileSize), contextSize, minimumScore) for start in range(0, fileSize, chunkSize)]
+  if not tasks:
+    return []
+
+  jobs = jobs if jobs > 0 else (os.cpu_count() or 1)
+  if jobs == 1 or len(tasks) == 1:
+    results = map(scanChunk, tasks)
+  else:
+    with ProcessPoolExecutor(max_workers=min(jobs, len(tasks))) as pool:
+      results = list(pool.map(scanChunk, tasks))
+  matches = [match for chunkMatches in results for match in chunkMatches]
+  return sorted(matches, key=lambda match: (-match["score"], match["offset"]))
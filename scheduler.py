@@ -0,0 +1,165 @@
+# Copyright (c) 2025 Darshan P. All rights reserved.
+
+# This work is licensed under the terms of the MIT license.
+# For a copy, see <https://opensource.org/licenses/MIT>.
+
+# This file schedules many renders at once. Jobs wait in a priority queue - small standalone
+# structures before large grouped graphs like devctx - and a fixed number of workers take
+# them in turn, each running one Graphviz process at a time, so no more than `maxProcesses`
+# dot/neato processes ever run together. Every Graphviz process gets the time left of its
+# job and is killed when it runs out. A job identical to one that is queued or running is
+# not rendered again: its caller gets the same future and waits for the one render.
+#
+#   with RenderScheduler(maxProcesses=4, timeout=30) as scheduler:
+#     future = scheduler.submit("devctx", data, "svg", compact=True)
+#     svg = future.result()
+
+import itertools
+import math
+import os
+import queue
+import subprocess
+import threading
+import time
+from concurrent.futures import Future
+
+from builders.constants import VisualizationException
+from builders.registry import getStructure
+
+# Seconds a job may take to render, unless given otherwise
+defaultRenderTimeout = 120.0
+
+def runGraphviz(source:str, format:str, engine:str = 'dot', extraArgs:tuple[str,...] = (), timeout:float | None = None) -> bytes:
+  '''
+  This function runs a Graphviz engine on the DOT source of a graph and returns its output. The process
+  is killed when it takes longer than `timeout` seconds.
+  '''
+  try:
+    completed = subprocess.run([engine, *extraArgs, f"-T{format}"], input=source.encode(), capture_output=True,
+                               timeout=timeout, check=True)
+  except FileNotFoundError:
+    raise VisualizationException(f"{engine} was not found. Install Graphviz and make sure its executables are on PATH")
+  except subprocess.TimeoutExpired:
+    raise VisualizationException(f"{engine} took longer than {timeout:.1f} seconds and was stopped")
+  except subprocess.CalledProcessError as e:
+    raise VisualizationException(f"{engine} failed: {e.stderr.decode(errors='replace').strip()}")
+  return completed.stdout
+
+def timeLeft(deadline:float) -> float:
+  '''This function returns the seconds left until a deadline, raising if it has passed'''
+  left = deadline - time.monotonic()
+  if left <= 0:
+    raise VisualizationException("The render ran out of time before Graphviz was started")
+  return left
+
+def jobPriority(struct:str, data) -> tuple[int,int]:
+  '''This function returns the default priority of a job: standalone structures first, smaller data first'''
+  return (1 if getStructure(struct)["grouped"] else 0, len(data))
+
+class RenderScheduler:
+  '''
+  This class renders jobs on a bounded pool of workers, highest priority (lowest value) first.
+  Each worker runs one Graphviz process at a time, so at most `maxProcesses` of them run together.
+  '''
+
+  def __init__(self, maxProcesses:int = 0, timeout:float = defaultRenderTimeout, useLayoutCache:bool = True):
+    self.maxProcesses = maxProcesses if maxProcesses > 0 else (os.cpu_count() or 1)
+    self.timeout = timeout if timeout > 0 else defaultRenderTimeout
+    self.useLayoutCache = useLayoutCache
+    self.jobs:queue.PriorityQueue = queue.PriorityQueue()
+    self.inFlight:dict[tuple, Future] = {}
+    self.lock = threading.Lock()
+    self.sequence = itertools.count()
+    self.closed = False
+    self.workers = [threading.Thread(target=self.work, name=f"render-{index}", daemon=True) for index in range(self.maxProcesses)]
+    for worker in self.workers:
+      worker.start()
+
+  def __enter__(self) -> "RenderScheduler":
+    return self
+
+  def __exit__(self, *exception):
+    self.close()
+
+  def submit(self, struct:str, data, format:str = 'png', fileName:str | None = None, priority:int | None = None,
+             timeout:float | None = None, **options) -> Future:
+    '''
+    This function queues the render of a structure and returns a future of its output: the rendered bytes,
+    or with `fileName` the path of the written (and for PNGs, watermarked) file. Without a `priority`,
+    standalone structures go before grouped ones, and smaller data before larger. `options` are the
+    rendering options of the builders (compact, capabilities). Submitting a job identical to one that
+    is queued or running returns the future of that job.
+    '''
+    struct = getStructure(struct)["codename"]
+    data = bytes(data)
+    key = (struct, data, format, fileName, tuple(sorted(options.items())))
+    with self.lock:
+      if self.closed:
+        raise VisualizationException("The render scheduler is closed")
+      future = self.inFlight.get(key)
+      if future is not None:
+        return future
+      future = Future()
+      self.inFlight[key] = future
+    defaultPriority = jobPriority(struct, data)
+    order = (defaultPriority[0] if priority is None else priority, defaultPriority[1], next(self.sequence))
+    job = {"key": key, "future": future, "struct": struct, "data": data, "format": format, "fileName": fileName,
+           "timeout": timeout if timeout and timeout > 0 else self.timeout, "options": options}
+    self.jobs.put((*order, job))
+    return future
+
+  def work(self):
+    '''This function is the loop of a worker: it renders queued jobs until it takes the end marker'''
+    while True:
+      *_, job = self.jobs.get()
+      if job is None:
+        return
+      future:Future = job["future"]
+      if future.set_running_or_notify_cancel():
+        try:
+          future.set_result(self.render(job))
+        except Exception as e:
+          future.set_exception(e)
+      with self.lock:
+        del self.inFlight[job["key"]]
+
+  def render(self, job:dict) -> bytes | str:
+    '''This function builds the graph of a job and renders it within the time of the job'''
+    from builder import processAndBuildData
+    from helpers import addWatermark, addWatermarkDot
+
+    deadline = time.monotonic() + job["timeout"]
+    names:list[str] = []
+    dot = processAndBuildData(job["struct"], job["data"], names, **job["options"])
+    if job["format"] == 'pdf':
+      addWatermarkDot(dot, names)
+
+    if self.useLayoutCache:
+      # Same layouts as renderWithCachedLayout, with the layout run bounded by the deadline too
+      from layoutcache import parseLayout, pinnedGraph
+      pinned = pinnedGraph(dot, compute=lambda graph: parseLayout(runGraphviz(graph.source, 'json0', 'dot', (), timeLeft(deadline))))
+      output = runGraphviz(pinned.source, job["format"], 'neato', ('-n2',), timeLeft(deadline))
+    else:
+      output = runGraphviz(dot.source, job["format"], 'dot', (), timeLeft(deadline))
+
+    if not job["fileName"]:
+      return output
+    path = f"{job['fileName']}.{job['format']}"
+    with open(path, 'wb') as outputFile:
+      outputFile.write(output)
+    if job["format"] == 'png':
+      addWatermark(path)
+    return path
+
+  def close(self, wait:bool = True):
+    '''This function stops taking jobs. Queued jobs are still rendered, and with `wait` this function waits for them'''
+    with self.lock:
+      if self.closed:
+        return
+      self.closed = True
+    for _ in self.workers:
+      # End markers sort after every job, so the queue is drained first
+      self.jobs.put((math.inf, 0, next(self.sequence), None))
+    if wait:
+      for worker in self.workers:
+        worker.join()
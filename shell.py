@@ -0,0 +1,333 @@
+# Copyright (c) 2025 Darshan P. All rights reserved.
+
+# This work is licensed under the terms of the MIT license.
+# For a copy, see <https://opensource.org/licenses/MIT>.
+
+# This file contains the interactive shell of the tool. Unlike the one-shot prompt, the shell
+# keeps running between decodes: modules (graphviz, Pillow, the builders) are imported once,
+# parsed buffers are kept by name, and the memoized context labels, cached layouts and the
+# watermark font stay warm, so every decode after the first one is close to instant.
+# Commands have a history (kept across sessions) and tab completion of codenames, buffers
+# and files. Lines of hex values are taken as pasted data.
+
+import cmd
+import glob
+import json
+import os
+import re
+import time
+from functools import lru_cache
+
+from builders.constants import VisualizationException, codenameWidth, descriptionWidth
+from builders.registry import getStructure, supportedStructures
+from helpers import parseRawData, readDataFile
+
+# Commands kept across sessions
+historyFile = os.path.join(os.path.expanduser("~"), ".xHCI-DS-Visualizer_history")
+historyLength = 1000
+
+# A line made only of hex values (bytes or words) is pasted data
+dataLinePattern = re.compile(r"^[\s,]*(0[xX])?[0-9a-fA-F]+([\s,]+(0[xX])?[0-9a-fA-F]+)*[\s,]*$")
+
+# Settings of the shell and the type of their values
+shellSettings:dict[str, type] = {
+  "compact" : bool,
+  "word"    : bool,
+  "pdf"     : bool,
+  "view"    : bool,
+  "cache"   : bool,
+  "caps"    : str,
+  "save"    : str,
+}
+
+@lru_cache(maxsize=256)
+def decodedText(struct:str, data:bytes) -> str:
+  '''This function decodes a structure into indented JSON, memoized on its raw bytes'''
+  from builders.details import decodeStructure
+  return json.dumps(decodeStructure(struct, data), indent=2)
+
+def flattenDecoded(decoded, path:str = "") -> dict[str, object]:
+  '''This function flattens nested decoded values into path -> value, e.g. endpointContexts[2].epType'''
+  if isinstance(decoded, dict):
+    flat:dict[str, object] = {}
+    for key, value in decoded.items():
+      flat.update(flattenDecoded(value, f"{path}.{key}" if path else str(key)))
+    return flat
+  if isinstance(decoded, list):
+    flat = {}
+    for index, value in enumerate(decoded):
+      flat.update(flattenDecoded(value, f"{path}[{index}]"))
+    return flat
+  return {path: decoded}
+
+def parseSetting(name:str, value:str):
+  '''This function converts the text given to `set` into the type of the setting'''
+  if shellSettings[name] is bool:
+    if value.lower() in ("on", "true", "yes", "1"):
+      return True
+    if value.lower() in ("off", "false", "no", "0"):
+      return False
+    raise VisualizationException(f"{name} is either on or off, not {value}")
+  return value
+
+class VisualizerShell(cmd.Cmd):
+  '''
+  This class is the interactive shell. Buffers are kept as bytes by name, the last one loaded or
+  pasted being the current one, and every command works on the current structure and buffer.
+  '''
+  intro = "xHCI Data Structure Visualizer shell. Paste hex data, or type help for the commands."
+
+  def __init__(self, struct:str | None = None, settings:dict | None = None):
+    super().__init__()
+    self.struct = struct.strip().lower() if struct else None
+    self.settings:dict = {"compact": False, "word": False, "pdf": False, "view": False, "cache": True, "caps": "", "save": "xHCI-DS"}
+    self.settings.update(settings or {})
+    self.buffers:dict[str, bytes] = {}
+    self.current:str | None = None
+    self.pasting = False
+    self.historyLoaded = False
+    self.updatePrompt()
+
+  #######################################################################################
+  # Shell plumbing
+  #######################################################################################
+
+  def updatePrompt(self):
+    '''This function shows the current structure and buffer in the prompt'''
+    self.prompt = f"xhci[{self.struct or '-'}:{self.current or '-'}]> "
+
+  def preloop(self):
+    '''This function loads the command history and sets up completion of paths'''
+    try:
+      import readline
+    except ImportError:
+      # No history or line editing without readline (e.g. on Windows)
+      return
+    readline.set_completer_delims(" \t\n")
+    if self.historyLoaded:
+      return
+    self.historyLoaded = True
+    readline.set_history_length(historyLength)
+    try:
+      readline.read_history_file(historyFile)
+    except OSError:
+      pass
+
+  def postloop(self):
+    '''This function saves the command history'''
+    try:
+      import readline
+      readline.write_history_file(historyFile)
+    except (ImportError, OSError):
+      pass
+
+  def onecmd(self, line:str) -> bool:
+    '''This function runs a command, reporting errors instead of leaving the shell'''
+    isData = bool(dataLinePattern.match(line)) and not hasattr(self, f"do_{line.split()[0]}")
+    try:
+      return super().onecmd(line)
+    except (VisualizationException, OSError, ValueError, RuntimeError, ImportError) as e:
+      # Missing Graphviz binaries or Python packages only fail the command that needs them
+      print(f"Error: {e}")
+      return False
+    finally:
+      # Consecutive lines of data (a multi-line paste) go into the same buffer
+      self.pasting = isData
+      self.updatePrompt()
+
+  def emptyline(self) -> bool:
+    '''Empty lines do nothing (instead of repeating the last command)'''
+    return False
+
+  def default(self, line:str) -> bool:
+    '''This function takes lines of hex values as pasted data'''
+    if not dataLinePattern.match(line):
+      print(f"Unknown command {line.split()[0]}. Type help for the commands")
+      return False
+    data = bytes(parseRawData(line.replace(",", " ").split(), self.settings["word"]))
+    if self.pasting and self.current in self.buffers:
+      self.buffers[self.current] += data
+    else:
+      self.addBuffer("paste", data)
+    print(f"{self.current}: {len(self.buffers[self.current])} bytes")
+    return False
+
+  def addBuffer(self, name:str, data:bytes):
+    '''This function keeps a buffer under a name not used yet and makes it the current one'''
+    unique, count = name, 1
+    while unique in self.buffers:
+      count += 1
+      unique = f"{name}{count}"
+    self.buffers[unique] = data
+    self.current = unique
+
+  def buffer(self, name:str = "") -> bytes:
+    '''This function returns a buffer by name (the current one if no name is given)'''
+    name = name or self.current
+    if not name:
+      raise VisualizationException("No data yet. Paste hex values or use load <file>")
+    if name not in self.buffers:
+      raise VisualizationException(f"No buffer named {name}. Buffers are {', '.join(self.buffers) or 'none'}")
+    return self.buffers[name]
+
+  def selectedStruct(self) -> str:
+    '''This function returns the current structure, which has to be chosen using `struct` first'''
+    if not self.struct:
+      raise VisualizationException("No structure selected. Use struct <codename>")
+    return self.struct
+
+  def completeNames(self, names, text:str) -> list[str]:
+    '''This function completes `text` against a list of names'''
+    return [name for name in names if name.startswith(text)]
+
+  #######################################################################################
+  # Commands
+  #######################################################################################
+
+  def do_struct(self, arg:str):
+    '''struct [codename]: select the structure to decode, or list the supported structures'''
+    if not arg.strip():
+      for codename, description in supportedStructures.items():
+        print(f"{'*' if codename == self.struct else ' '} {codename:<{codenameWidth}} {description:<{descriptionWidth}}")
+      return
+    self.struct = getStructure(arg)["codename"]
+
+  def complete_struct(self, text:str, line:str, begidx:int, endidx:int) -> list[str]:
+    return self.completeNames(supportedStructures, text)
+
+  def do_load(self, arg:str):
+    '''load [--binary] <file> [name]: load a text file of hex values (or a raw binary file) as a buffer'''
+    tokens = arg.split()
+    binary = "--binary" in tokens
+    tokens = [token for token in tokens if token != "--binary"]
+    if not tokens:
+      raise VisualizationException("load needs a file")
+    path = os.path.expanduser(tokens[0])
+    if binary:
+      with open(path, 'rb') as dataFile:
+        data = dataFile.read()
+    else:
+      data = bytes(readDataFile(path, self.settings["word"]))
+    self.addBuffer(tokens[1] if len(tokens) > 1 else os.path.splitext(os.path.basename(path))[0], data)
+    print(f"{self.current}: {len(data)} bytes")
+
+  def complete_load(self, text:str, line:str, begidx:int, endidx:int) -> list[str]:
+    matches = glob.glob(os.path.expanduser(text) + "*")
+    return [match + os.sep if os.path.isdir(match) else match for match in matches] + self.completeNames(["--binary"], text)
+
+  def do_use(self, arg:str):
+    '''use <name>: make a buffer the current one'''
+    self.buffer(arg.strip())
+    self.current = arg.strip()
+
+  def complete_use(self, text:str, line:str, begidx:int, endidx:int) -> list[str]:
+    return self.completeNames(self.buffers, text)
+
+  def do_buffers(self, arg:str):
+    '''buffers: list the buffers of the session'''
+    for name, data in self.buffers.items():
+      print(f"{'*' if name == self.current else ' '} {name:<16} {len(data)} bytes")
+
+  def do_drop(self, arg:str):
+    '''drop [name]: forget a buffer (the current one if no name is given)'''
+    name = arg.strip() or self.current
+    self.buffer(name)
+    del self.buffers[name]
+    if name == self.current:
+      self.current = next(reversed(self.buffers), None)
+
+  def complete_drop(self, text:str, line:str, begidx:int, endidx:int) -> list[str]:
+    return self.completeNames(self.buffers, text)
+
+  def do_text(self, arg:str):
+    '''text [name]: print the decoded fields of a buffer as JSON'''
+    print(decodedText(self.selectedStruct(), self.buffer(arg.strip())))
+
+  def complete_text(self, text:str, line:str, begidx:int, endidx:int) -> list[str]:
+    return self.completeNames(self.buffers, text)
+
+  def do_diff(self, arg:str):
+    '''diff <name> [name]: print the decoded fields that differ between two buffers (or from a buffer to the current one)'''
+    names = arg.split()
+    if not 1 <= len(names) <= 2:
+      raise VisualizationException("diff needs one or two buffer names")
+    first, second = (names[0], names[1]) if len(names) == 2 else (names[0], self.current)
+    struct = self.selectedStruct()
+    old = flattenDecoded(json.loads(decodedText(struct, self.buffer(first))))
+    new = flattenDecoded(json.loads(decodedText(struct, self.buffer(second))))
+    changed = [path for path in dict.fromkeys([*old, *new]) if old.get(path) != new.get(path)]
+    for path in changed:
+      print(f"{path}: {old.get(path, '-')} -> {new.get(path, '-')}")
+    print(f"{len(changed)} field(s) differ between {first} and {second}")
+
+  def complete_diff(self, text:str, line:str, begidx:int, endidx:int) -> list[str]:
+    return self.completeNames(self.buffers, text)
+
+  def do_render(self, arg:str):
+    '''render [file]: render the current buffer as file.png (or .pdf with set pdf on)'''
+    from builder import processAndBuildData
+    from helpers import addWatermark, addWatermarkDot
+
+    start = time.perf_counter()
+    struct = self.selectedStruct()
+    fileName = arg.strip() or self.settings["save"]
+    names:list[str] = []
+    dot = processAndBuildData(struct, self.buffer(), names, compact=self.settings["compact"], capabilities=self.settings["caps"] or None)
+    outputFormat = 'pdf' if self.settings["pdf"] else 'png'
+    if self.settings["pdf"]:
+      addWatermarkDot(dot, names)
+    if self.settings["cache"]:
+      from layoutcache import renderWithCachedLayout
+      renderWithCachedLayout(dot, fileName, outputFormat, self.settings["view"])
+    else:
+      dot.render(fileName, format=outputFormat, view=self.settings["view"], cleanup=True)
+    if not self.settings["pdf"]:
+      addWatermark(fileName + ".png")
+    print(f"Rendered {self.current} ({struct}) as {fileName}.{outputFormat} in {(time.perf_counter() - start)*1000:.0f} ms")
+
+  def complete_render(self, text:str, line:str, begidx:int, endidx:int) -> list[str]:
+    return glob.glob(os.path.expanduser(text) + "*")
+
+  def do_set(self, arg:str):
+    '''set [setting value]: show the settings, or change one (compact, word, pdf, view, cache: on/off; caps, save: text)'''
+    tokens = arg.split(maxsplit=1)
+    if not tokens:
+      for name, value in self.settings.items():
+        print(f"{name:<8} {('on' if value else 'off') if shellSettings[name] is bool else value}")
+      return
+    if tokens[0] not in shellSettings or len(tokens) < 2:
+      raise VisualizationException(f"Usage: set <setting> <value>. Settings are {', '.join(shellSettings)}")
+    self.settings[tokens[0]] = parseSetting(tokens[0], tokens[1].strip())
+
+  def complete_set(self, text:str, line:str, begidx:int, endidx:int) -> list[str]:
+    if len(line[:begidx].split()) > 1:
+      return self.completeNames(["on", "off"], text)
+    return self.completeNames(shellSettings, text)
+
+  def do_quit(self, arg:str) -> bool:
+    '''quit: leave the shell (also exit or Ctrl-D)'''
+    return True
+
+  do_exit = do_quit
+
+  def do_EOF(self, arg:str) -> bool:
+    '''Ctrl-D: leave the shell'''
+    print()
+    return True
+
+def interactiveShell(struct:str | None = None, settings:dict | None = None, data:bytes | None = None):
+  '''
+  This function runs the interactive shell until it is left. Given `data` becomes the first buffer.
+  Ctrl-C abandons the line being typed instead of leaving the shell.
+  '''
+  shell = VisualizerShell(struct, settings)
+  if data:
+    shell.addBuffer("input", data)
+    shell.updatePrompt()
+  while True:
+    try:
+      shell.cmdloop()
+      return
+    except KeyboardInterrupt:
+      print("^C")
+      shell.intro = None
@@ -0,0 +1,65 @@
+# Copyright (c) 2025 Darshan P. All rights reserved.
+
+# This work is licensed under the terms of the MIT license.
+# For a copy, see <https://opensource.org/licenses/MIT>.
+
+# This file contains the streaming mode of the tool. Records are read one line at a
+# time, decoded into plain values and written out as newline-delimited JSON (NDJSON).
+# Nothing in here (or in what it imports) depends on the rendering stack.
+
+import base64
+import binascii
+import json
+import string
+from typing import TextIO
+
+from builders.constants import VisualizationException
+from builders.details import decodeStructure
+from builders.registry import getStructure
+from helpers import parseRawData
+
+hexDigits = set(string.hexdigits)
+
+def parseRecord(record:str, struct:str, isWord:bool = False, encoding:str = "auto") -> list[int]:
+  '''
+  This function converts one record into a list of bytes. A record is either
+  space/comma-separated hex values (bytes, or 32-bit words with `isWord`), one contiguous
+  hex string or base64. In "auto" encoding a contiguous string is only treated as hex if it is
+  long enough to hold the whole structure, since short base64 strings can look like hex.
+  '''
+  tokens = record.replace(",", " ").split()
+  if encoding == "hex" and len(tokens) == 1 and not tokens[0].lower().startswith("0x"):
+    return list(bytes.fromhex(tokens[0]))
+  if encoding == "base64":
+    return list(base64.b64decode(record.strip(), validate=True))
+  if len(tokens) > 1 or tokens[0].lower().startswith("0x"):
+    return parseRawData(tokens, isWord)
+  
+  minimumSize = getStructure(struct)["size"]
+  if set(tokens[0]) <= hexDigits and len(tokens[0]) % 2 == 0 and len(tokens[0]) >= 2*minimumSize:
+    return list(bytes.fromhex(tokens[0]))
+  return list(base64.b64decode(tokens[0], validate=True))
+
+def streamDecode(struct:str, inputStream:TextIO, outputStream:TextIO, isWord:bool = False, encoding:str = "auto") -> int:
+  '''
+  This function decodes every record of `inputStream` as `struct` and writes one JSON object
+  per record to `outputStream`, flushing after each one. Only one record is held in memory at
+  a time. A record that can not be decoded produces an object with an "error" key instead of
+  stopping the stream. Returns the number of records that failed.
+  '''
+  struct = getStructure(struct)["codename"]
+
+  failures = 0
+  recordNumber = 0
+  for line in inputStream:
+    if not line.strip():
+      continue
+    try:
+      decoded = {"record": recordNumber, "struct": struct, "fields": decodeStructure(struct, parseRecord(line, struct, isWord, encoding))}
+    except (VisualizationException, ValueError, binascii.Error) as e:
+      decoded = {"record": recordNumber, "struct": struct, "error": str(e)}
+      failures += 1
+    outputStream.write(json.dumps(decoded) + "\n")
+    outputStream.flush()
+    recordNumber += 1
+  return failures
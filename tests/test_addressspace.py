@@ -0,0 +1,66 @@
+# Copyright (c) 2025 Darshan P. All rights reserved.
+
+# This work is licensed under the terms of the MIT license.
+# For a copy, see <https://opensource.org/licenses/MIT>.
+
+import json
+import struct
+
+import pytest
+
+from addressspace import AddressSpace, deviceContextPointers, parseAddress, transferRings
+from builders.constants import VisualizationException
+from encoder import deviceContext, endpoint, slot
+
+def pointer(address:int) -> bytes:
+  '''A 64-bit pointer, low dword first and every dword in the byte order of `bytes2dwords`'''
+  return struct.pack(">2I", address & 0xFFFFFFFF, address >> 32)
+
+def testReadsInsideAndAcrossSegments():
+  space = AddressSpace()
+  space.addSegment(0x2000, bytes(range(16)), "high")
+  space.addSegment(0x1ff0, bytes(range(16, 32)), "low")
+  assert isinstance(space.read(0x2004, 4), memoryview)
+  assert bytes(space.read(0x2004, 4)) == bytes(range(4, 8))
+  assert space.read(0x1ffc, 8) == bytes((28, 29, 30, 31, 0, 1, 2, 3))
+  assert [name for _, _, name in space.ranges()] == ["low", "high"]
+
+def testTranslatedPagesAreCached():
+  space = AddressSpace(cachedPages=1)
+  space.addSegment(0x1000, bytes(0x2000))
+  space.read(0x1000, 8), space.read(0x1008, 8), space.read(0x2000, 8), space.read(0x1000, 8)
+  assert (space.hits, space.misses) == (1, 3)
+
+def testUnmappedAndOverlappingMemoryIsReported():
+  space = AddressSpace()
+  space.addSegment(0x1000, bytes(16), "first")
+  space.addSegment(0x3000, bytes(16), "second")
+  with pytest.raises(VisualizationException, match="0x1010 .* after first .* before second"):
+    space.read(0x1008, 16)
+  with pytest.raises(VisualizationException, match="overlaps first"):
+    space.addSegment(0x1008, bytes(16), "third")
+
+def testManifestSegments(tmp_path):
+  (tmp_path / "dump.bin").write_bytes(bytes(64) + pointer(0x1234567890))
+  (tmp_path / "manifest.json").write_text(json.dumps({"segments": [{"file": "dump.bin", "base": "7ff000", "offset": 64, "length": 8}]}))
+  space = AddressSpace.fromManifest(str(tmp_path / "manifest.json"))
+  assert space.ranges() == [(0x7ff000, 0x7ff007, "dump.bin")]
+  assert space.readPointer(parseAddress("0x7ff000")) == 0x1234567890
+
+def testDeviceContextPointersStopAtTheEndOfTheDCBAA():
+  # Scratchpad entry, slots 1 to 3, then an unrelated segment right after the DCBAA
+  space = AddressSpace()
+  space.addSegment(0x7000, pointer(0xAAAA000) + pointer(0x10000) + pointer(0) + pointer(0x20040 | 0x3F), "dcbaa")
+  space.addSegment(0x7020, pointer(0x30000) * 8, "junk")
+  assert list(deviceContextPointers(space, 0x7000)) == [(1, 0x10000), (3, 0x20040)]
+  assert list(deviceContextPointers(space, 0x7000, maxSlots=1)) == [(1, 0x10000)]
+  with pytest.raises(VisualizationException):
+    list(deviceContextPointers(space, 0x9000))
+
+def testTransferRingsReadTheTRBAtEveryDequeuePointer():
+  space = AddressSpace()
+  space.addSegment(0x40000, bytes(range(32)), "ring")
+  context = deviceContext(slot(entries=3), {1: endpoint(state="Running", tr_dequeue_pointer=0x40010),
+                                            3: endpoint(state="Stopped", tr_dequeue_pointer=0x90000)})
+  assert [(dci, hex(address), trb if trb is None else bytes(trb)) for dci, address, trb in transferRings(space, context)] == \
+         [(1, "0x40010", bytes(range(16, 32))), (3, "0x90000", None)]
@@ -0,0 +1,53 @@
+# Copyright (c) 2025 Darshan P. All rights reserved.
+
+# This work is licensed under the terms of the MIT license.
+# For a copy, see <https://opensource.org/licenses/MIT>.
+
+import pytest
+
+from bandwidth import bandwidthBudget, budgetReport
+from builders.constants import VisualizationException
+from encoder import deviceContext, endpoint, inputContext, inputControl, slot
+
+def highSpeedDevice() -> bytes:
+  return deviceContext(slot(speed="High-speed", port=1, entries=5), {
+    1: endpoint(type="Control", state="Running", mps=64),
+    3: endpoint(type="Interrupt In", state="Running", mps=64, interval=3),          # 64 bytes every 1 ms
+    5: endpoint(type="Isoch In", state="Running", max_esit_payload=3072, interval=0),  # 3072 bytes every microframe
+  })
+
+def deviceBehindHub(speed:str) -> bytes:
+  return deviceContext(slot(speed=speed, port=1, route=0x1, parent_hub_slot_id=1, entries=3),
+                       {3: endpoint(type="Interrupt Out", state="Running", mps=64, interval=3)})
+
+def testPeriodicEndpointsLoadTheirRootPort():
+  result = bandwidthBudget("devctx", [("hs", highSpeedDevice())])
+  port = result["segments"][("Root Hub Port", 1)]
+  assert (port["limit"], port["load"]) == (6000, 8 + 3072)
+  assert [entry["dci"] for entry in port["endpoints"]] == [3, 5]
+
+def testDevicesBehindATTLoadItsFrames():
+  captures = [("hs", highSpeedDevice()), ("fs", deviceBehindHub("Full-speed")), ("ls", deviceBehindHub("Low-speed"))]
+  result = bandwidthBudget("devctx", captures)
+  tt = result["segments"][("TT of Hub Slot", 1)]
+  assert (tt["speed"], tt["limit"]) == ("Full-speed", 1350)
+  # Low-speed bytes cost 8 full-speed bytes
+  assert tt["load"] == 64 + 64 * 8
+  assert result["segments"][("Root Hub Port", 1)]["load"] == 8 + 3072 + 8 + 8
+
+def testInputContextsOnlyCountAddedEndpoints():
+  device = highSpeedDevice()
+  result = bandwidthBudget("ipctx", [("ip", inputContext(inputControl(added_contexts=[0, 1, 3]), device[:32], {3: device[96:128], 5: device[160:192]}))])
+  assert [entry["dci"] for entry in result["segments"][("Root Hub Port", 1)]["endpoints"]] == [3]
+
+def testOverloadedAndUnknownSegmentsAreReported():
+  busy = deviceContext(slot(speed="High-speed", port=2, entries=5),
+                       {5: endpoint(type="Isoch In", state="Running", max_esit_payload=7000, interval=0)})
+  unknown = deviceContext(slot(port=3, entries=3), {3: endpoint(type="Interrupt In", state="Running", mps=8)})
+  report = budgetReport(bandwidthBudget("devctx", [("busy", busy + unknown)]))
+  assert "Root Hub Port 2 (High-speed): 7000 of 6000 bytes per microframe (116.7%) OVER BUDGET" in report
+  assert "Skipped busy record 1" in report
+
+def testOtherStructuresAreRejected():
+  with pytest.raises(VisualizationException):
+    bandwidthBudget("slotctx", [])
@@ -0,0 +1,49 @@
+# Copyright (c) 2025 Darshan P. All rights reserved.
+
+# This work is licensed under the terms of the MIT license.
+# For a copy, see <https://opensource.org/licenses/MIT>.
+
+import pytest
+
+from builders.constants import VisualizationException
+from builders.details import decodeStructure
+from encoder import randomVariants
+
+pytest.importorskip("numpy")
+from bulk import decodeBulk, toStructuredArray
+
+def rowOf(columns:dict, row:int) -> dict:
+  '''Returns one row of a table as plain values, pointers formatted like the decoders do'''
+  values = {name: column[row].item() for name, column in columns.items()}
+  if "trDequeuePointer" in values:
+    values["trDequeuePointer"] = hex(values["trDequeuePointer"])
+  return values
+
+def assertAgrees(row:dict, decoded:dict):
+  for name, value in row.items():
+    if name in decoded:
+      assert value == decoded[name], name
+
+def testBulkColumnsAgreeWithTheDecoders():
+  records = list(randomVariants("ipctx", 3, seed=5))
+  tables = decodeBulk("ipctx", b"".join(records) + bytes(100))  # a trailing partial record is ignored
+  assert len(tables["slot_context"]["record"]) == 3
+  assert len(tables["endpoint_context"]["record"]) == 3 * 31
+  for record, data in enumerate(records):
+    decoded = decodeStructure("ipctx", list(data))
+    assertAgrees(rowOf(tables["input_control_context"], record), decoded["inputControlContext"])
+    assertAgrees(rowOf(tables["slot_context"], record), decoded["slotContext"])
+    for index, endpoint in enumerate(decoded["endpointContexts"]):
+      row = rowOf(tables["endpoint_context"], record * 31 + index)
+      assert (row["record"], row["dci"]) == (record, endpoint["dci"])
+      assertAgrees(row, endpoint)
+
+def testStandaloneEndpointContexts():
+  data = next(randomVariants("endpctx", 1, seed=2))
+  table = decodeBulk("endpctx", data)["endpoint_context"]
+  assertAgrees(rowOf(table, 0), decodeStructure("endpctx", list(data)))
+  assert toStructuredArray(table)[0]["dci"] == 0
+
+def testUnsupportedStructuresAreRejected():
+  with pytest.raises(VisualizationException):
+    decodeBulk("trb", bytes(16))
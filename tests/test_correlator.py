@@ -0,0 +1,56 @@
+# Copyright (c) 2025 Darshan P. All rights reserved.
+
+# This work is licensed under the terms of the MIT license.
+# For a copy, see <https://opensource.org/licenses/MIT>.
+
+import struct
+
+import pytest
+
+from builders.constants import VisualizationException, mapCompletionCode, mapTRBType
+from correlator import correlateCommands, correlationReport, percentile, ringRecords, traceRecords
+
+def commandTRB(trbType:int, slotId:int = 0, parameter:int = 0) -> bytes:
+  return struct.pack(">4I", parameter & 0xFFFFFFFF, parameter >> 32, 0, (slotId << 24) | (trbType << 10) | 1)
+
+def completionEvent(pointer:int, code:int = 1, slotId:int = 0) -> bytes:
+  return struct.pack(">4I", pointer & 0xFFFFFFFF, pointer >> 32, code << 24, (slotId << 24) | (33 << 10) | 1)
+
+def record(time:float, pointer:int, trb:bytes) -> dict:
+  return {"time": time, "pointer": pointer, "trb": trb}
+
+def testCommandsAreMatchedWithTheirEvents():
+  records = [
+    record(0.0,  0x1000, commandTRB(9)),                                  # Enable Slot
+    record(2.0,  0x8000, completionEvent(0x1000, slotId=1)),
+    record(3.0,  0x1010, commandTRB(11, slotId=1, parameter=0x20000)),    # Address Device
+    record(10.0, 0x8010, completionEvent(0x1010, code=4, slotId=1)),
+    record(11.0, 0x1020, commandTRB(12, slotId=1, parameter=0x30000)),    # Configure Endpoint, never completed
+    record(12.0, 0x8020, completionEvent(0x5000)),                        # No command at this pointer
+  ]
+  result = correlateCommands(records)
+  enableSlot = result["statistics"][mapTRBType(9)]
+  assert (enableSlot["issued"], enableSlot["completed"], enableSlot["latency"]["max"]) == (1, 1, 2.0)
+  assert result["statistics"][mapTRBType(11)]["completionCodes"] == {mapCompletionCode(4): 1}
+  assert [(context["inputContextPointer"], context["eventSlotId"]) for context in result["inputContexts"]] == [(0x20000, 1)]
+  assert [command["pointer"] for command in result["outstanding"]] == [0x1020]
+  assert result["unmatchedEvents"] == 1
+  assert "1 outstanding command(s)" in correlationReport(result)
+
+def testReusedTRBsCompleteTheOldestCommand():
+  records = [record(0.0, 0x1000, commandTRB(9)), record(1.0, 0x1000, commandTRB(9)), record(5.0, 0x8000, completionEvent(0x1000))]
+  result = correlateCommands(records)
+  assert result["statistics"][mapTRBType(9)]["latency"]["max"] == 5.0
+  assert [command["time"] for command in result["outstanding"]] == [1.0]
+
+def testRingDumpsAndTraces():
+  ring = commandTRB(9) + bytes(16) + commandTRB(10, slotId=2)
+  assert [entry["pointer"] for entry in ringRecords(ring, 0x4000)] == [0x4000, 0x4020]
+  trace = ["# time address trb", "", f"1.5 0x4000 {commandTRB(9).hex()}", "2.0 4010 " + " ".join(f"{byte:02x}" for byte in completionEvent(0x4000))]
+  assert [(entry["time"], entry["pointer"]) for entry in traceRecords(trace)] == [(1.5, 0x4000), (2.0, 0x4010)]
+  with pytest.raises(VisualizationException):
+    list(traceRecords(["1.0 0x4000 00 11"]))
+
+def testNearestRankPercentiles():
+  values = [float(value) for value in range(1, 101)]
+  assert (percentile(values, 50), percentile(values, 99), percentile([7.0], 90)) == (50.0, 99.0, 7.0)
@@ -0,0 +1,25 @@
+# Copyright (c) 2025 Darshan P. All rights reserved.
+
+# This work is licensed under the terms of the MIT license.
+# For a copy, see <https://opensource.org/licenses/MIT>.
+
+import pytest
+
+from builders.constants import VisualizationException
+from builders.details import decodeStructure
+from encoder import encodeStructure, randomVariants, slot, endpoint
+
+@pytest.mark.parametrize("structName", ["slotctx", "endpctx", "icctx", "devctx", "ipctx"])
+def testDecodedStructuresEncodeBack(structName):
+  for data in randomVariants(structName, 20, seed=1):
+    assert encodeStructure(structName, decodeStructure(structName, list(data))) == data
+
+def testNamedValuesAndAliases():
+  assert slot(speed="High-speed", state="Addressed") == slot(speed=3, slot_state=2)
+  assert endpoint(type="Bulk OUT", tr_dequeue_pointer="0x1000") == endpoint(epType=2, trDequeuePointerLo=0x100)
+
+def testValuesThatDoNotFitAreRejected():
+  with pytest.raises(VisualizationException):
+    slot(speed=16)
+  with pytest.raises(VisualizationException):
+    slot(unknownField=1)
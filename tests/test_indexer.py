@@ -0,0 +1,44 @@
+# Copyright (c) 2025 Darshan P. All rights reserved.
+
+# This work is licensed under the terms of the MIT license.
+# For a copy, see <https://opensource.org/licenses/MIT>.
+
+import pytest
+
+from builders.constants import VisualizationException
+from encoder import slot, deviceContext, endpoint
+from indexer import buildIndex, compileQuery, queryIndex
+
+def testComparisonsAndPrecedence():
+  condition, parameters, usesEndpoints = compileQuery("ep.state == Running and (slot.speed >= 0x3 or not record < 5)")
+  assert condition == "(e.endpointState = ? AND (s.speed >= ? OR (NOT s.record < ?)))"
+  assert parameters == [1, 3, 5]
+  assert usesEndpoints
+
+def testNumbersAreDecimalUnlessPrefixed():
+  assert compileQuery("slot.address == 08")[1] == [8]
+  assert compileQuery("slot.address == 0x10")[1] == [16]
+  assert compileQuery("slot.address == 10") == ("s.usbDeviceAddress = ?", [10], False)
+
+@pytest.mark.parametrize("name, state", [("Disabled", 0), ("enabled", 0), ("Default", 1), ("'Addressed State'", 2), ("Configured", 3)])
+def testEveryStateNameCanBeQueried(name, state):
+  assert compileQuery(f"slot.state == {name}")[1] == [state]
+
+@pytest.mark.parametrize("query", ["slot.address == 0x1g", "slot.adress == 1", "slot.address = 1",
+                                   "slot.address ==", "(slot.port == 1", "ep.state == Sleeping"])
+def testInvalidQueriesAreReported(query):
+  with pytest.raises(VisualizationException):
+    compileQuery(query)
+
+def testSlotContextArchivesAreIndexed(tmp_path):
+  archive = tmp_path / "slots.bin"
+  archive.write_bytes(slot(address=1, state="Default") + slot(address=2, state="Configured") + slot(address=3, state="Configured"))
+  assert buildIndex(str(archive), "slotctx") == (3, 0)
+  assert [match["record"] for match in queryIndex(str(archive), "slot.state == Configured")] == [1, 2]
+  assert queryIndex(str(archive), "slot.address == 1")[0]["offset"] == 0
+
+def testDeviceContextArchivesIndexUsedEndpoints(tmp_path):
+  archive = tmp_path / "devices.bin"
+  archive.write_bytes(deviceContext(slot(address=5), [endpoint(type="Control", state="Running")]))
+  assert buildIndex(str(archive), "devctx") == (1, 1)
+  assert queryIndex(str(archive), "ep.state == Running") == [{"record": 0, "dci": 1, "offset": 32, "size": 32, "struct": "endpctx"}]
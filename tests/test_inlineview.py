@@ -0,0 +1,38 @@
+# Copyright (c) 2025 Darshan P. All rights reserved.
+
+# This work is licensed under the terms of the MIT license.
+# For a copy, see <https://opensource.org/licenses/MIT>.
+
+import pytest
+
+import layoutcache
+from builders.constants import VisualizationException
+from encoder import deviceContext, slot
+from inlineview import visualize
+
+@pytest.fixture
+def renders(monkeypatch) -> list[str]:
+  '''Records the formats rendered instead of running Graphviz'''
+  formats:list[str] = []
+  def pipe(dot, format):
+    formats.append(format)
+    return b"<svg/>" if format == 'svg' else b"\x89PNG"
+  monkeypatch.setattr(layoutcache, "pipeWithCachedLayout", pipe)
+  return formats
+
+@pytest.mark.parametrize("format, mimeType", [("svg", "image/svg+xml"), ("png", "image/png")])
+def testGraphsAreDisplayedInOneFormatAndRenderedOnce(renders, format, mimeType):
+  view = visualize("slotctx", slot(speed="High-speed"), format=format)
+  assert list(view._repr_mimebundle_()) == [mimeType]
+  assert list(view._repr_mimebundle_()) == [mimeType]
+  assert renders == [format]
+
+def testGroupedStructuresAreDisplayedAsTables(renders):
+  bundle = visualize("devctx", deviceContext(slot(address=9)))._repr_mimebundle_()
+  assert list(bundle) == ["text/html"]
+  assert bundle["text/html"].startswith("<details open>")
+  assert renders == []
+
+def testOtherDisplayFormatsAreRejected():
+  with pytest.raises(VisualizationException):
+    visualize("slotctx", bytes(32), format="pdf")
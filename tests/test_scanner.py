@@ -0,0 +1,43 @@
+# Copyright (c) 2025 Darshan P. All rights reserved.
+
+# This work is licensed under the terms of the MIT license.
+# For a copy, see <https://opensource.org/licenses/MIT>.
+
+import pytest
+
+from builders.constants import VisualizationException
+from encoder import deviceContext, endpoint, slot
+from scanner import contextsOf, scanImage, scoreDeviceContext
+
+def plausibleDeviceContext() -> bytes:
+  return deviceContext(slot(speed="High-speed", port=2, address=4, state="Addressed", entries=1),
+                       [endpoint(type="Control", state="Running", mps=64, tr_dequeue_pointer=0x1000)])
+
+def testPlausibleDeviceContextsScoreFully():
+  score, decodedSlot = scoreDeviceContext(plausibleDeviceContext())
+  assert score == 1.0
+  assert (decodedSlot["usbDeviceAddress"], decodedSlot["rootHubPortNumber"]) == (4, 2)
+
+def testEndpointsAfterContextEntriesLowerTheScore():
+  context = bytearray(plausibleDeviceContext())
+  context[64:96] = endpoint(type="Bulk In", state="Running", mps=512, tr_dequeue_pointer=0x2000)
+  assert scoreDeviceContext(bytes(context))[0] < 1.0
+
+def testSixtyFourByteContextsKeepTheirFirstHalf():
+  context = plausibleDeviceContext()
+  padded = b"".join(context[index*32 : index*32+32] + bytes(32) for index in range(32))
+  assert contextsOf(padded, 64) == context
+
+def testImagesAreScannedForDeviceContexts(tmp_path):
+  pytest.importorskip("numpy")
+  image = tmp_path / "image.bin"
+  image.write_bytes(bytes(4096) + plausibleDeviceContext() + bytes(4096))
+  matches = scanImage(str(image), jobs=1)
+  assert [(match["offset"], match["address"], match["port"]) for match in matches] == [(4096, 4, 2)]
+
+def testContextSizesOtherThan32Or64AreRejected(tmp_path):
+  pytest.importorskip("numpy")
+  image = tmp_path / "image.bin"
+  image.write_bytes(bytes(4096))
+  with pytest.raises(VisualizationException):
+    scanImage(str(image), contextSize=48)
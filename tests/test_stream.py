@@ -0,0 +1,38 @@
+# Copyright (c) 2025 Darshan P. All rights reserved.
+
+# This work is licensed under the terms of the MIT license.
+# For a copy, see <https://opensource.org/licenses/MIT>.
+
+import base64
+import io
+import json
+
+import pytest
+
+from builders.constants import VisualizationException
+from encoder import slot
+from stream import parseRecord, streamDecode
+
+@pytest.fixture
+def slotContext() -> bytes:
+  return slot(speed="High-speed", port=3, address=7, entries=1)
+
+def testRecordEncodings(slotContext):
+  assert parseRecord(slotContext.hex(), "slotctx") == list(slotContext)
+  assert parseRecord(" ".join(f"{byte:02x}" for byte in slotContext), "slotctx") == list(slotContext)
+  assert parseRecord(base64.b64encode(slotContext).decode(), "slotctx") == list(slotContext)
+  assert parseRecord(slotContext.hex(), "slotctx", encoding="hex") == list(slotContext)
+
+def testBadRecordsAreReportedWithoutStoppingTheStream(slotContext):
+  output = io.StringIO()
+  failures = streamDecode("slotctx", io.StringIO(f"{slotContext.hex()}\n\nnot a record\n{slotContext.hex()}\n"), output)
+  records = [json.loads(line) for line in output.getvalue().splitlines()]
+  assert failures == 1
+  assert [record["record"] for record in records] == [0, 1, 2]
+  assert "error" in records[1]
+  assert records[0]["fields"] == records[2]["fields"]
+  assert records[0]["fields"]["usbDeviceAddress"] == 7
+
+def testUnknownStructuresAreRejected():
+  with pytest.raises(VisualizationException):
+    streamDecode("bogus", io.StringIO(""), io.StringIO())
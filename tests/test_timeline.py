@@ -0,0 +1,26 @@
+# Copyright (c) 2025 Darshan P. All rights reserved.
+
+# This work is licensed under the terms of the MIT license.
+# For a copy, see <https://opensource.org/licenses/MIT>.
+
+import pytest
+
+from builders.constants import VisualizationException
+from encoder import randomVariants
+from timeline import ingestSnapshots, snapshotAt
+
+@pytest.fixture
+def snapshots() -> list[bytes]:
+  return list(randomVariants("devctx", 7, seed=3))
+
+def testSnapshotsAreRebuiltFromKeyframesAndDeltas(snapshots):
+  # Two captures, and a keyframe interval that leaves steps between keyframes to be rebuilt
+  timeline = ingestSnapshots("devctx", [("first", b"".join(snapshots[:4])), ("second", b"".join(snapshots[4:]))], 3)
+  assert [snapshotAt(timeline, step) for step in range(len(snapshots))] == snapshots
+  assert timeline["sources"][5] == ("second", 1)
+
+@pytest.mark.parametrize("step", [-1, 7, 100])
+def testStepsOutsideTheTimelineAreReported(snapshots, step):
+  timeline = ingestSnapshots("devctx", [("capture", b"".join(snapshots))])
+  with pytest.raises(VisualizationException):
+    snapshotAt(timeline, step)
@@ -0,0 +1,50 @@
+# Copyright (c) 2025 Darshan P. All rights reserved.
+
+# This work is licensed under the terms of the MIT license.
+# For a copy, see <https://opensource.org/licenses/MIT>.
+
+import struct
+
+import pytest
+
+from builders.constants import VisualizationException
+from builders.trbs import decodeTRB, genericTRBLayout, trbLayouts, trbsDecoded
+
+def trb(*dwords:int) -> bytes:
+  return struct.pack(">4I", *dwords)
+
+@pytest.mark.parametrize("trbType", [*trbLayouts, "generic"])
+def testLayoutsCoverEveryBitOnce(trbType):
+  layout = genericTRBLayout if trbType == "generic" else trbLayouts[trbType]
+  covered = [0] * 4
+  for name, dword, lowBit, width in layout:
+    bits = ((1 << width) - 1) << lowBit
+    assert not covered[dword] & bits, f"{name} overlaps another field"
+    covered[dword] |= bits
+  assert covered == [0xFFFFFFFF] * 4
+
+def testTransferTRBs():
+  normal = decodeTRB(trb(0x12345670, 0x1, (3 << 22) | (2 << 17) | 512, (1 << 10) | (1 << 5) | 1))
+  assert (normal["trbTypeName"], normal["fields"]["dataBufferPointer"]) == ("Normal", 0x112345670)
+  assert (normal["fields"]["trbTransferLength"], normal["fields"]["tdSize"], normal["fields"]["interrupterTarget"]) == (512, 2, 3)
+  assert (normal["fields"]["IOC"], normal["fields"]["cycleBit"]) == (1, 1)
+  setup = decodeTRB(trb(0x01000680, 0x00120000, 8, (3 << 16) | (2 << 10) | (1 << 6)))
+  assert {name: setup["fields"][name] for name in ("bmRequestType", "bRequest", "wValue", "wLength", "TRT")} == \
+         {"bmRequestType": 0x80, "bRequest": 0x06, "wValue": 0x0100, "wLength": 0x12, "TRT": 3}
+
+def testSplitPointersAndData():
+  link = decodeTRB(trb(0xABCD0010, 0x2, 0, (6 << 10) | 0x2))
+  assert (link["fields"]["ringSegmentPointer"], link["fields"]["TC"]) == (0x2ABCD0010, 1)
+  notification = decodeTRB(trb(0x12345610, 0x9, 1 << 24, 38 << 10))
+  assert notification["fields"]["notificationData"] == 0x9123456
+  assert notification["completionCodeName"] == "Success"
+
+def testTypesWithoutALayoutUseTheGenericOne():
+  decoded = decodeTRB(trb(1, 2, 3, (18 << 10) | (7 << 16)))
+  assert decoded["fields"] == {"parameter": (2 << 32) | 1, "status": 3, "cycleBit": 0, "flags": 0, "trbType": 18, "control": 7}
+
+def testArraysAreDecodedInOrder():
+  decoded = trbsDecoded(list(trb(0, 0, 0, 8 << 10) + trb(0, 0, 0, 6 << 10) + bytes(8)))
+  assert [(entry["index"], entry["offset"], entry["trbType"]) for entry in decoded] == [(0, 0, 8), (1, 16, 6)]
+  with pytest.raises(VisualizationException):
+    trbsDecoded([0] * 8)
@@ -0,0 +1,39 @@
+# Copyright (c) 2025 Darshan P. All rights reserved.
+
+# This work is licensed under the terms of the MIT license.
+# For a copy, see <https://opensource.org/licenses/MIT>.
+
+import xml.etree.ElementTree as ET
+
+from builders.validation import validateBatch, validateStructure, reportToJUnit
+from encoder import deviceContext, endpoint, inputControl, slot
+
+def rules(issues:list[dict]) -> list[str]:
+  return [issue["rule"] for issue in issues]
+
+def testConsistentDeviceContextsPass():
+  data = deviceContext(slot(state="Addressed", entries=1), [endpoint(type="Control", state="Running", mps=64)])
+  assert validateStructure("devctx", list(data)) == []
+
+def testEndpointsBeyondContextEntriesAreReported():
+  data = deviceContext(slot(state="Configured", entries=1), {1: endpoint(type="Control", state="Running"), 3: endpoint(type="Bulk In", state="Running")})
+  assert rules(validateStructure("devctx", list(data))) == ["context-entries"]
+
+def testContextRules():
+  reserved = bytearray(slot(state="Addressed", entries=1))
+  reserved[13] = 0x01  # Dword 3 bit 16 is RsvdZ
+  assert "rsvdz" in rules(validateStructure("slotctx", list(reserved)))
+  assert rules(validateStructure("endpctx", list(endpoint(type="Control", state="Running", max_p_streams=1)))) == ["max-pstreams"]
+  assert rules(validateStructure("icctx", list(inputControl(drop=0x1, add=0x1)))) == ["drop-flags"]
+
+def testUnusableCapturesAreReportedWithTheirReason():
+  report = validateBatch("slotctx", [("short", [0] * 4), ("missing", FileNotFoundError("No such file"))])
+  assert report["errors"] == 2
+  assert [rules(result["issues"]) for result in report["results"]] == [["size"], ["read"]]
+  assert report["results"][1]["issues"][0]["message"] == "No such file"
+
+def testJUnitReportsFailEveryCaptureWithErrors():
+  report = validateBatch("slotctx", [("good", list(slot(state="Addressed", entries=1))), ("short", [0] * 4)])
+  suite = ET.fromstring(reportToJUnit(report))
+  assert (suite.get("tests"), suite.get("failures")) == ("2", "1")
+  assert [case.find("failure") is not None for case in suite.iter("testcase")] == [False, True]
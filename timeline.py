@@ -0,0 +1,131 @@
+# Copyright (c) 2025 Darshan P. All rights reserved.
+
+# This work is licensed under the terms of the MIT license.
+# For a copy, see <https://opensource.org/licenses/MIT>.
+
+# This file keeps an ordered series of device/input context snapshots as a delta-encoded
+# timeline: a full keyframe every few steps and, for every other step, only the dwords
+# that changed. Any snapshot can be rebuilt from its keyframe, and the history of the
+# interesting fields (slot state, endpoint states, dequeue pointers) is read off the deltas.
+
+import struct
+from array import array
+from typing import Iterable
+
+from builders.constants import VisualizationException, mapSlotState, mapEndpointState
+from builders.fields import endpointContextName
+
+# Size of one snapshot and byte offset of its slot context for every structure a timeline can hold
+timelineStructures:dict[str, tuple[int,int]] = {
+  "devctx" : (1024, 0),
+  "ipctx"  : (1056, 32),
+}
+
+# A full snapshot is kept every this many steps, which bounds the work needed to rebuild one
+defaultKeyframeInterval = 256
+
+def createTimeline(structName:str, keyframeInterval:int = defaultKeyframeInterval) -> dict:
+  '''This function creates an empty timeline of `structName` snapshots'''
+  structName = structName.strip().lower()
+  if structName not in timelineStructures:
+    raise VisualizationException(f"Timelines of {structName} are not supported. Supported structures are {', '.join(timelineStructures)}")
+  recordSize, slotOffset = timelineStructures[structName]
+  return {
+    "struct"           : structName,
+    "recordSize"       : recordSize,
+    "slotDword"        : slotOffset // 4,
+    "keyframeInterval" : max(keyframeInterval, 1),
+    "keyframes"        : {},     # step -> full snapshot as bytes
+    "deltas"           : [],     # step -> (changed dword indexes, new values)
+    "sources"          : [],     # step -> (capture name, record number inside the capture)
+    "last"             : None,   # dwords of the latest snapshot, needed to compute the next delta
+  }
+
+def appendSnapshot(timeline:dict, data:bytes, source:tuple[str,int] = ("", 0)):
+  '''This function adds the next snapshot to a timeline, storing only the dwords that changed'''
+  recordSize = timeline["recordSize"]
+  if len(data) < recordSize:
+    raise VisualizationException(f"A {timeline['struct']} snapshot needs {recordSize} bytes. Got {len(data)} bytes")
+  dwords = struct.unpack_from(f">{recordSize//4}I", data)
+  step = len(timeline["deltas"])
+  last = timeline["last"]
+
+  if last is None:
+    changed = array('H', range(len(dwords)))
+  else:
+    changed = array('H', (index for index, (old, new) in enumerate(zip(last, dwords)) if old != new))
+  timeline["deltas"].append((changed, array('I', (dwords[index] for index in changed))))
+  if step % timeline["keyframeInterval"] == 0:
+    timeline["keyframes"][step] = bytes(data[:recordSize])
+  timeline["sources"].append(source)
+  timeline["last"] = dwords
+
+def ingestSnapshots(structName:str, captures:Iterable[tuple[str, bytes]], keyframeInterval:int = defaultKeyframeInterval) -> dict:
+  '''
+  This function builds a timeline out of captures, in order. Every capture is a (name, bytes) pair
+  holding one or more consecutive snapshots, so a single binary archive can hold the whole series.
+  '''
+  timeline = createTimeline(structName, keyframeInterval)
+  recordSize = timeline["recordSize"]
+  for source, data in captures:
+    for record, offset in enumerate(range(0, len(data) - recordSize + 1, recordSize)):
+      appendSnapshot(timeline, data[offset:offset+recordSize], (source, record))
+  return timeline
+
+def snapshotAt(timeline:dict, step:int) -> bytes:
+  '''This function rebuilds the snapshot at `step` from the nearest keyframe before it'''
+  count = len(timeline["deltas"])
+  if not 0 <= step < count:
+    raise VisualizationException(f"Step {step} is not part of the timeline. Steps are 0 to {count-1}")
+  keyframe = step - step % timeline["keyframeInterval"]
+  dwords = list(struct.unpack(f">{timeline['recordSize']//4}I", timeline["keyframes"][keyframe]))
+  for changed, values in timeline["deltas"][keyframe+1:step+1]:
+    for index, value in zip(changed, values):
+      dwords[index] = value
+  return struct.pack(f">{len(dwords)}I", *dwords)
+
+def storedBytes(timeline:dict) -> int:
+  '''This function returns the approximate number of bytes the timeline keeps for its snapshots'''
+  keyframeBytes = sum(len(keyframe) for keyframe in timeline["keyframes"].values())
+  deltaBytes = sum(changed.itemsize*len(changed) + values.itemsize*len(values) for changed, values in timeline["deltas"])
+  return keyframeBytes + deltaBytes
+
+def timelineTracks(timeline:dict) -> dict[str, list[tuple[int,str]]]:
+  '''
+  This function returns the history of the slot state and of the state and TR Dequeue Pointer of
+  every endpoint that is ever used, as track name -> [(step, value)] holding only the steps where
+  the value changed. Only the deltas are walked, so no snapshot is rebuilt.
+  '''
+  slotDword = timeline["slotDword"]
+  # Track name -> (dwords the track depends on, function giving its value from the current dwords)
+  tracks:dict[str, tuple[tuple[int,...], object]] = {
+    "Slot State": ((slotDword + 3,), lambda dwords: mapSlotState((dwords[slotDword + 3] >> 27) & 0x1F)),
+  }
+  for endpointIndex in range(31):
+    base = slotDword + (endpointIndex + 1) * 8
+    name = endpointContextName(endpointIndex).replace("Endpoint Context ", "EP ").strip()
+    tracks[f"{name} State"] = ((base,), lambda dwords, base=base: mapEndpointState(dwords[base] & 0x7))
+    tracks[f"{name} TR Dequeue Pointer"] = ((base + 2, base + 3),
+                                            lambda dwords, base=base: hex((dwords[base + 3] << 32) | (dwords[base + 2] & ~0xF)))
+
+  # Which tracks have to be re-evaluated when a dword changes
+  dependents:dict[int, list[str]] = {}
+  for name, (trackDwords, _) in tracks.items():
+    for dword in trackDwords:
+      dependents.setdefault(dword, []).append(name)
+
+  dwords = [0] * (timeline["recordSize"] // 4)
+  history:dict[str, list[tuple[int,str]]] = {name: [] for name in tracks}
+  for step, (changed, values) in enumerate(timeline["deltas"]):
+    affected:set[str] = set()
+    for index, value in zip(changed, values):
+      dwords[index] = value
+      affected.update(dependents.get(index, ()))
+    for name in affected:
+      value = tracks[name][1](dwords)
+      if not history[name] or history[name][-1][1] != value:
+        history[name].append((step, value))
+
+  # Endpoints that never leave their initial all-zero values are left out
+  return {name: changes for name, changes in history.items()
+          if name == "Slot State" or len(changes) > 1 or (changes and changes[0][1] not in ("Disabled", "0x0"))}
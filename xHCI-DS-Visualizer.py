@@ -10,11 +10,341 @@ import argparse
 import sys
 import textwrap
 
-from graphviz import Digraph
+# Rendering dependencies (graphviz, Pillow and the builders) are imported where an image
+# is created, so decoding-only modes like --stream and --validate never load them
+from helpers import parseRawData, readDataFile, mapBinaryFile
+from builders.constants import VisualizationException, codenameWidth, descriptionWidth
+from builders.registry import supportedStructures
 
-from builder import processAndBuildData
-from helpers import addWatermark, addWatermarkDot, convert32BitToBytesArray
-from builders.constants import supportedStructures, codenameWidth, descriptionWidth
+def runValidation(struct:str, captures:list[tuple[str, list[int] | Exception]], reportFormat:str, outputFile:str|None):
+   '''
+   This function validates captures without rendering them, writes the report to
+   `outputFile` (or STDOUT) and exits with a non-zero status if any rule failed.
+   '''
+   from builders.validation import validateBatch, reportToJSON, reportToJUnit
+
+   report = validateBatch(struct.strip().lower(), captures)
+   reportText = reportToJUnit(report) if reportFormat == "junit" else reportToJSON(report)
+   if outputFile:
+      with open(outputFile, 'w') as reportFile:
+         reportFile.write(reportText)
+   else:
+      print(reportText)
+   sys.exit(1 if report["errors"] else 0)
+
+def renderVisualization(struct:str, rawBytesData:list[int], fileName:str, args:argparse.Namespace):
+   '''
+   This function builds the visualization of the data and renders it as `fileName`.png
+   (or .pdf), following the output options given on the command line.
+   '''
+   from graphviz import Digraph, view
+   from builder import processAndBuildData, buildNodes, compactHeader
+   from helpers import addWatermark, addWatermarkDot
+
+   names:list[str] = []
+   options = {"compact": args.compact, "capabilities": args.caps}
+
+   if args.pdf and args.paginate:
+      # One context per page, laid out one page at a time
+      from renderer import renderPaginatedPDF
+      pdfPath = renderPaginatedPDF(buildNodes(struct, rawBytesData, names, **options), fileName, compactHeader(struct, **options))
+      if args.render:
+         view(pdfPath)
+      return
+
+   if args.parallel and not args.pdf:
+      # Render every context as its own image on all cores and stack them
+      from renderer import renderParallel
+      imagePath = renderParallel(buildNodes(struct, rawBytesData, names, **options), fileName, args.jobs, args.dpi, args.max_pixels,
+                                 compactHeader(struct, **options))
+      if args.render:
+         view(imagePath)
+      return
+
+   dot = Digraph()
+   dot.clear()
+   dot = processAndBuildData(struct, rawBytesData, names, **options)
+   
+   layout = None
+   if args.pdf:
+      # Process to add a watermark :)
+      addWatermarkDot(dot, names)
+   elif args.dpi or args.max_pixels:
+      # Scale the image down to the pixel budget before Graphviz rasterizes it. The size is read
+      # from the layout the graph is then rendered with, so it is laid out only once
+      from renderer import fitToPixelBudget
+      from layoutcache import cachedLayout, computeLayout
+      if args.max_pixels:
+         layout = computeLayout(dot) if args.no_layout_cache else cachedLayout(dot)
+      fitToPixelBudget(dot, args.max_pixels, args.dpi, layout)
+
+   outputFormat = 'pdf' if args.pdf else 'png'
+   if layout is not None:
+      from layoutcache import renderPinned
+      renderPinned(dot, layout, fileName, outputFormat, args.render)
+   elif args.no_layout_cache:
+      dot.render(fileName,format=outputFormat,view=args.render,cleanup=True)
+   else:
+      # Graphs of the same shape reuse the node positions of the first one laid out
+      from layoutcache import renderWithCachedLayout
+      renderWithCachedLayout(dot, fileName, outputFormat, args.render)
+   if not args.pdf:
+      addWatermark(fileName+".png")
+
+def renderBatch(struct:str, captures:list[tuple[str, list[int] | Exception]], fileName:str, args:argparse.Namespace):
+   '''
+   This function renders every capture of a batch as `fileName`-<capture name>. All captures are
+   rendered in this process, so contexts repeated across files reuse their memoized labels.
+   Captures that could not be read (given as the exception raised reading them) are skipped.
+   With --dot-processes, captures are queued on the render scheduler, which renders them on at most
+   that many Graphviz processes, smaller captures first and each within --render-timeout seconds.
+   '''
+   import os
+   if struct not in supportedStructures:
+      print(f"Invalid Struct option {struct}.")
+      sys.exit(-81)
+   if args.dot_processes:
+      from scheduler import RenderScheduler
+      outputFormat = 'pdf' if args.pdf else 'png'
+      with RenderScheduler(args.dot_processes, args.render_timeout, not args.no_layout_cache) as scheduler:
+         jobs = []
+         for captureName, rawBytesData in captures:
+            if isinstance(rawBytesData, Exception):
+               print(f"Skipped {captureName}: {rawBytesData}")
+               continue
+            captureFile = f"{fileName}-{os.path.splitext(os.path.basename(captureName))[0]}"
+            jobs.append((captureName, captureFile, scheduler.submit(struct, rawBytesData, outputFormat, captureFile,
+                                                                    compact=args.compact, capabilities=args.caps)))
+         for captureName, captureFile, job in jobs:
+            try:
+               job.result()
+               print(f"Rendered {captureName} as {captureFile}")
+            except (VisualizationException, OSError, ValueError) as e:
+               # Writing or watermarking the output can fail too, and only skips this capture
+               print(f"Skipped {captureName}: {e}")
+      return
+   for captureName, rawBytesData in captures:
+      if isinstance(rawBytesData, Exception):
+         print(f"Skipped {captureName}: {rawBytesData}")
+         continue
+      captureFile = f"{fileName}-{os.path.splitext(os.path.basename(captureName))[0]}"
+      try:
+         renderVisualization(struct, rawBytesData, captureFile, args)
+         print(f"Rendered {captureName} as {captureFile}")
+      except (VisualizationException, OSError, ValueError) as e:
+         print(f"Skipped {captureName}: {e}")
+
+def runTimeline(struct:str, captures, step:int|None, fileName:str, args:argparse.Namespace):
+   '''
+   This function ingests an ordered series of snapshots into a delta-encoded timeline. It renders
+   the per-field timeline, or with `step` given, the snapshot rebuilt at that step.
+   '''
+   from timeline import ingestSnapshots, snapshotAt, storedBytes, timelineTracks
+
+   timeline = ingestSnapshots(struct, captures)
+   steps = len(timeline["deltas"])
+   if not steps:
+      raise VisualizationException(f"No complete {struct} snapshots in the input")
+   print(f"{steps} snapshots kept in {storedBytes(timeline)} bytes instead of {steps * timeline['recordSize']} bytes")
+
+   if step is not None:
+      # Rebuilt first: snapshotAt rejects steps outside the timeline (negative ones too)
+      snapshot = snapshotAt(timeline, step)
+      source, record = timeline["sources"][step]
+      print(f"Rebuilding step {step} (record {record} of {source})")
+      renderVisualization(struct, list(snapshot), fileName, args)
+      return
+
+   from graphviz import Digraph
+   from builders.constants import createInfoTable
+   from builders.content import timelineTable
+   from helpers import addWatermark
+
+   dot = Digraph()
+   dot.node("head", createInfoTable(f"Timeline of {struct}", timelineTable(timelineTracks(timeline), steps),
+                                    f"Steps 0 - {steps-1}. Every row lists the steps at which the field changed and its new value"), shape='none')
+   dot.render(fileName, format='png', view=args.render, cleanup=True)
+   addWatermark(fileName+".png")
+
+def runIndexQuery(archivePath:str, struct:str, query:str|None, limit:int, fileName:str, args:argparse.Namespace):
+   '''
+   This function (re)builds the sidecar index of a binary archive when it is out of date and,
+   if a query is given, lists the matches and renders the first `limit` of them.
+   '''
+   from indexer import isIndexCurrent, buildIndex, queryIndex
+   from helpers import mapBinaryFile
+
+   if not isIndexCurrent(archivePath, struct):
+      slotRows, endpointRows = buildIndex(archivePath, struct)
+      print(f"Indexed {slotRows} slot contexts and {endpointRows} endpoint contexts of {archivePath}")
+   if not query:
+      return
+
+   matches = queryIndex(archivePath, query)
+   print(f"{len(matches)} match(es) for: {query}")
+   archive = mapBinaryFile(archivePath)
+   for number, match in enumerate(matches):
+      location = f"record {match['record']}" + (f" DCI {match['dci']}" if match['dci'] is not None else "")
+      print(f"  {location} at offset {hex(match['offset'])}")
+      if number < limit:
+         matchName = f"{fileName}-{match['record']}" + (f"-dci{match['dci']}" if match['dci'] is not None else "")
+         renderVisualization(match["struct"], list(archive[match["offset"]:match["offset"]+match["size"]]), matchName, args)
+
+def runScan(imagePath:str, contextSize:int, minimumScore:float, jobs:int, limit:int, fileName:str, args:argparse.Namespace):
+   '''
+   This function scans a raw memory image for device contexts, lists the matches
+   and renders the best `limit` of them.
+   '''
+   from scanner import scanImage, contextsOf, deviceContextSize
+   from helpers import mapBinaryFile
+
+   matches = scanImage(imagePath, contextSize, minimumScore, jobs)
+   print(f"{len(matches)} likely device context(s) in {imagePath}")
+   image = mapBinaryFile(imagePath)
+   size = deviceContextSize(contextSize)
+   for number, match in enumerate(matches):
+      print(f"  offset {hex(match['offset'])}: score {match['score']}, slot state {match['slotState']}, "
+            f"context entries {match['contextEntries']}, address {match['address']}, root hub port {match['port']}")
+      if number < limit:
+         deviceContext = contextsOf(image[match["offset"]:match["offset"]+size], contextSize)
+         renderVisualization("devctx", list(deviceContext), f"{fileName}-{match['offset']:x}", args)
+
+def memorySpace(memoryPath:str, memoryBase:str = "0"):
+   '''
+   This function maps memory for reads by physical address: the segments of a JSON/YAML manifest,
+   or a single raw image starting at `memoryBase` (hex)
+   '''
+   from addressspace import AddressSpace
+   from helpers import mapBinaryFile
+
+   if memoryPath.lower().endswith((".json", ".yaml", ".yml")):
+      return AddressSpace.fromManifest(memoryPath)
+   space = AddressSpace()
+   space.addSegment(int(memoryBase, 16), mapBinaryFile(memoryPath), memoryPath)
+   return space
+
+def runAddressSpace(args:argparse.Namespace, fileName:str):
+   '''
+   This function reads structures by physical address out of the memory segments of a manifest: --struct at
+   --address, or the Device Contexts of the DCBAA at --dcbaap (rendering the first --limit of them).
+   Without either, the mapped ranges are listed.
+   '''
+   from addressspace import parseAddress, deviceContextPointers, transferRings
+   from builders.details import decodeStructure
+
+   space = memorySpace(args.address_space)
+   if args.address:
+      if not args.struct:
+         raise VisualizationException("--address needs a structure codename passed using --struct")
+      address = parseAddress(args.address)
+      renderVisualization(args.struct.strip().lower(), space.readStructure(args.struct, address, args.length), fileName, args)
+      print(f"Rendered the {args.struct} at {hex(address)} as {fileName}")
+   elif args.dcbaap:
+      slots = list(deviceContextPointers(space, parseAddress(args.dcbaap), args.max_slots))
+      for slotId, pointer in slots:
+         try:
+            deviceContext = space.readStructure("devctx", pointer)
+         except VisualizationException as e:
+            print(f"Slot {slotId}: {e}")
+            continue
+         slotContext = decodeStructure("devctx", deviceContext)["slotContext"]
+         print(f"Slot {slotId}: Device Context at {hex(pointer)}, {slotContext['slotStateName']}, {slotContext['speedName']}")
+         for dci, dequeuePointer, trb in transferRings(space, deviceContext):
+            print(f"  DCI {dci:<2} TR Dequeue Pointer {hex(dequeuePointer)}{'' if trb is not None else ' (not mapped)'}")
+      for slotId, pointer in slots[:args.limit]:
+         try:
+            renderVisualization("devctx", space.readStructure("devctx", pointer), f"{fileName}-slot{slotId}", args)
+            print(f"Rendered the Device Context of slot {slotId} as {fileName}-slot{slotId}")
+         except VisualizationException:
+            # Already reported above
+            pass
+      if not slots:
+         print("No Device Slot has a Device Context in the DCBAA")
+   else:
+      for first, last, name in space.ranges():
+         print(f"{hex(first)}-{hex(last)} {name}")
+
+def runCorrelation(args:argparse.Namespace, fileName:str):
+   '''
+   This function correlates the commands of a Command Ring with their Command Completion Events,
+   taken from ring dumps (--commands/--events) or a timestamped trace (--trace), and prints the report.
+   With a memory image (or a manifest of memory segments), the Input Contexts referenced by the first `--limit`
+   completed commands are rendered.
+   '''
+   import itertools
+   from correlator import ringRecords, traceRecords, correlateCommands, correlationReport
+   from helpers import mapBinaryFile
+
+   if args.trace:
+      with open(args.trace, 'r') as traceFile:
+         result = correlateCommands(traceRecords(traceFile))
+   else:
+      commands = ringRecords(mapBinaryFile(args.commands), int(args.ring_base, 16))
+      events = ringRecords(mapBinaryFile(args.events)) if args.events else ()
+      result = correlateCommands(itertools.chain(commands, events))
+   print(correlationReport(result))
+   if not args.memory:
+      return
+
+   space = memorySpace(args.memory, args.memory_base)
+   for command in result["inputContexts"][:args.limit]:
+      try:
+         inputContext = space.readStructure("ipctx", command["inputContextPointer"])
+      except VisualizationException as e:
+         print(f"Input Context of {command['type']} at {hex(command['pointer'])}: {e}")
+         continue
+      contextFile = f"{fileName}-{command['inputContextPointer']:x}"
+      renderVisualization("ipctx", inputContext, contextFile, args)
+      print(f"Rendered the Input Context of {command['type']} at {hex(command['pointer'])} ({command['completionCode']}) as {contextFile}")
+
+def runEncoder(args:argparse.Namespace):
+   '''
+   This function encodes a spec (--encode) or random variants (--fuzz) of a structure, and writes them to
+   --save (or STDOUT) as hex bytes or words, one structure per line, or as raw binary.
+   '''
+   from encoder import loadSpec, encodeStructure, randomVariants, formatEncoded
+
+   if args.encode:
+      spec = loadSpec(args.encode)
+      struct = args.struct or spec.get("struct")
+      if not struct:
+         raise VisualizationException("The structure to encode must be passed using --struct or named by the \"struct\" key of the spec")
+      encoded = [encodeStructure(struct, spec)]
+   else:
+      if not args.struct:
+         raise VisualizationException("--fuzz needs a structure codename passed using --struct")
+      encoded = randomVariants(args.struct, args.fuzz, args.seed)
+
+   if args.output_format == "binary":
+      if not args.save:
+         raise VisualizationException("Binary output needs a file passed using --save")
+      with open(args.save, 'wb') as outputFile:
+         for data in encoded:
+            outputFile.write(data)
+      return
+   outputFile = open(args.save, 'w') if args.save else sys.stdout
+   try:
+      for data in encoded:
+         outputFile.write(formatEncoded(data, args.output_format) + "\n")
+   finally:
+      if outputFile is not sys.stdout:
+         outputFile.close()
+
+def runShell(args:argparse.Namespace, fileName:str):
+   '''
+   This function starts the interactive shell with the options given on the command line. Data given
+   using --file or as arguments becomes its first buffer.
+   '''
+   from shell import interactiveShell
+
+   settings = {"compact": args.compact, "word": args.word, "pdf": args.pdf, "view": args.render,
+               "cache": not args.no_layout_cache, "caps": args.caps or "", "save": fileName}
+   data = None
+   if args.file:
+      data = bytes(readDataFile(args.file, args.word))
+   elif args.data:
+      data = bytes(parseRawData(' '.join(args.data).replace(",", " ").split(), args.word))
+   interactiveShell(args.struct, settings, data)
 
 def xHCIDataStructureVisualizer():
    '''
@@ -32,6 +362,25 @@ def xHCIDataStructureVisualizer():
       - `--struct`: Structure codename (`devctx`, `ipctx`, etc.; prompts if omitted).
       - `--save`: Output filename (default: `xhci-Ds.png`).
       - `--render`: Render the generated file
+      - `--parallel`: Render each context on its own process and stack the images.
+      - `--compact`: Draw one cell per field instead of one cell per bit.
+      - `--caps`: Extended Capability IDs to draw in detail for `xecp`.
+      - `--paginate`: With `--pdf`, put every context on its own page.
+      - `--dpi`/`--max-pixels`: Resolution and pixel budget of PNG output.
+      - `--no-layout-cache`: Lay out every graph from scratch.
+      - `--validate`: Check the data against the specification instead of rendering it.
+      - `--stream`: Decode newline-delimited records from STDIN into NDJSON on STDOUT.
+      - `--index`/`--where`: Index a binary archive and render only the contexts matching a query.
+      - `--export`: Export decoded fields of many captures to SQLite or Parquet.
+      - `--commands`/`--events`/`--trace`: Correlate commands with their completion events.
+      - `--encode`/`--fuzz`: Build raw data out of field values, or random variants of a structure.
+      - `--scan`: Search a raw memory image for device contexts.
+      - `--address-space`/`--address`/`--dcbaap`: Read structures by physical address out of a manifest of memory segments.
+      - `--bandwidth`: Report the periodic bandwidth use of root ports and TTs.
+      - `--timeline`/`--at`: Render the history of a series of snapshots, or one snapshot of it.
+      - `--batch`: Render (or with `--validate`, validate) many capture files (one structure per file) in one run.
+      - `--dot-processes`/`--render-timeout`: Render `--batch` captures on a bounded number of Graphviz processes.
+      - `--shell`: Start the interactive shell (also started when no data is given on a terminal).
 
    2. **Input Processing**:
       - Reads from `--file` if specified, else from `data` (STDIN).
@@ -41,6 +390,7 @@ def xHCIDataStructureVisualizer():
    3. **Structure Selection**:
       - Uses `--struct` if provided.
       - Prompts user interactively if `--struct` is omitted.
+      - Without any data on a terminal, starts the interactive shell instead of prompting.
 
    4. **Visualization**:
       - Generates GraphViz visualization of xHCI data structure.
@@ -69,7 +419,7 @@ To see the license, visit <https://github.com/thisisthedarshan/xHCI-DataStructur
 The source code of this project is available on <https://github.com/thisisthedarshan/xHCI-DataStructures-Visualizer/>""",
 formatter_class=argparse.RawTextHelpFormatter)
    parser.add_argument("--file", type=str, help="Path to input file")
-   parser.add_argument("--save", type=str, help="Output filename for visualization", default="xHCI-DS")
+   parser.add_argument("--save", type=str, help="Output filename for visualization (or validation report)")
    parser.add_argument("--render", action="store_true", help="Enable rendering")
    parser.add_argument("--struct", type=str, help=textwrap.dedent(f"""\
 Tells tool to process data as a particular structure.
@@ -82,6 +432,48 @@ Supported Structures are:
 """))
    parser.add_argument("--word", action="store_true", help="Input is of type 32-bit words")
    parser.add_argument("--pdf", action="store_true", help="Export as PDF instead of PNG")
+   parser.add_argument("--parallel", action="store_true", help="Render every context as its own image on --jobs processes (default: all cores) and stack them. PNG only")
+   parser.add_argument("--compact", action="store_true", help="Draw one cell per field (values in hex) instead of one cell per bit, for smaller and faster graphs")
+   parser.add_argument("--caps", type=str, metavar="IDS", help="With --struct xecp, also decode and draw the Extended Capabilities with these IDs (e.g. 2,10 or all)")
+   parser.add_argument("--paginate", action="store_true", help="With --pdf, put every context on its own page (needs pypdf)")
+   parser.add_argument("--dpi", type=float, default=0, help="Resolution of PNG output (default: 96)")
+   parser.add_argument("--max-pixels", type=int, default=0, metavar="PIXELS", help="Scale PNG output down so that it has at most PIXELS pixels")
+   parser.add_argument("--no-layout-cache", action="store_true", help="Lay out every graph from scratch instead of reusing the cached layout of graphs of the same shape")
+   parser.add_argument("--dot-processes", type=int, default=0, metavar="COUNT", help="With --batch, render on a scheduler running at most COUNT Graphviz processes at once, smaller captures first (PNG/PDF, no --parallel/--paginate/--dpi)")
+   parser.add_argument("--render-timeout", type=float, default=0, metavar="SECONDS", help="With --dot-processes, stop renders that take longer than SECONDS (default: 120)")
+   parser.add_argument("--validate", action="store_true", help="Validate the data against the xHCI specification instead of rendering it")
+   parser.add_argument("--report", type=str, choices=["json", "junit"], default="json", help="Format of the validation report (default: json)")
+   parser.add_argument("--batch", type=str, nargs="+", metavar="FILE", help="Render many capture files, one data structure per file, or validate them with --validate. Needs --struct")
+   parser.add_argument("--stream", action="store_true", help="Decode newline-delimited records from STDIN and write one JSON object per line to STDOUT. Needs --struct")
+   parser.add_argument("--encoding", type=str, choices=["auto", "hex", "base64"], default="auto", help="Encoding of --stream records (default: auto)")
+   parser.add_argument("--export", type=str, metavar="PATH", help="Export decoded fields of --batch/--file captures to SQLite (.sqlite/.db) or Parquet (.parquet). Needs --struct")
+   parser.add_argument("--binary", action="store_true", help="Input files hold raw binary data, possibly many consecutive structures")
+   parser.add_argument("--index", type=str, metavar="ARCHIVE", help="Build (or refresh) the sidecar index of a binary capture archive. Needs --struct")
+   parser.add_argument("--where", type=str, metavar="QUERY", help="Query the index of --index ARCHIVE, e.g. \"ep.state==Halted and ep.type=='Bulk In'\"")
+   parser.add_argument("--limit", type=int, default=10, help="Maximum number of --where matches to render (default: 10)")
+   parser.add_argument("--encode", type=str, metavar="SPEC", help="Encode the field values of a JSON/YAML spec into raw data instead of visualizing (slotctx, endpctx, icctx, devctx, ipctx)")
+   parser.add_argument("--fuzz", type=int, metavar="COUNT", help="Encode COUNT random variants of --struct, for throughput and fuzz testing")
+   parser.add_argument("--seed", type=int, help="Seed of --fuzz, to repeat a series of variants")
+   parser.add_argument("--output-format", type=str, choices=["bytes", "words", "binary"], default="bytes", help="Format of --encode/--fuzz output: hex bytes or words, one structure per line, or raw binary (default: bytes)")
+   parser.add_argument("--scan", type=str, metavar="IMAGE", help="Search a raw memory image for device contexts and render the best --limit matches (needs numpy)")
+   parser.add_argument("--context-size", type=int, choices=[32, 64], default=32, help="Size of the contexts --scan looks for, 64 if HCCPARAMS1.CSZ is set (default: 32)")
+   parser.add_argument("--min-score", type=float, default=0.9, help="Lowest score (0 to 1) of the contexts reported by --scan (default: 0.9)")
+   parser.add_argument("--jobs", type=int, default=0, help="Number of processes used by --scan and --parallel (default: all cores)")
+   parser.add_argument("--commands", type=str, metavar="RING", help="Correlate the commands of this binary Command Ring dump with their Command Completion Events")
+   parser.add_argument("--events", type=str, metavar="RING", help="Binary Event Ring dump holding the Command Completion Events for --commands")
+   parser.add_argument("--ring-base", type=str, default="0", metavar="ADDR", help="Physical address (hex) of the first TRB of --commands (default: 0)")
+   parser.add_argument("--trace", type=str, metavar="FILE", help="Correlate commands and Command Completion Events of a timestamped text trace and report their latencies")
+   parser.add_argument("--memory", type=str, metavar="IMAGE", help="With --commands/--trace, render the Input Contexts referenced by the first --limit completed commands out of this memory image (or --address-space manifest)")
+   parser.add_argument("--address-space", type=str, metavar="MANIFEST", help="Map the memory segment files of a JSON/YAML manifest at their physical addresses, and read --struct at --address or the Device Contexts of --dcbaap")
+   parser.add_argument("--address", type=str, metavar="ADDR", help="With --address-space, physical address (hex) of the --struct to render")
+   parser.add_argument("--length", type=int, default=0, help="With --address, number of bytes to read (default: the size of --struct)")
+   parser.add_argument("--dcbaap", type=str, metavar="ADDR", help="With --address-space, physical address (hex) of the Device Context Base Address Array whose contexts are listed and rendered")
+   parser.add_argument("--max-slots", type=int, default=255, metavar="COUNT", help="With --dcbaap, number of Device Slots enabled (CONFIG.MaxSlotsEn), i.e. DCBAA entries after the Scratchpad entry (default: 255)")
+   parser.add_argument("--memory-base", type=str, default="0", metavar="ADDR", help="Physical address (hex) of the first byte of --memory (default: 0)")
+   parser.add_argument("--bandwidth", action="store_true", help="Report the periodic bandwidth the devctx/ipctx of --batch/--file reserve on every root port and TT, against the limits of the specification")
+   parser.add_argument("--timeline", action="store_true", help="Treat --batch/--file captures as an ordered series of devctx/ipctx snapshots and render the history of their fields")
+   parser.add_argument("--at", type=int, metavar="STEP", help="With --timeline, render the snapshot at STEP instead")
+   parser.add_argument("--shell", action="store_true", help="Start the interactive shell, which keeps buffers, decoded labels and layouts between commands (default when no data is given on a terminal)")
    parser.add_argument("data", nargs="*", help="Input data (space/comma-separated)")
    
    args = parser.parse_args()
@@ -90,6 +482,141 @@ Supported Structures are:
    
    fileName = "xHCI-DS" if not args.save else args.save
    
+   if args.stream:
+      if not args.struct:
+         print("--stream needs a structure codename passed using --struct", file=sys.stderr)
+         sys.exit(-81)
+      from stream import streamDecode
+      try:
+         failures = streamDecode(args.struct, sys.stdin, sys.stdout, args.word, args.encoding)
+      except BrokenPipeError:
+         # The consumer of the pipeline went away. Nothing more to write
+         sys.exit(0)
+      except VisualizationException as e:
+         print(e, file=sys.stderr)
+         sys.exit(-81)
+      sys.exit(1 if failures else 0)
+   
+   if args.index:
+      if not args.struct:
+         print("--index needs the structure codename of the archive records passed using --struct")
+         sys.exit(-81)
+      try:
+         runIndexQuery(args.index, args.struct.strip().lower(), args.where, args.limit, fileName, args)
+      except (VisualizationException, OSError, ValueError) as e:
+         print(e)
+         sys.exit(-81)
+      sys.exit(0)
+   
+   if args.encode or args.fuzz:
+      try:
+         runEncoder(args)
+      except (VisualizationException, OSError, ValueError) as e:
+         print(e, file=sys.stderr)
+         sys.exit(-81)
+      sys.exit(0)
+   
+   if args.scan:
+      try:
+         runScan(args.scan, args.context_size, args.min_score, args.jobs, args.limit, fileName, args)
+      except (VisualizationException, OSError, ValueError) as e:
+         print(e)
+         sys.exit(-81)
+      sys.exit(0)
+   
+   if args.address_space:
+      try:
+         runAddressSpace(args, fileName)
+      except (VisualizationException, OSError, ValueError) as e:
+         print(e)
+         sys.exit(-81)
+      sys.exit(0)
+   
+   if args.trace or args.commands:
+      try:
+         runCorrelation(args, fileName)
+      except (VisualizationException, OSError, ValueError) as e:
+         print(e)
+         sys.exit(-81)
+      sys.exit(0)
+   
+   if args.export:
+      if not args.struct or not (args.batch or args.file):
+         print("--export needs a structure codename passed using --struct and input files using --batch or --file")
+         sys.exit(-81)
+      from exporter import exportRecords
+      inputFiles = args.batch if args.batch else [args.file]
+      if args.binary:
+         captures = ((inputFile, mapBinaryFile(inputFile)) for inputFile in inputFiles)
+      else:
+         captures = ((inputFile, bytes(readDataFile(inputFile, args.word))) for inputFile in inputFiles)
+      try:
+         written = exportRecords(args.export, args.struct, captures)
+      except (VisualizationException, OSError, ValueError) as e:
+         # Captures are read as they are exported, so unreadable files and bad hex surface here
+         print(e)
+         sys.exit(-81)
+      print(', '.join(f"{rows} rows in {table}" for table, rows in written.items() if rows) or "Nothing exported")
+      sys.exit(0)
+   
+   if args.timeline or args.at is not None:
+      if not args.struct or not (args.batch or args.file):
+         print("--timeline needs a structure codename passed using --struct and snapshot files using --batch or --file")
+         sys.exit(-81)
+      inputFiles = args.batch if args.batch else [args.file]
+      if args.binary:
+         captures = ((inputFile, mapBinaryFile(inputFile)) for inputFile in inputFiles)
+      else:
+         captures = ((inputFile, bytes(readDataFile(inputFile, args.word))) for inputFile in inputFiles)
+      try:
+         runTimeline(args.struct.strip().lower(), captures, args.at, fileName, args)
+      except (VisualizationException, OSError, ValueError) as e:
+         print(e)
+         sys.exit(-81)
+      sys.exit(0)
+   
+   if args.bandwidth:
+      if not args.struct or not (args.batch or args.file):
+         print("--bandwidth needs a structure codename passed using --struct and device contexts using --batch or --file")
+         sys.exit(-81)
+      from bandwidth import bandwidthBudget, budgetReport
+      inputFiles = args.batch if args.batch else [args.file]
+      if args.binary:
+         captures = ((inputFile, mapBinaryFile(inputFile)) for inputFile in inputFiles)
+      else:
+         captures = ((inputFile, bytes(readDataFile(inputFile, args.word))) for inputFile in inputFiles)
+      try:
+         print(budgetReport(bandwidthBudget(args.struct, captures)))
+      except (VisualizationException, OSError, ValueError) as e:
+         # Captures are read as they are budgeted, so unreadable files and bad hex surface here
+         print(e)
+         sys.exit(-81)
+      sys.exit(0)
+   
+   if args.batch:
+      if not args.struct:
+         print("--batch needs a structure codename passed using --struct")
+         sys.exit(-81)
+      captures:list[tuple[str, list[int] | Exception]] = []
+      for batchFile in args.batch:
+         try:
+            captures.append((batchFile, readDataFile(batchFile, args.word)))
+         except (OSError, ValueError) as e:
+            # Kept in place of the bytes, so the file is reported with the reason it could not be read
+            captures.append((batchFile, e))
+      if args.validate:
+         runValidation(args.struct, captures, args.report, args.save)
+      renderBatch(args.struct.strip().lower(), captures, fileName, args)
+      sys.exit(0)
+   
+   if args.shell or (not args.file and not (args.data and len(args.data) >= 4) and sys.stdin.isatty()):
+      try:
+         runShell(args, fileName)
+      except (VisualizationException, OSError, ValueError) as e:
+         print(e)
+         sys.exit(-81)
+      sys.exit(0)
+   
    if args.file:
       try:
          with open(args.file,'r') as dataFile:
@@ -109,8 +636,7 @@ Supported Structures are:
       sys.exit(-69)
    
    # Process Data to obtain final byte-wise data
-   rawDataInt = [int(data,16) for data in rawDataIn]
-   rawBytesData:list[int] = convert32BitToBytesArray(rawDataInt) if (args.word) else rawDataInt
+   rawBytesData:list[int] = parseRawData(rawDataIn, args.word)
 
    # Check if user has given a struct name. If not, prompt him/her to do so
    struct = args.struct
@@ -131,26 +657,17 @@ Supported Structures are:
          sys.exit(-1)
       struct = list(supportedStructures)[option-1] 
    
-   availableOptions = [codename.strip().lower() for codename in list(supportedStructures.keys())]
-   if struct.strip().lower() not in availableOptions:
+   struct = struct.strip().lower()
+   if struct not in supportedStructures:
       print(f"Invalid Struct option {struct}.")
       sys.exit(-81)
       
-   print(f"Selected option : {supportedStructures.get(struct,"")} ({struct})")
+   if args.validate:
+      runValidation(struct, [(args.file or "input", rawBytesData)], args.report, args.save)
 
-   names:list[str] = []
+   print(f"Selected option : {supportedStructures.get(struct,"")} ({struct})")
 
-   dot = Digraph()
-   dot.clear()
-   dot = processAndBuildData(struct, rawBytesData, names)
-   
-   if args.pdf:
-      # Process to add a watermark :)
-      addWatermarkDot(dot, names)
-      dot.render(fileName,format='pdf',view=args.render,cleanup=True)
-   else:
-      dot.render(fileName,format='png',view=args.render,cleanup=True)
-      addWatermark(fileName+".png")
+   renderVisualization(struct, rawBytesData, fileName, args)
   
 if __name__ == "__main__":
   xHCIDataStructureVisualizer()